@@ -1,10 +1,10 @@
 import streamlit as st
 from datetime import datetime
-from core import feeds, rank, llm
+from core import llm, snapshot
 import pandas as pd
 from core.ui_effects import add_fireflies_background
 import requests  # <-- for news API
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 
@@ -120,14 +120,13 @@ def fetch_cybersecurity_news():
 # Existing pipeline: Feeds, ranking, LLM
 # -----------------------------
 
-# Load data (mock or live collectors)
-items_raw = feeds.collect_all_sources()
-items = feeds.normalize_all(items_raw)
-items = feeds.enrich_all(items)
+# Shared, process-wide pipeline result (refreshed in the background)
+snap = snapshot.get_snapshot()
+items = snap.items
 
 # Scoring & selection
-scored = rank.score_and_group(items)
-top5 = rank.select_top(scored, k=5)
+scored = snap.scored
+top5 = snap.top(5)
 
 # LLM (optional) or templated summaries
 top5_brief = llm.build_top5_brief(top5)
@@ -137,19 +136,11 @@ attack_map = llm.map_attack_techniques(top5)
 # KPIs
 # -----------------------------
 col1, col2, col3 = st.columns(3)
-col1.metric(
-    "Items Today",
-    len(
-        [
-            x
-            for x in items
-            if x.get("published_at", "")[:10]
-            == datetime.utcnow().strftime("%Y-%m-%d")
-        ]
-    ),
-)
-col2.metric("Unique CVEs", len({cve for it in items for cve in it.get("cve_list", [])}))
-col3.metric("Sources", len(set([it["source"] for it in items])))
+# counted once per snapshot build (core.pipeline.Kpis)
+kpis = snap.kpis
+col1.metric("Items Today", kpis["items_today"])
+col2.metric("Unique CVEs", kpis["unique_cves"])
+col3.metric("Sources", kpis["sources"])
 
 # -----------------------------
 # New section: External Cybersecurity Articles
@@ -223,3 +214,5 @@ if attack_map:
     st.dataframe(df, use_container_width=True, height=260)
 else:
     st.info("No techniques mapped yet.")
+
+add_timing_panel()
@@ -1,11 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from core import async_feeds, feeds, geo, ioc_index, ioc_stream, metrics, query, rank_index, responses
+from core.cache import AsyncSingleFlightCache
+from core.store import to_epoch
+
+# Upper bound on observables per /api/iocs/match request
+MAX_OBSERVABLES = 50000
+
+# Seconds a cached /api/iocs response is served before a background refresh
+IOCS_TTL = float(os.getenv("IOCS_TTL", "60"))
+
+# ThreatFox rows cached per `days` value; /api/iocs pages are cut from them.
+# Same size as the stream's window, so both share one cache entry.
+IOCS_WINDOW = ioc_stream.STREAM_LIMIT
+
+# Fields of an /api/iocs item (selectable with ?fields=)
+IOC_FIELDS = ("id", "title", "source", "threat_type", "published_at", "geo_hints", "iocs")
+# Repeating values, dictionary-encoded in ?format=columnar
+IOC_DICTIONARY_FIELDS = ("source", "threat_type")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    _ioc_index.start()
+    yield
+    await _ioc_index.stop()
+    await _ioc_stream.stop()
+    await async_feeds.aclose_client()
 
-from core import feeds
 
 app = FastAPI(
     title="Threat Intel API",
     description="Backend API for animated cyber threat map",
+    lifespan=lifespan,
 )
 
 # Allow your React dev server (http://localhost:3000) to call this API
@@ -23,34 +59,287 @@ app.add_middleware(
 )
 
 
+async def _load_iocs(limit, days):
+    raw = await async_feeds.threatfox_iocs(limit=limit, days=days)
+
+    with metrics.span("api.load_iocs") as s:
+        # normalize + GeoIP are CPU-bound: keep them off the event loop
+        body = await asyncio.to_thread(_iocs_body, raw)
+        s.items = len(raw)
+    return body
+
+
+def _iocs_body(raw):
+    items = [feeds.normalize(row) for row in raw]
+    # one batch GeoIP lookup for every IP indicator (no-op without GEOIP_DB_CSV)
+    countries = feeds.ip_countries(items)
+    rows = []
+    for row, it in zip(raw, items):
+        iocs = it.get("iocs") or {}
+        geo_hints = list(it.get("geo_hints") or [])  # ThreatFox's own country stays first
+        for ip in iocs.get("ips") or ():
+            country = countries.get(ip)
+            if country and country not in geo_hints:
+                geo_hints.append(country)
+        rows.append(
+            (
+                responses.sort_key(it),
+                {
+                    "id": it.get("id"),
+                    "title": it.get("title", ""),
+                    "source": it.get("source", "ThreatFox"),
+                    "threat_type": row.get("threat_type", ""),
+                    "published_at": it.get("published_at"),
+                    "geo_hints": geo_hints,
+                    "iocs": {
+                        "ips": iocs.get("ips", []),
+                        "domains": iocs.get("domains", []),
+                        "urls": iocs.get("urls", []),
+                    },
+                },
+            )
+        )
+    rows.sort(key=lambda r: r[0])
+
+    # keys: sort key of every item, for cursor lookups
+    return {"items": [r[1] for r in rows], "keys": [r[0] for r in rows]}
+
+
+# One upstream call per (limit, days) at a time, shared by every client
+_iocs_cache = AsyncSingleFlightCache(_load_iocs, ttl=IOCS_TTL)
+
+# Serialized + compressed responses, reused until the cached body is refreshed
+_rendered = responses.RenderCache()
+
+
+def _encoded_response(request, encoded, headers=None):
+    """200 with the encoded body, or 304 if the client already has it."""
+    headers = {**(headers or {}), **encoded.headers()}
+    if responses.not_modified(request.headers.get("if-none-match"), encoded.etag):
+        headers.pop("Content-Encoding", None)
+        return Response(status_code=304, headers=headers)
+    return Response(encoded.content, media_type="application/json", headers=headers)
+
+
 @app.get("/api/iocs")
-def get_iocs(limit: int = 50, days: int = 1):
+async def get_iocs(
+    request: Request,
+    limit: int = Query(50, ge=1, le=1000),
+    days: int = Query(1, ge=1, le=7),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|columnar)$"),
+):
     """
-    Returns normalized IoCs + geo hints from ThreatFox.
-    This reuses your existing core.feeds logic.
+    Returns normalized IoCs + geo hints from ThreatFox, newest first.
+
+    Pages hold `limit` items; pass the returned next_cursor as ?cursor= for
+    the next one (null on the last page). ?fields=id,iocs keeps only those
+    fields; ?format=columnar returns one array per field, with source and
+    threat_type dictionary-encoded. Bodies are gzip/brotli-compressed per
+    Accept-Encoding and carry a strong ETag, so If-None-Match gets a 304
+    while the data is unchanged.
+
+    Served from a server-side cache that is refreshed in the background, so
+    clients only wait on ThreatFox for the very first request of a `days`
+    value. X-Cache and Age report how the response was served.
     """
-    raw = feeds.fetch_threatfox_iocs(limit=limit, days=days)
-    items = [feeds.normalize(it) for it in raw]
+    try:
+        selected = responses.parse_fields(fields, IOC_FIELDS)
+        if cursor is not None:
+            responses.decode_cursor(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    try:
+        body, age, state = await _iocs_cache.get((IOCS_WINDOW, days))
+    except feeds.FeedError as exc:
+        raise HTTPException(status_code=502, detail=str(exc))
+    metrics.inc(metrics.CACHE_REQUESTS, cache="iocs", result=state)
 
-    payload = []
-    for it in items:
-        iocs = it.get("iocs") or {}
-        payload.append(
-            {
-                "title": it.get("title", ""),
-                "source": it.get("source", "ThreatFox"),
-                "geo_hints": it.get("geo_hints", []),
-                "iocs": {
-                    "ips": iocs.get("ips", []),
-                    "domains": iocs.get("domains", []),
-                    "urls": iocs.get("urls", []),
-                },
-            }
+    def build():
+        page, next_cursor = responses.paginate(body["items"], body["keys"], limit, cursor)
+        out = {"count": len(page), "total": len(body["items"]), "next_cursor": next_cursor}
+        if format == "columnar":
+            out["format"] = "columnar"
+            out["columns"] = responses.columnar(page, selected or IOC_FIELDS, IOC_DICTIONARY_FIELDS)
+        else:
+            out["items"] = responses.project(page, selected)
+        return out
+
+    encoded = _rendered.get(
+        ("iocs", days, limit, cursor, selected, format),
+        body,
+        build,
+        responses.choose_encoding(request.headers.get("accept-encoding")),
+    )
+    return _encoded_response(
+        request, encoded, {"X-Cache": state.upper(), "Age": str(int(age))}
+    )
+
+
+async def _stream_items():
+    # same cache as /api/iocs, so the stream adds no upstream traffic of its own
+    body, _, _ = await _iocs_cache.get((IOCS_WINDOW, 1))
+    return body["items"]
+
+
+_ioc_stream = ioc_stream.IocStream(_stream_items)
+
+# Built in the background from the same cached rows plus the item store
+_ioc_index = ioc_index.IndexBuilder(_stream_items)
+
+
+@app.get("/api/iocs/stream")
+async def stream_iocs(
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events with IoC changes: a "snapshot" event with the full
+    state first, then "delta" events with added/expired indicators and
+    per-country count deltas. Browsers resume automatically via the
+    Last-Event-ID header; ?last_event_id= does the same for manual reconnects.
+    """
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    return StreamingResponse(
+        _ioc_stream.events(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/iocs/countries")
+async def ioc_countries(request: Request, include_empty: bool = True):
+    """
+    Compact per-country IoC aggregate for the globe: ISO codes, precomputed
+    centroid, IoC counts by type and a 0..1 intensity. Built from the same
+    cached ThreatFox data as the stream and recomputed only when that
+    data is refreshed.
+    """
+    try:
+        body, age, state = await _iocs_cache.get((IOCS_WINDOW, 1))
+    except feeds.FeedError as exc:
+        raise HTTPException(status_code=502, detail=str(exc))
+
+    encoded = _rendered.get(
+        ("countries", include_empty),
+        body,
+        lambda: geo.country_aggregate(body["items"], include_empty=include_empty),
+        responses.choose_encoding(request.headers.get("accept-encoding")),
+    )
+    return _encoded_response(
+        request, encoded, {"X-Cache": state.upper(), "Age": str(int(age))}
+    )
+
+
+class MatchRequest(BaseModel):
+    observables: List[str]
+
+
+@app.post("/api/iocs/match")
+def match_iocs(req: MatchRequest):
+    """
+    Matches observables from your own logs (IPs, hostnames, URLs, hashes)
+    against every collected indicator. Domains also match their subdomains,
+    IPs match indicator networks. Only observables with hits are returned.
+    Answers 503 until the index has been built after startup.
+    """
+    if len(req.observables) > MAX_OBSERVABLES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"at most {MAX_OBSERVABLES} observables per request",
+        )
+
+    index = _ioc_index.index
+    if index is None:
+        raise HTTPException(
+            status_code=503,
+            detail="IOC index is still being built",
+            headers={"Retry-After": "5"},
+        )
+    matches = index.match(req.observables)
+    return {
+        "matches": matches,
+        "checked": len(req.observables),
+        "matched": len(matches),
+        "indicators": index.size,
+    }
+
+
+@app.get("/api/items")
+def get_items(
+    request: Request,
+    since: Optional[str] = None,
+    source: Optional[str] = None,
+    min_cvss: Optional[float] = None,
+    cve: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=query.MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Returns archived items from the local item store, newest first.
+    Answered from the index; nothing is fetched upstream.
+    """
+    try:
+        items = query.query_items(
+            since=since,
+            source=source,
+            min_cvss=min_cvss,
+            cve=cve,
+            limit=limit,
+            offset=offset,
         )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    encoded = responses.encode(
+        {"items": items, "count": len(items)},
+        responses.choose_encoding(request.headers.get("accept-encoding")),
+    )
+    return _encoded_response(request, encoded)
+
 
-    return {"items": payload}
+@app.get("/api/top")
+def get_top(
+    request: Request,
+    k: int = Query(10, ge=1, le=query.MAX_LIMIT),
+    at: Optional[str] = None,
+):
+    """
+    The k highest-ranked archived items as they score at time `at` (ISO
+    date/datetime or epoch seconds; default now). Answered from the
+    persistent rank index without rescoring anything.
+    """
+    now = time.time()
+    if at is not None:
+        now = to_epoch(at)
+        if now is None:
+            raise HTTPException(status_code=400, detail=f"Unrecognized 'at' value: {at!r}")
+    top = rank_index.get_index().top_k(k, now=now)
+    scores = dict(top)
+    items = query.items_by_id([item_id for item_id, _ in top])
+    for it in items:
+        it["rank_score"] = scores[str(it["id"])]
+
+    encoded = responses.encode(
+        {"items": items, "count": len(items), "at": now},
+        responses.choose_encoding(request.headers.get("accept-encoding")),
+    )
+    return _encoded_response(request, encoded)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Pipeline timings, item/byte counters and cache hit/miss counts of this
+    API process in the Prometheus text format. Empty with METRICS_ENABLED=0.
+    """
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
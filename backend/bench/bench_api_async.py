@@ -0,0 +1,155 @@
+"""Sync (requests + thread pool) versus async (pooled httpx) ThreatFox fetches.
+
+    python -m bench.bench_api_async --requests 400 --pool 40 --latency 0.05
+
+A local stand-in for the ThreatFox API (in a child process, so it does not
+compete for our GIL) answers every POST after a fixed delay. All requests
+arrive at once. The sync path runs feeds.threatfox_iocs on a thread pool
+(FastAPI gives sync endpoints 40 threads by default); the async path runs
+async_feeds.threatfox_iocs on one event loop with the same number of pooled
+connections. The on-disk TTL is disabled so every call really goes
+upstream. Reported: throughput, latency as seen by the caller (queueing
+included), OS threads used and TCP connections the upstream saw.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("THREAT_INTEL_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+os.environ.setdefault("THREATFOX_AUTH_KEY", "bench")
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    latency = 0.05
+    body = b"{}"
+    connections = None  # multiprocessing.Value shared with the parent
+
+    def setup(self):
+        super().setup()
+        with self.connections.get_lock():
+            self.connections.value += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 drops connection bursts
+
+
+def _fake_response(rows=50):
+    data = [
+        {"id": i, "ioc": f"198.51.100.{i % 250}:443", "ioc_type": "ip:port",
+         "threat_type": "botnet_cc", "country": "NL", "first_seen": "2025-01-01 00:00:00 UTC"}
+        for i in range(rows)
+    ]
+    return json.dumps({"query_status": "ok", "data": data}).encode()
+
+
+def _serve(latency, connections, port_queue):
+    _Upstream.latency = latency
+    _Upstream.body = _fake_response()
+    _Upstream.connections = connections
+    server = _Server(("127.0.0.1", 0), _Upstream)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def start_upstream(latency):
+    """Start the stand-in in a child process; returns (process, port, connection counter)."""
+    connections = multiprocessing.Value("i", 0)
+    port_queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(
+        target=_serve, args=(latency, connections, port_queue), daemon=True
+    )
+    proc.start()
+    return proc, port_queue.get(timeout=10), connections
+
+
+def _summary(label, latencies, elapsed, threads, connections):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:6s} {len(latencies) / elapsed:7.0f} req/s  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  p99={p99 * 1000:7.1f}ms  "
+        f"threads={threads:3d}  upstream connections={connections}"
+    )
+
+
+def run_sync(feeds, n, pool_size):
+    t0 = time.perf_counter()
+    peak = [0]
+
+    def one(_):
+        feeds.threatfox_iocs(limit=50, days=1)
+        peak[0] = max(peak[0], threading.active_count())
+        return time.perf_counter() - t0
+
+    # requests beyond the pool size queue up, as they do in front of FastAPI
+    with ThreadPoolExecutor(max_workers=pool_size) as pool:
+        latencies = list(pool.map(one, range(n)))
+    return latencies, time.perf_counter() - t0, peak[0]
+
+
+async def run_async(async_feeds, n):
+    t0 = time.perf_counter()
+
+    async def one():
+        await async_feeds.threatfox_iocs(limit=50, days=1)
+        return time.perf_counter() - t0
+
+    latencies = await asyncio.gather(*(one() for _ in range(n)))
+    elapsed = time.perf_counter() - t0
+    threads = threading.active_count()
+    await async_feeds.aclose_client()
+    return latencies, elapsed, threads
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--pool", type=int, default=40, help="sync threads / async connections")
+    ap.add_argument("--latency", type=float, default=0.05, help="upstream delay in seconds")
+    args = ap.parse_args()
+
+    proc, port, connections = start_upstream(args.latency)
+    os.environ["THREATFOX_API_URL"] = f"http://127.0.0.1:{port}/api/v1/"
+    os.environ["HTTP_MAX_CONNECTIONS"] = os.environ["HTTP_MAX_KEEPALIVE"] = str(args.pool)
+
+    from core import async_feeds, feeds
+
+    feeds.SOURCE_TTL["ThreatFox"] = 0  # always go upstream
+
+    print(f"requests={args.requests} pool={args.pool} "
+          f"upstream latency={args.latency * 1000:.0f}ms http2={async_feeds.HTTP2}")
+    connections.value = 0
+    latencies, elapsed, threads = run_sync(feeds, args.requests, args.pool)
+    _summary("sync", latencies, elapsed, threads, connections.value)
+
+    connections.value = 0
+    latencies, elapsed, threads = asyncio.run(run_async(async_feeds, args.requests))
+    _summary("async", latencies, elapsed, threads, connections.value)
+    proc.terminate()
+
+
+if __name__ == "__main__":
+    main()
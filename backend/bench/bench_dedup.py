@@ -0,0 +1,99 @@
+"""Accuracy and throughput of core.dedup on a synthetic corpus.
+
+    python -m bench.bench_dedup --stories 2000 --threshold 0.5 --rank-items 100000
+
+Each synthetic story is published 1-4 times with different wording (source
+prefixes, synonyms, dropped and reordered words), the way the same advisory
+shows up across CISA, Talos, MSRC and news feeds. Pairwise precision/recall
+compare the predicted clusters with the known story of every document, for
+
+  add     NearDuplicateIndex.add() one document at a time (rank index, stream)
+  batch   signatures() + components() over all documents at once (cluster_items)
+
+and rank.score_and_group() is timed on --rank-items feed items, the path a
+snapshot refresh takes (0 skips it).
+"""
+import argparse
+import time
+from collections import Counter, defaultdict
+
+from bench.corpus import make_feed_items, make_story_corpus
+from core import feeds, rank
+from core.dedup import NearDuplicateIndex
+
+
+def _pairs(groups):
+    return sum(n * (n - 1) // 2 for n in groups)
+
+
+def _accuracy(docs, predicted, elapsed):
+    story_of = {doc_id: story for doc_id, story, _ in docs}
+    true_pairs = _pairs(Counter(story_of.values()).values())
+    pred_pairs = 0
+    correct = 0
+    for members in predicted.values():
+        pred_pairs += _pairs([len(members)])
+        by_story = defaultdict(int)
+        for m in members:
+            by_story[story_of[m]] += 1
+        correct += _pairs(by_story.values())
+
+    return {
+        "docs": len(docs),
+        "clusters": len(predicted),
+        "precision": correct / pred_pairs if pred_pairs else 1.0,
+        "recall": correct / true_pairs if true_pairs else 1.0,
+        "docs_per_sec": len(docs) / elapsed if elapsed else float("inf"),
+        "seconds": elapsed,
+    }
+
+
+def evaluate(docs, index):
+    t0 = time.perf_counter()
+    for doc_id, _, text in docs:
+        index.add(doc_id, text)
+    elapsed = time.perf_counter() - t0
+    return _accuracy(docs, index.clusters(), elapsed)
+
+
+def evaluate_batch(docs, index):
+    t0 = time.perf_counter()
+    labels = index.components(index.signatures([text for _, _, text in docs]))
+    elapsed = time.perf_counter() - t0
+    predicted = defaultdict(list)
+    for (doc_id, _, _), label in zip(docs, labels.tolist()):
+        predicted[label].append(doc_id)
+    return _accuracy(docs, predicted, elapsed)
+
+
+def time_rank(n, seed):
+    items = feeds.normalize_all(make_feed_items(n, seed=seed))
+    t0 = time.perf_counter()
+    rank.score_and_group(items)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stories", type=int, default=2000)
+    ap.add_argument("--threshold", type=float, default=0.5)
+    ap.add_argument("--num-perm", type=int, default=128)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--rank-items", type=int, default=100_000)
+    args = ap.parse_args()
+
+    docs = make_story_corpus(args.stories, seed=args.seed)
+    for mode, run in (("add", evaluate), ("batch", evaluate_batch)):
+        index = NearDuplicateIndex(threshold=args.threshold, num_perm=args.num_perm)
+        res = run(docs, index)
+        print(
+            f"{mode:5s} docs={res['docs']} clusters={res['clusters']} bands={index.bands}x{index.rows} "
+            f"precision={res['precision']:.3f} recall={res['recall']:.3f} "
+            f"throughput={res['docs_per_sec']:.0f} docs/s ({res['seconds']:.2f}s)"
+        )
+    if args.rank_items:
+        print(f"rank  items={args.rank_items} score_and_group={time_rank(args.rank_items, args.seed):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
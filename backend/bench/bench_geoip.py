@@ -0,0 +1,72 @@
+"""Offline GeoIP lookup throughput over a synthetic range table.
+
+    python -m bench.bench_geoip --ranges 300000 --lookups 1000000
+
+Writes a CSV with --ranges contiguous IPv4 ranges (roughly the size of the
+free country-level databases) plus a few IPv6 ones, compiles it through
+core.geoip and times GeoIpResolver.lookup_many on random dotted addresses.
+The compile cost is paid once per CSV; reopening is just mmap.
+"""
+import argparse
+import ipaddress
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("THREAT_INTEL_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+COUNTRIES = ["US", "DE", "NL", "RU", "CN", "BR", "FR", "GB", "JP", "IN", "KR", "UA"]
+
+
+def write_ranges(path, n, seed=0):
+    rng = random.Random(seed)
+    bounds = sorted(rng.sample(range(1, 2**32 - 1), n - 1))
+    starts = [0] + bounds
+    ends = [b - 1 for b in bounds] + [2**32 - 1]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("start,end,country\n")
+        for s, e in zip(starts, ends):
+            f.write(f"{ipaddress.IPv4Address(s)},{ipaddress.IPv4Address(e)},{rng.choice(COUNTRIES)}\n")
+        f.write("2001:db8::,2001:db8:ffff:ffff:ffff:ffff:ffff:ffff,NL\n")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--ranges", type=int, default=300_000)
+    ap.add_argument("--lookups", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from core.geoip import GeoIpResolver
+
+    csv_path = os.path.join(tempfile.mkdtemp(prefix="bench-geoip-"), "ranges.csv")
+    write_ranges(csv_path, args.ranges)
+    t0 = time.perf_counter()
+    GeoIpResolver.from_csv(csv_path)
+    compile_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    resolver = GeoIpResolver.from_csv(csv_path)
+    open_s = time.perf_counter() - t0
+
+    rng = random.Random(1)
+    ips = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(args.lookups)]
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        out = resolver.lookup_many(ips)
+        best = min(best, time.perf_counter() - t0)
+
+    mixed = ips[:10_000] + ["2001:db8::1", "not-an-ip"]
+    t0 = time.perf_counter()
+    resolver.lookup_many(mixed)
+    mixed_s = time.perf_counter() - t0
+
+    print(f"ranges={len(resolver)} compile={compile_s:.2f}s reopen={open_s * 1000:.1f}ms")
+    print(f"ipv4 batch: {args.lookups / best / 1e6:.2f}M lookups/s "
+          f"({best * 1e9 / args.lookups:.0f} ns each, {sum(1 for c in out if c)} resolved)")
+    print(f"mixed fallback: {len(mixed) / mixed_s / 1e6:.2f}M lookups/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Retained memory per normalized item: plain dicts versus core.item.ThreatItem.
+
+    python -m bench.bench_items --items 200000
+
+Runs normalize -> add_iocs -> enrich_all -> score_and_group on the same
+bench.corpus items twice: once keeping ThreatItems (the pipeline's own
+output) and once keeping their to_dict() form (the shape items had before).
+Reports the bytes still allocated per item afterwards (tracemalloc) and the
+pipeline time, so the saving is weighed against any conversion cost.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench.corpus import make_feed_items
+from core import enrich, feeds, rank
+
+
+def pipeline(raw, as_dicts):
+    items = feeds.normalize_all(raw)
+    if as_dicts:
+        items = [it.to_dict() for it in items]
+    items = feeds.enrich_all(enrich.add_iocs(items))
+    return rank.score_and_group(items)
+
+
+def measure(raw, as_dicts):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    items = pipeline(raw, as_dicts)
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return retained, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, default=200_000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    raw = make_feed_items(args.items, seed=args.seed)
+    n = len(raw)
+    print(f"items={n}")
+    pipeline(raw[:200], as_dicts=False)  # load matchers, TLD tables etc. outside the trace
+    results = {}
+    for label, as_dicts in (("dict", True), ("ThreatItem", False)):
+        retained, elapsed = measure(raw, as_dicts)
+        results[label] = retained
+        print(f"{label:10s} {retained / n:8.0f} B/item  {retained / 1e6:8.1f} MB retained  "
+              f"pipeline {elapsed:6.2f}s (traced)")
+    print(f"saving     {1 - results['ThreatItem'] / results['dict']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
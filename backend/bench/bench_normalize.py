@@ -0,0 +1,73 @@
+"""Per-item cost of feeds.normalize_all versus the previous implementation.
+
+    python -m bench.bench_normalize --items 100000
+
+The legacy path (a fresh HTMLParser for every field and dateutil for every
+timestamp) is reproduced below so both run on the same synthetic corpus.
+"""
+import argparse
+import datetime
+import time
+
+from dateutil import parser
+
+from bench.corpus import make_feed_items
+from core import feeds
+
+
+def _legacy_clean_html(text):
+    s = feeds.MLStripper()
+    s.feed(text or "")
+    return s.get_data()
+
+
+def _legacy_to_iso8601(dt):
+    if isinstance(dt, str):
+        try:
+            return parser.parse(dt).isoformat()
+        except Exception:
+            return dt
+    return dt.isoformat()
+
+
+def legacy_normalize(item):
+    return {
+        "id": item.get("id") or item.get("url") or item.get("title"),
+        "source": item.get("source", "UNKNOWN"),
+        "published_at": _legacy_to_iso8601(
+            item.get("published_at", datetime.datetime.utcnow().isoformat())
+        ),
+        "title": _legacy_clean_html(item.get("title", "")),
+        "summary": _legacy_clean_html(item.get("summary", "")),
+        "cve_list": item.get("cve_list", []),
+        "cvss_max": float(item.get("cvss_max", 0.0)),
+        "iocs": item.get("iocs", {"ips": [], "domains": [], "urls": []}),
+        "products": item.get("products", []),
+        "mitre_ttps": item.get("mitre_ttps", []),
+        "geo_hints": item.get("geo_hints", []),
+    }
+
+
+def _time(fn, items):
+    t0 = time.perf_counter()
+    fn(items)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, default=100000)
+    ap.add_argument("--html-ratio", type=float, default=0.3)
+    args = ap.parse_args()
+
+    items = make_feed_items(args.items, html_ratio=args.html_ratio)
+    legacy = _time(lambda xs: [legacy_normalize(x) for x in xs], items)
+    current = _time(feeds.normalize_all, items)
+    n = len(items)
+    print(f"items={n} html_ratio={args.html_ratio}")
+    print(f"legacy   {legacy:7.2f}s  {legacy / n * 1e6:7.1f} us/item")
+    print(f"current  {current:7.2f}s  {current / n * 1e6:7.1f} us/item  ({legacy / current:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
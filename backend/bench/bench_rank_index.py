@@ -0,0 +1,87 @@
+"""Refresh cost of core.rank_index versus a full rescore, by history size.
+
+    python -m bench.bench_rank_index --history 5000 20000 --delta 150
+
+For each history size, indexes that many bench.corpus items (dates spread
+over the retention window), then times one refresh that brings `delta` new
+items and re-sends the rest unchanged, as every snapshot build does:
+
+  full    rank.score_and_group() over history + delta
+  index   RankIndex.score_and_group() over the refreshed items
+  cold    the same on a RankIndex just opened on the file, as in a new process
+  top-k   RankIndex.top_k(10) over the whole index at a later "now"
+
+Both index refreshes should stay flat as the history grows; the full rescore
+grows linearly with it.
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from bench.corpus import make_feed_items
+from core import enrich, feeds, rank, rank_index
+
+SPREAD_DAYS = 45
+
+
+def corpus(n, seed):
+    now = time.time()
+    rng = random.Random(seed)
+    raw = make_feed_items(n, seed=seed)
+    for it in raw:
+        it["published_at"] = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - rng.uniform(0, SPREAD_DAYS * 86400))
+        )
+    return feeds.enrich_all(enrich.add_iocs(feeds.normalize_all(raw), workers=1))
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--history", type=int, nargs="+", default=[5_000, 20_000])
+    ap.add_argument("--delta", type=int, default=150)
+    ap.add_argument("--refreshed", type=int, default=1000, help="items re-sent unchanged per refresh")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-rank-index-")
+    try:
+        print(f"{'history':>8s} {'full s':>8s} {'index s':>8s} {'cold s':>8s} {'top-k ms':>9s}")
+        for n in args.history:
+            items = corpus(n + args.delta, args.seed)
+            history, delta = items[:n], items[n:]
+            path = os.path.join(tmp, f"rank-{n}.sqlite3")
+            index = rank_index.RankIndex(path)
+            index.update(history)
+            refresh = history[-args.refreshed:] + delta
+            index._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            shutil.copy(path, path + ".cold")
+
+            full = best_of(lambda: rank.score_and_group(items), 1)
+            t0 = time.perf_counter()
+            index.score_and_group(refresh)
+            incremental = time.perf_counter() - t0
+            cold_index = rank_index.RankIndex(path + ".cold")
+            t0 = time.perf_counter()
+            cold_index.score_and_group(refresh)
+            cold = time.perf_counter() - t0
+            later = time.time() + 2 * 86400
+            top = best_of(lambda: index.top_k(10, now=later), 5)
+            print(f"{n:8d} {full:8.3f} {incremental:8.3f} {cold:8.3f} {top * 1000:9.2f}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
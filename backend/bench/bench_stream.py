@@ -0,0 +1,70 @@
+"""Peak memory of the batch pipeline versus core.pipeline's streaming mode.
+
+    python -m bench.bench_stream --items 5000 20000 40000
+
+For each corpus size, runs
+
+  batch   normalize_all -> add_iocs -> enrich_all -> score_and_group, then
+          select_top and the KPI counters over the full list (the snapshot path)
+  stream  pipeline.run() over a generated stream of the same items
+
+and reports the tracemalloc peak and wall time. The batch peak grows with
+the corpus; the streaming peak should stay flat. The stream is generated
+lazily (bench.corpus.iter_feed_items), so the corpus itself is not counted
+against the streaming run; the batch run is handed a list, as collectors do.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench.corpus import iter_feed_items
+from core import enrich, feeds, pipeline, rank
+
+# re-published stories are drawn from this many recent ones in both runs
+STORY_WINDOW = 1000
+
+
+def run_batch(n, seed, k):
+    raw = list(iter_feed_items(n, seed=seed, story_window=STORY_WINDOW))
+    items = feeds.enrich_all(enrich.add_iocs(feeds.normalize_all(raw), workers=1))
+    scored = rank.score_and_group(items)
+    return rank.select_top(scored, k), pipeline.kpis(items)
+
+
+def run_stream(n, seed, k):
+    result = pipeline.run(iter_feed_items(n, seed=seed, story_window=STORY_WINDOW), k=k)
+    return result.top, result.kpis
+
+
+def measure(fn, n, seed, k):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    top, kpis = fn(n, seed, k)
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed, top, kpis
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--items", type=int, nargs="+", default=[5_000, 20_000, 40_000])
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    run_stream(200, args.seed, args.top)  # load matchers, TLD tables etc. outside the trace
+    print(f"{'items':>8s} {'mode':6s} {'peak MB':>9s} {'seconds':>8s}  top-k overlap")
+    for n in args.items:
+        b_peak, b_time, b_top, b_kpis = measure(run_batch, n, args.seed, args.top)
+        s_peak, s_time, s_top, s_kpis = measure(run_stream, n, args.seed, args.top)
+        assert b_kpis == s_kpis, (b_kpis, s_kpis)
+        overlap = len({it["id"] for it in b_top} & {it["id"] for it in s_top})
+        print(f"{n:8d} {'batch':6s} {b_peak / 1e6:9.1f} {b_time:8.2f}")
+        print(f"{n:8d} {'stream':6s} {s_peak / 1e6:9.1f} {s_time:8.2f}  {overlap}/{len(b_top)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Seeded synthetic corpora shared by the benchmarks.
+
+make_feed_items() scales data/sample_feeds.json-style raw items from a few
+thousand to millions: source-specific date formats, HTML markup and
+entities, fanged and defanged indicators in the text, and a share of stories
+re-published by other feeds with different wording (the near-duplicates
+that rank/dedup cluster). Same seed, same corpus.
+
+make_story_corpus() and make_ioc_docs() are the narrower corpora used by
+bench_dedup and bench_iocs.
+"""
+import datetime
+import random
+import re
+from collections import deque
+
+# source -> date format its feed uses
+SOURCES = {
+    "CISA": "rfc822",
+    "Cisco Talos": "rfc822",
+    "MSRC": "rfc822",
+    "NVD": "iso",
+    "ThreatFox": "utc",
+    "MITRE ATT&CK": "isoz",
+}
+WORDS = ("critical vulnerability exploited remote attacker patch firmware update "
+         "ransomware campaign phishing credential gateway appliance loader beacon "
+         "payload observed dropped persistence").split()
+
+VENDORS = ["Microsoft", "Cisco", "Fortinet", "Ivanti", "Citrix", "VMware", "Apache",
+           "Atlassian", "Oracle", "SAP", "Juniper", "Palo Alto Networks", "OpenSSL",
+           "Zyxel", "SonicWall", "F5", "GitLab", "Jenkins", "WordPress", "Chrome"]
+PRODUCTS = ["Exchange Server", "IOS XE", "FortiOS", "Connect Secure", "NetScaler ADC",
+            "vCenter", "Struts", "Confluence", "WebLogic", "NetWeaver", "Junos OS",
+            "PAN-OS", "libssl", "NAS firmware", "SMA appliance", "BIG-IP", "CE/EE",
+            "controller", "plugin", "V8 engine"]
+FLAWS = ["remote code execution", "authentication bypass", "SQL injection",
+         "privilege escalation", "path traversal", "command injection",
+         "deserialization", "buffer overflow", "server-side request forgery",
+         "cross-site scripting"]
+SYNONYMS = {
+    "critical": ["severe", "high-severity"],
+    "vulnerability": ["flaw", "bug", "weakness"],
+    "exploited": ["abused", "attacked", "targeted"],
+    "attackers": ["threat actors", "adversaries"],
+    "patch": ["update", "fix"],
+}
+PREFIXES = ["", "", "CISA: ", "Talos: ", "MSRC: ", "Alert: ", "Breaking: "]
+
+_CVE = re.compile(r"CVE-\d{4}-\d+")
+
+TLDS = ["com", "net", "org", "ru", "top", "xyz", "info", "io"]
+FILES = ["update.zip", "README.md", "exploit.py", "install.sh", "invoice.pdf"]
+
+
+def format_date(rng, style):
+    dt = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(
+        seconds=rng.randint(0, 300 * 86400)
+    )
+    if style == "rfc822":
+        return dt.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    if style == "utc":
+        return dt.strftime("%Y-%m-%d %H:%M:%S UTC")
+    if style == "isoz":
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000")
+
+
+def _vocabulary(rng, size=5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+# =========================
+#  STORIES (near-duplicates)
+# =========================
+def make_story(rng, vocab):
+    vendor, product, flaw = rng.choice(VENDORS), rng.choice(PRODUCTS), rng.choice(FLAWS)
+    cve = f"CVE-{rng.randint(2019, 2025)}-{rng.randint(1000, 99999)}"
+    context = " ".join(rng.choice(vocab) for _ in range(rng.randint(15, 30)))
+    title = f"critical {flaw} vulnerability in {vendor} {product} {cve} exploited"
+    summary = f"attackers {context}. apply the {vendor} patch."
+    return f"{title}. {summary}"
+
+
+def reword(rng, text):
+    words = text.split()
+    out = []
+    for w in words:
+        key = w.lower().strip(".,")
+        if key in SYNONYMS and rng.random() < 0.5:
+            w = rng.choice(SYNONYMS[key])
+        if rng.random() < 0.05:
+            continue  # drop a word
+        out.append(w)
+    if len(out) > 6 and rng.random() < 0.3:
+        i = rng.randrange(len(out) - 3)
+        out[i], out[i + 1] = out[i + 1], out[i]
+    return rng.choice(PREFIXES) + " ".join(out)
+
+
+def make_story_corpus(stories, seed=7):
+    """[(doc_id, story_id, text)] with 1-4 variants per story, shuffled."""
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng)
+    docs = []
+    for story_id in range(stories):
+        base = make_story(rng, vocab)
+        for v in range(rng.choice([1, 1, 2, 3, 4])):
+            text = base if v == 0 else reword(rng, base)
+            docs.append((f"{story_id}-{v}", story_id, text))
+    rng.shuffle(docs)
+    return docs
+
+
+# =========================
+#  INDICATORS
+# =========================
+def _domain(rng):
+    label = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 12)))
+    return f"{label}.{rng.choice(TLDS)}"
+
+
+def indicator(rng):
+    """A random indicator, fanged or defanged, or a file name that looks like a domain."""
+    kind = rng.randrange(8)
+    if kind == 0:
+        return ".".join(str(rng.randint(1, 254)) for _ in range(4))
+    if kind == 1:
+        return ".".join(str(rng.randint(1, 254)) for _ in range(3)) + "[.]" + str(rng.randint(1, 254))
+    if kind == 2:
+        return _domain(rng).replace(".", "[.]")
+    if kind == 3:
+        return f"hxxps://{_domain(rng)}/{rng.choice(WORDS)}/{rng.randint(1, 999)}"
+    if kind == 4:
+        return "%032x" % rng.getrandbits(128)
+    if kind == 5:
+        return "%064x" % rng.getrandbits(256)
+    if kind == 6:
+        return "2001:db8:%x::%x" % (rng.getrandbits(16), rng.getrandbits(16))
+    return rng.choice(FILES)
+
+
+def make_ioc_docs(n, seed=11):
+    """Advisory-like prose with ~8% of the words replaced by indicators."""
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(40, 120)):
+            parts.append(indicator(rng) if rng.random() < 0.08 else rng.choice(WORDS))
+        docs.append(" ".join(parts))
+    return docs
+
+
+# =========================
+#  FEED ITEMS
+# =========================
+def _htmlize(rng, text):
+    """Wrap text the way RSS descriptions arrive: paragraphs, links, entities."""
+    words = text.split(" ")
+    cut = len(words) // 2
+    link = f'<a href="https://example.com/advisory/{rng.randint(1, 99999)}">advisory</a>'
+    return (
+        f"<p>{' '.join(words[:cut])}</p>\n<p>{' '.join(words[cut:])} &amp; see the {link}"
+        f"<br/>&nbsp;&#8212; {rng.choice(VENDORS)} PSIRT</p>"
+    )
+
+
+def make_feed_items(n, seed=0, html_ratio=0.3, ioc_rate=1.5, dup_ratio=0.25):
+    """n raw feed items shaped like data/sample_feeds.json.
+
+    html_ratio  share of summaries wrapped in HTML
+    ioc_rate    mean number of indicators mixed into a summary
+    dup_ratio   share of items that re-publish an earlier story, reworded,
+                from another feed (what rank's duplication signal counts)
+    """
+    return list(iter_feed_items(n, seed, html_ratio, ioc_rate, dup_ratio))
+
+
+def iter_feed_items(n, seed=0, html_ratio=0.3, ioc_rate=1.5, dup_ratio=0.25, story_window=None):
+    """make_feed_items() as a generator, for streaming benchmarks.
+
+    With story_window set, re-published stories are drawn from the last
+    story_window stories only, so the generator's own memory stays bounded.
+    """
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng)
+    names = list(SOURCES)
+    # (text, cve, cvss, product); a list indexes in O(1) when unbounded
+    stories = [] if story_window is None else deque(maxlen=story_window)
+    for i in range(n):
+        source = rng.choice(names)
+        if stories and rng.random() < dup_ratio:
+            text, cve, cvss, product = stories[rng.randrange(len(stories))]
+            text = reword(rng, text)
+        else:
+            text = make_story(rng, vocab)
+            cve = _CVE.search(text).group()
+            cvss = round(rng.uniform(4.0, 10.0), 1)
+            product = next(p for p in PRODUCTS if p in text)
+            stories.append((text, cve, cvss, product))
+        title, _, summary = text.partition(". ")
+
+        extra = [rng.choice(WORDS) for _ in range(rng.randint(10, 40))]
+        for _ in range(int(rng.expovariate(1 / ioc_rate)) if ioc_rate else 0):
+            extra.insert(rng.randrange(len(extra) + 1), indicator(rng))
+        summary = f"{summary} {' '.join(extra)}"
+        if rng.random() < html_ratio:
+            summary = _htmlize(rng, summary)
+
+        yield {
+            "id": f"{source.lower().replace(' ', '-')}-{i}",
+            "source": source,
+            "published_at": format_date(rng, SOURCES[source]),
+            "title": title,
+            "summary": summary,
+            "cve_list": [cve],
+            "cvss_max": cvss,
+            "products": [product],
+            "mitre_ttps": [],
+        }
@@ -0,0 +1,201 @@
+"""Per-stage benchmark of the ingest -> rank -> brief pipeline.
+
+    python -m bench.suite --sizes 1000,10000,100000 --save bench-base.json
+    python -m bench.suite --sizes 1000,10000,100000 --baseline bench-base.json
+
+Runs every stage on a seeded bench.corpus of raw feed items (HTML,
+indicators, re-published stories) at each size and reports:
+
+* throughput   items/s over the whole batch, best of --repeat runs
+* latency      per-item cost of fixed --chunk sized calls, p50/p95/p99
+* peak memory  tracemalloc peak above the input while the stage runs
+
+--save writes the results as JSON; --baseline compares against such a file
+and flags stages whose throughput fell, or whose peak memory grew, by more
+than --tolerance (exit status 1 if any did). Judge performance changes by
+comparing against a baseline saved on the same machine before the change.
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("THREAT_INTEL_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+import numpy as np
+
+from bench.corpus import make_feed_items
+from core import enrich, feeds, llm, rank
+
+
+def _extract_iocs(items):
+    return [enrich.extract_iocs(f"{it['title']} {it['summary']}") for it in items]
+
+
+def _template_summaries(items):
+    return [llm._template_summary(it) for it in items]
+
+
+# name -> (input it runs on, stage); inputs are built once per size by _inputs()
+STAGES = {
+    "normalize": ("raw", feeds.normalize_all),
+    "extract_iocs": ("normalized", _extract_iocs),
+    "enrich": ("normalized", feeds.enrich_all),
+    "rank": ("enriched", rank.score_and_group),
+    "attack": ("enriched", llm.map_attack_techniques),
+    "template_summary": ("ranked", _template_summaries),
+}
+
+
+def _inputs(raw):
+    normalized = feeds.normalize_all(raw)
+    enriched = feeds.enrich_all(enrich.add_iocs(feeds.normalize_all(raw)))
+    ranked = rank.score_and_group(list(enriched))
+    return {"raw": raw, "normalized": normalized, "enriched": enriched, "ranked": ranked}
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def measure(stage, items, repeat=3, chunk=64, samples=200, memory=True):
+    """{"items_per_sec", "p50_us", "p95_us", "p99_us", "peak_mb"} for one stage."""
+    stage(items[:chunk])  # warm up lazy singletons (matchers, TLD tables, ...)
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        stage(items)
+        best = min(best, time.perf_counter() - t0)
+
+    per_item = []
+    for start in range(0, min(len(items), chunk * samples), chunk):
+        part = items[start:start + chunk]
+        t0 = time.perf_counter()
+        stage(part)
+        per_item.append((time.perf_counter() - t0) / len(part) * 1e6)
+    per_item.sort()
+
+    result = {
+        "items_per_sec": round(len(items) / best, 1),
+        "p50_us": round(statistics.median(per_item), 2),
+        "p95_us": round(_percentile(per_item, 0.95), 2),
+        "p99_us": round(_percentile(per_item, 0.99), 2),
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        stage(items)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        result["peak_mb"] = round((peak - base) / 1e6, 2)
+    return result
+
+
+def run(sizes, stages, seed=0, repeat=3, chunk=64, samples=200, memory=True, out=print):
+    results = {}
+    for n in sizes:
+        t0 = time.perf_counter()
+        inputs = _inputs(make_feed_items(n, seed=seed))
+        out(f"\nitems={n} (corpus + inputs {time.perf_counter() - t0:.1f}s)")
+        for name in stages:
+            source, stage = STAGES[name]
+            res = measure(stage, inputs[source], repeat=repeat, chunk=chunk,
+                          samples=samples, memory=memory)
+            results.setdefault(name, {})[str(n)] = res
+            out(_format_row(name, res))
+    return results
+
+
+def _format_row(name, res):
+    row = (f"  {name:17s} {res['items_per_sec']:12,.0f} items/s  "
+           f"p50={res['p50_us']:8.1f}us p95={res['p95_us']:8.1f}us p99={res['p99_us']:8.1f}us")
+    if "peak_mb" in res:
+        row += f"  peak={res['peak_mb']:8.1f} MB"
+    return row
+
+
+def compare(results, baseline, tolerance=0.1):
+    """[(stage, size, message)] for every regression beyond tolerance."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, res in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base:
+                continue
+            ratio = res["items_per_sec"] / base["items_per_sec"]
+            if ratio < 1 - tolerance:
+                regressions.append((name, size, f"throughput {ratio:.2f}x of baseline"))
+            if "peak_mb" in res and base.get("peak_mb"):
+                grew = res["peak_mb"] / base["peak_mb"]
+                if grew > 1 + tolerance and res["peak_mb"] - base["peak_mb"] > 1.0:
+                    regressions.append((name, size, f"peak memory {grew:.2f}x of baseline"))
+    return regressions
+
+
+def _meta(args):
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "chunk": args.chunk,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="1000,10000,100000",
+                    help="comma-separated corpus sizes, up to 1000000")
+    ap.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of stages")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--chunk", type=int, default=64, help="items per latency sample")
+    ap.add_argument("--samples", type=int, default=200, help="latency samples per stage")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    ap.add_argument("--save", help="write results to this JSON file")
+    ap.add_argument("--baseline", help="JSON file from --save to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.1)
+    args = ap.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(unknown)} (known: {', '.join(STAGES)})")
+
+    results = run(sizes, stages, seed=args.seed, repeat=args.repeat, chunk=args.chunk,
+                  samples=args.samples, memory=not args.no_memory)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": _meta(args), "results": results}, f, indent=2)
+        print(f"\nsaved {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        print(f"\nbaseline {args.baseline} ({baseline['meta'].get('created')}), "
+              f"tolerance {args.tolerance:.0%}")
+        for name, size, msg in regressions:
+            print(f"  REGRESSION {name} @ {size}: {msg}")
+        if not regressions:
+            print("  no regressions")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Async versions of the HTTP feed fetchers for the FastAPI app.
+
+All requests share one pooled httpx.AsyncClient: connections are kept alive
+between calls, HTTP/2 is negotiated when the optional `h2` package is
+installed, and the pool is bounded so a burst of API clients cannot open an
+unbounded number of upstream connections. Caching, revalidation and the
+item mapping are the same as in core.feeds; only the transport differs. The
+disk cache and the response parsing are blocking, so they run in worker
+threads rather than on the event loop.
+"""
+import asyncio
+import importlib.util
+import os
+import time
+
+import httpx
+
+from core import feeds, metrics
+from core.cache import cache_key
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+_client = None
+# Callers beyond the pool size wait here rather than inside httpcore, whose
+# pool scans every queued request on each state change (quadratic when
+# hundreds of API clients queue at once).
+_slots = None
+
+
+def get_client():
+    """The shared AsyncClient (created on first use in the running loop)."""
+    global _client, _slots
+    if _client is None or _client.is_closed:
+        _slots = asyncio.Semaphore(HTTP_MAX_CONNECTIONS)
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(10.0),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def aclose_client():
+    global _client, _slots
+    _slots = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _cached(source, key, parse, now):
+    """(cache meta, fresh parsed result or None) for key; blocking."""
+    meta = feeds._get_http_cache().meta(key)
+    return meta, feeds._fresh_cached(source, key, meta, parse, now)
+
+
+async def cached_fetch(source, url, parse, method="GET", headers=None, json_body=None, timeout=10):
+    """Async counterpart of feeds.cached_fetch, sharing its on-disk cache."""
+    key = cache_key(method, url, json_body)
+    now = time.time()
+    meta, parsed = await asyncio.to_thread(_cached, source, key, parse, now)
+    if parsed is not None:
+        return parsed
+
+    req_headers = feeds._revalidation_headers(headers, meta)
+    client = get_client()
+    try:
+        async with _slots:
+            t0 = time.perf_counter()
+            resp = await client.request(
+                method, url, headers=req_headers, json=json_body, timeout=timeout
+            )
+    except Exception:
+        return await asyncio.to_thread(feeds._stale_or_none, key, meta, parse)
+    metrics.observe(metrics.HTTP_SECONDS, time.perf_counter() - t0, source=source)
+    return await asyncio.to_thread(
+        feeds._store_response,
+        source, url, key, meta, parse, resp.status_code, resp.content, resp.headers, now,
+    )
+
+
+async def threatfox_iocs(limit: int = 50, days: int = 1):
+    """See feeds.threatfox_iocs; raises feeds.FeedError when upstream fails."""
+    request = feeds.threatfox_request(days)
+    if request is None:
+        return []
+    data = await cached_fetch(
+        "ThreatFox", feeds.THREATFOX_API_URL, feeds._parse_json, method="POST", timeout=20, **request
+    )
+    return feeds.threatfox_items(data, limit)
+
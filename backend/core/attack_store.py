@@ -0,0 +1,413 @@
+"""Local, indexed MITRE ATT&CK store.
+
+The enterprise-attack STIX bundle is tens of MB. Instead of loading it with
+response.json() on every call, it is streamed object by object into a small
+SQLite database (techniques keyed by T-ID, intrusion sets and relationships).
+Only objects whose `modified` timestamp changed are rewritten, and the
+download itself is skipped with If-None-Match when the bundle is unchanged.
+"""
+import codecs
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from core.cache import CACHE_DIR
+
+ATTACK_URL = (
+    "https://raw.githubusercontent.com/mitre-attack/attack-stix-data/master/"
+    "enterprise-attack/enterprise-attack.json"
+)
+ATTACK_DB_PATH = os.path.join(CACHE_DIR, "attack.sqlite3")
+
+# Re-check upstream at most this often (seconds).
+SYNC_INTERVAL = 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS techniques (
+    technique_id TEXT PRIMARY KEY,
+    stix_id      TEXT NOT NULL UNIQUE,
+    name         TEXT NOT NULL,
+    description  TEXT,
+    tactics      TEXT,
+    platforms    TEXT,
+    url          TEXT,
+    created      TEXT,
+    modified     TEXT,
+    deprecated   INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_techniques_modified ON techniques(modified);
+
+CREATE TABLE IF NOT EXISTS intrusion_sets (
+    stix_id     TEXT PRIMARY KEY,
+    group_id    TEXT,
+    name        TEXT NOT NULL,
+    aliases     TEXT,
+    description TEXT,
+    created     TEXT,
+    modified    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_intrusion_sets_name ON intrusion_sets(name);
+
+CREATE TABLE IF NOT EXISTS relationships (
+    stix_id           TEXT PRIMARY KEY,
+    relationship_type TEXT,
+    source_ref        TEXT,
+    target_ref        TEXT,
+    modified          TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_relationships_source ON relationships(source_ref);
+CREATE INDEX IF NOT EXISTS idx_relationships_target ON relationships(target_ref);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_OBJECTS_KEY = re.compile(r'"objects"\s*:\s*\[')
+
+
+def iter_stix_objects(chunks):
+    """Yield the objects of a STIX bundle from an iterable of byte chunks.
+
+    Only the current object (plus one read chunk) is kept in memory; each
+    element of the top-level "objects" array is decoded on its own with
+    JSONDecoder.raw_decode.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    in_objects = False
+    chunks = iter(chunks)
+    eof = False
+
+    def more():
+        nonlocal buf, pos, eof
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            eof = True
+            buf = buf[pos:] + utf8.decode(b"", final=True)
+            pos = 0
+            return
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+
+    while True:
+        if not in_objects:
+            m = _OBJECTS_KEY.search(buf, pos)
+            if m is None:
+                if eof:
+                    return
+                # keep a short tail in case the key straddles two chunks
+                pos = max(pos, len(buf) - 32)
+                more()
+                continue
+            pos = m.end()
+            in_objects = True
+
+        # skip separators between array elements
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            more()
+            continue
+        if buf[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            more()
+            continue
+        pos = end
+        yield obj
+
+
+def _external_id(obj, prefix):
+    for ref in obj.get("external_references", []):
+        if ref.get("source_name") != "mitre-attack":
+            continue
+        ext_id = ref.get("external_id") or ""
+        if ext_id.startswith(prefix):
+            return ext_id, ref.get("url")
+    return None, None
+
+
+class AttackStore:
+    def __init__(self, path=ATTACK_DB_PATH):
+        self.path = path
+        self._sync_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------- metadata ----------
+
+    def _get_meta(self, conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, conn, key, value):
+        conn.execute(
+            "INSERT INTO meta(key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
+
+    def last_sync(self):
+        with self._connect() as conn:
+            value = self._get_meta(conn, "synced_at")
+        return float(value) if value else 0.0
+
+    # ---------- ingestion ----------
+
+    def ingest(self, objects, batch_size=500):
+        """Upsert STIX objects; rows are only rewritten when `modified` changed.
+
+        Returns the number of rows inserted or updated.
+        """
+        techniques, groups, rels = [], [], []
+        changed = 0
+        with self._connect() as conn:
+            before = conn.total_changes
+            for obj in objects:
+                kind = obj.get("type")
+                if kind == "attack-pattern":
+                    tid, url = _external_id(obj, "T")
+                    if not tid:
+                        continue
+                    phases = [
+                        p.get("phase_name")
+                        for p in obj.get("kill_chain_phases", [])
+                        if p.get("kill_chain_name") == "mitre-attack"
+                    ]
+                    techniques.append((
+                        tid,
+                        obj.get("id"),
+                        obj.get("name", ""),
+                        obj.get("description", ""),
+                        json.dumps(phases),
+                        json.dumps(obj.get("x_mitre_platforms", [])),
+                        url,
+                        obj.get("created"),
+                        obj.get("modified") or obj.get("created"),
+                        int(bool(obj.get("revoked") or obj.get("x_mitre_deprecated"))),
+                    ))
+                elif kind == "intrusion-set":
+                    gid, _ = _external_id(obj, "G")
+                    groups.append((
+                        obj.get("id"),
+                        gid,
+                        obj.get("name", ""),
+                        json.dumps(obj.get("aliases", [])),
+                        obj.get("description", ""),
+                        obj.get("created"),
+                        obj.get("modified") or obj.get("created"),
+                    ))
+                elif kind == "relationship":
+                    rels.append((
+                        obj.get("id"),
+                        obj.get("relationship_type"),
+                        obj.get("source_ref"),
+                        obj.get("target_ref"),
+                        obj.get("modified") or obj.get("created"),
+                    ))
+
+                if len(techniques) + len(groups) + len(rels) >= batch_size:
+                    self._flush(conn, techniques, groups, rels)
+                    techniques, groups, rels = [], [], []
+
+            self._flush(conn, techniques, groups, rels)
+            changed = conn.total_changes - before
+        return changed
+
+    def _flush(self, conn, techniques, groups, rels):
+        if techniques:
+            conn.executemany(
+                """
+                INSERT INTO techniques(technique_id, stix_id, name, description,
+                    tactics, platforms, url, created, modified, deprecated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(technique_id) DO UPDATE SET
+                    stix_id = excluded.stix_id,
+                    name = excluded.name,
+                    description = excluded.description,
+                    tactics = excluded.tactics,
+                    platforms = excluded.platforms,
+                    url = excluded.url,
+                    created = excluded.created,
+                    modified = excluded.modified,
+                    deprecated = excluded.deprecated
+                WHERE excluded.modified IS NOT techniques.modified
+                """,
+                techniques,
+            )
+        if groups:
+            conn.executemany(
+                """
+                INSERT INTO intrusion_sets(stix_id, group_id, name, aliases,
+                    description, created, modified)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(stix_id) DO UPDATE SET
+                    group_id = excluded.group_id,
+                    name = excluded.name,
+                    aliases = excluded.aliases,
+                    description = excluded.description,
+                    created = excluded.created,
+                    modified = excluded.modified
+                WHERE excluded.modified IS NOT intrusion_sets.modified
+                """,
+                groups,
+            )
+        if rels:
+            conn.executemany(
+                """
+                INSERT INTO relationships(stix_id, relationship_type,
+                    source_ref, target_ref, modified)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(stix_id) DO UPDATE SET
+                    relationship_type = excluded.relationship_type,
+                    source_ref = excluded.source_ref,
+                    target_ref = excluded.target_ref,
+                    modified = excluded.modified
+                WHERE excluded.modified IS NOT relationships.modified
+                """,
+                rels,
+            )
+
+    def sync(self, url=ATTACK_URL, timeout=60):
+        """Stream the upstream bundle into the store.
+
+        Sends If-None-Match / If-Modified-Since from the previous sync, so an
+        unchanged bundle is not downloaded at all. Returns the number of
+        changed rows, 0 on 304, or None when upstream could not be reached.
+        """
+        with self._sync_lock:
+            with self._connect() as conn:
+                etag = self._get_meta(conn, "etag")
+                last_modified = self._get_meta(conn, "last_modified")
+
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+            try:
+                resp = requests.get(url, headers=headers, stream=True, timeout=timeout)
+            except Exception:
+                return None
+
+            try:
+                if resp.status_code == 304:
+                    changed = 0
+                elif resp.status_code == 200:
+                    changed = self.ingest(
+                        iter_stix_objects(resp.iter_content(chunk_size=1 << 16))
+                    )
+                else:
+                    return None
+            except Exception:
+                return None
+            finally:
+                resp.close()
+
+            with self._connect() as conn:
+                if resp.status_code == 200:
+                    self._set_meta(conn, "etag", resp.headers.get("ETag") or "")
+                    self._set_meta(
+                        conn, "last_modified", resp.headers.get("Last-Modified") or ""
+                    )
+                self._set_meta(conn, "synced_at", str(time.time()))
+            return changed
+
+    def sync_if_stale(self, max_age=SYNC_INTERVAL):
+        if time.time() - self.last_sync() >= max_age:
+            return self.sync()
+        return 0
+
+    # ---------- queries ----------
+
+    @staticmethod
+    def _technique(row):
+        out = dict(row)
+        out["tactics"] = json.loads(out.get("tactics") or "[]")
+        out["platforms"] = json.loads(out.get("platforms") or "[]")
+        out["deprecated"] = bool(out.get("deprecated"))
+        return out
+
+    def get_technique(self, technique_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM techniques WHERE technique_id = ?",
+                (technique_id.upper(),),
+            ).fetchone()
+        return self._technique(row) if row else None
+
+    def recent_techniques(self, limit=20, include_deprecated=False):
+        sql = "SELECT * FROM techniques"
+        if not include_deprecated:
+            sql += " WHERE deprecated = 0"
+        sql += " ORDER BY modified DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(sql, (limit,)).fetchall()
+        return [self._technique(r) for r in rows]
+
+    def groups_using(self, technique_id):
+        """Intrusion sets with a 'uses' relationship to the technique."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT g.* FROM techniques t
+                JOIN relationships r ON r.target_ref = t.stix_id
+                    AND r.relationship_type = 'uses'
+                JOIN intrusion_sets g ON g.stix_id = r.source_ref
+                WHERE t.technique_id = ?
+                ORDER BY g.name
+                """,
+                (technique_id.upper(),),
+            ).fetchall()
+        out = []
+        for r in rows:
+            g = dict(r)
+            g["aliases"] = json.loads(g.get("aliases") or "[]")
+            out.append(g)
+        return out
+
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM techniques").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AttackStore()
+        return _store
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+# Root for every on-disk cache used by the dashboard (HTTP bodies, stores, ...).
+# Override with THREAT_INTEL_CACHE_DIR, e.g. to share it between processes.
+CACHE_DIR = os.getenv(
+    "THREAT_INTEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache"),
+)
+
+
+def cache_key(*parts) -> str:
+    """Stable hex key for any JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Small size-bounded key/value store on disk with LRU eviction.
+
+    Every entry is a body file plus a JSON metadata file. Access time is
+    tracked through the body file's mtime, so a read is one utime() call and
+    eviction only needs a directory scan when the size budget is exceeded.
+    Writes go through a temp file + os.replace so readers never see partial
+    entries, even from another process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # lazily computed total size of bodies
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".meta"
+
+    def meta(self, key):
+        """Return the metadata dict for key, or None if missing/corrupt."""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(body_path):
+            return None
+        return meta
+
+    def read(self, key):
+        """Return the cached body bytes (and mark it recently used), or None."""
+        body_path, _ = self._paths(key)
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        self.touch(key)
+        return body
+
+    def touch(self, key):
+        body_path, _ = self._paths(key)
+        try:
+            os.utime(body_path, None)
+        except OSError:
+            pass
+
+    def set(self, key, body: bytes, meta: dict):
+        body_path, meta_path = self._paths(key)
+        old_size = self._file_size(body_path)
+        meta = dict(meta)
+        meta.setdefault("stored_at", time.time())
+        self._atomic_write(body_path, body)
+        self.set_meta(key, meta)
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body) - old_size
+        self._maybe_evict()
+
+    def set_meta(self, key, meta: dict):
+        _, meta_path = self._paths(key)
+        self._atomic_write(
+            meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        )
+
+    def delete(self, key):
+        body_path, meta_path = self._paths(key)
+        size = self._file_size(body_path)
+        for path in (body_path, meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _atomic_write(self, path, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".body"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name[: -len(".body")]))
+        return entries
+
+    def _maybe_evict(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            if self._size <= self.max_bytes:
+                return
+            # Least recently used first
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                for suffix in (".body", ".meta"):
+                    try:
+                        os.remove(os.path.join(self.directory, key + suffix))
+                    except OSError:
+                        pass
+                total -= size
+            self._size = total
+
+    def purge(self, max_age):
+        """Delete entries stored more than max_age seconds ago."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".meta"):
+                continue
+            try:
+                stored = os.path.getmtime(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            if stored < cutoff:
+                self.delete(name[: -len(".meta")])
+                removed += 1
+        return removed
+
+    def age(self, key):
+        """Seconds since the entry was stored, or None if missing."""
+        meta = self.meta(key)
+        if not meta:
+            return None
+        return time.time() - meta.get("stored_at", 0)
+
+
+class AsyncSingleFlightCache:
+    """In-memory keyed cache with TTL, background refresh and single-flight loads.
+
+    get(key) awaits loader(*key) at most once at a time per key:
+
+    * fresh entry   returned as is
+    * stale entry   returned immediately; one background task reloads it
+    * no entry      the first caller starts the load, concurrent callers await it
+
+    When a reload fails the last good value keeps being served and the
+    reload is retried after retry_after seconds at the earliest. Only a miss
+    with a failing loader raises, and every caller awaiting that load gets
+    the same exception. Loads run as tasks, so a client that disconnects
+    while waiting on a miss does not cancel the load other clients are
+    waiting on.
+    """
+
+    def __init__(self, loader, ttl, max_entries=64, retry_after=None):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.retry_after = min(ttl, 30) if retry_after is None else retry_after
+        self._failed_at = {}
+        self._entries = {}  # key -> (value, loaded_at); insertion order = LRU
+        self._flights = {}  # key -> asyncio.Task of the load in progress
+
+    async def get(self, key):
+        """Return (value, age in seconds, "hit" | "stale" | "miss")."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = self._entries.pop(key)
+            age = time.time() - entry[1]
+            if age <= self.ttl:
+                return entry[0], age, "hit"
+            retry_at = self._failed_at.get(key, 0) + self.retry_after
+            if key not in self._flights and time.time() >= retry_at:
+                self._start(key)
+            return entry[0], age, "stale"
+        task = self._flights.get(key) or self._start(key)
+        value = await asyncio.shield(task)
+        return value, 0.0, "miss"
+
+    def _start(self, key):
+        task = self._flights[key] = asyncio.ensure_future(self._load(key))
+        task.add_done_callback(_log_failure)
+        return task
+
+    async def _load(self, key):
+        try:
+            value = await self._loader(*key)
+        except Exception:
+            self._failed_at[key] = time.time()
+            raise
+        finally:
+            self._flights.pop(key, None)
+        self._failed_at.pop(key, None)
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.time())
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        return value
+
+
+def _log_failure(task):
+    # also marks the exception as retrieved when nobody awaited the task
+    if not task.cancelled() and task.exception() is not None:
+        print("Cache load failed:", task.exception())
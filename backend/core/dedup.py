@@ -0,0 +1,502 @@
+"""Near-duplicate detection with shingling + MinHash + LSH banding.
+
+Every text is reduced to a set of character shingles, hashed into a MinHash
+signature and split into bands; texts sharing any band bucket are candidates
+and are confirmed when their estimated Jaccard similarity reaches the
+threshold. Confirmed pairs are merged into clusters (union-find), so the
+ranker can use the size of an item's cluster as its duplication feature.
+
+Signatures are one-permutation MinHash: every shingle is hashed once into
+one of num_perm bins, each bin keeps its minimum, and empty bins borrow the
+value of another bin (optimal densification). That is one hash per shingle
+instead of num_perm, and NearDuplicateIndex.signatures() computes a whole
+batch of texts in a few NumPy passes over their concatenated bytes.
+
+The index is incremental: add() checks a new text only against the texts in
+its candidate buckets, not against the whole history. cluster_items() on a
+batch of its own bands the whole signature matrix at once instead
+(NearDuplicateIndex.components()).
+"""
+import itertools
+import re
+
+import numpy as np
+
+_SHINGLE_BASE = np.uint64(1099511628211)  # FNV-64 prime
+_MAX_HASH = np.uint64(0xFFFFFFFFFFFFFFFF)
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_SEP = "\x01"  # joins texts in normalized_bytes()
+
+# Bump when signatures change, so persisted ones (core.rank_index) are dropped
+SIGNATURE_VERSION = 1
+# texts per NumPy pass in signatures(); bounds the shingle arrays held at once
+SIGNATURE_CHUNK = 4096
+# pairs compared per NumPy pass in components()
+PAIR_CHUNK = 65536
+
+# Sources whose items are single indicators, not stories (see item_text())
+DEDUP_SKIP_SOURCES = frozenset({"ThreatFox"})
+
+
+def normalize_text(text):
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def shingles(text, k=5):
+    """Unique 64-bit hashes of the character k-grams of normalized text."""
+    data = np.frombuffer(normalize_text(text).encode("utf-8"), dtype=np.uint8)
+    if data.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if data.size <= k:
+        k = data.size
+    # polynomial rolling hash of every k-gram, vectorized (wraps mod 2**64)
+    h = np.zeros(data.size - k + 1, dtype=np.uint64)
+    for j in range(k):
+        h = h * _SHINGLE_BASE + data[j : data.size - k + 1 + j].astype(np.uint64)
+    return np.unique(h)
+
+
+def normalized_bytes(texts):
+    """(uint8 array, lengths): normalize_text() of every text, concatenated.
+
+    Lower-cases the joined texts once and collapses non-word runs with array
+    operations instead of one regex call per text.
+    """
+    texts = [t or "" for t in texts]
+    if not texts:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64)
+    joined = _SEP.join(texts).lower()
+    if joined.count(_SEP) != max(len(texts) - 1, 0):  # a text contains the separator
+        norm = [normalize_text(t) for t in texts]
+        lens = np.fromiter(map(len, norm), dtype=np.int64, count=len(norm))
+        return np.frombuffer("".join(norm).encode("ascii"), dtype=np.uint8), lens
+    # every non-ASCII character becomes one "?", a non-word byte like itself
+    raw = np.frombuffer(joined.encode("ascii", "replace"), dtype=np.uint8)
+    n = raw.size
+    sep = raw == 1
+    word = ((raw >= 48) & (raw <= 57)) | ((raw >= 97) & (raw <= 122))
+    gap = ~(word | sep)
+    # a non-word run becomes one space if it has a word byte on both sides
+    pos = np.arange(n)
+    next_solid = np.minimum.accumulate(np.where(gap, n, pos)[::-1])[::-1]
+    followed = np.zeros(n, dtype=bool)
+    inside = next_solid < n
+    followed[inside] = word[next_solid[inside]]
+    preceded = np.zeros(n, dtype=bool)
+    preceded[1:] = word[:-1]
+    space = gap & preceded & followed
+    out = np.where(space, np.uint8(32), raw)[word | sep | space]
+    seps = np.flatnonzero(out == 1)
+    lens = np.diff(np.concatenate(([-1], seps, [out.size]))) - 1
+    return out[out != 1], lens
+
+
+def shingle_hashes(data, lens, k=5):
+    """(hashes, counts): shingles() of each text in normalized_bytes() output.
+
+    Hashes are concatenated in text order and not deduplicated; counts[i] is
+    the number that belong to text i.
+    """
+    ends = np.cumsum(lens)
+    counts = np.where(lens >= k, lens - k + 1, np.minimum(lens, 1))
+    if data.size >= k:
+        h = data[: data.size - k + 1].astype(np.uint64)
+        for j in range(1, k):
+            h *= _SHINGLE_BASE
+            h += data[j : data.size - k + 1 + j]
+        # k-grams running past the end of their text
+        valid = np.ones(h.size, dtype=bool)
+        bad = (ends[:, None] - np.arange(1, k)).ravel()
+        valid[bad[(bad >= 0) & (bad < h.size)]] = False
+        h = h[valid]
+    else:
+        h = np.zeros(0, dtype=np.uint64)
+    short = np.flatnonzero((lens > 0) & (lens < k))
+    if short.size:
+        # texts shorter than k are one shingle of their own length
+        values = np.zeros(short.size, dtype=np.uint64)
+        for j in range(int(lens[short].max())):
+            more = lens[short] > j
+            values[more] = values[more] * _SHINGLE_BASE + data[(ends - lens)[short][more] + j]
+        before = np.cumsum(np.where(lens >= k, counts, 0)) - np.where(lens >= k, counts, 0)
+        h = np.insert(h, before[short], values)
+    return h, counts
+
+
+def _mix(x):
+    """MurmurHash3 finalizer over a uint64 array (wraps mod 2**64)."""
+    x = x ^ (x >> np.uint64(33))
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xC4CEB9FE1A85EC53)
+    x ^= x >> np.uint64(33)
+    return x
+
+
+def optimal_bands(threshold, num_perm):
+    """(bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        err = abs(midpoint - threshold)
+        if best is None or err < best[0]:
+            best = (err, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index with union-find clusters.
+
+    threshold   estimated Jaccard similarity at which two texts are duplicates
+    num_perm    MinHash signature length (accuracy vs. speed)
+    shingle_k   character shingle length
+    """
+
+    def __init__(self, threshold=0.5, num_perm=128, shingle_k=5, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_k = shingle_k
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._salt = rng.randint(0, 2**63 - 1, dtype=np.uint64)
+        self._probe_salt = rng.randint(0, 2**63 - 1, dtype=np.uint64)
+        self._buckets = [dict() for _ in range(self.bands)]
+        self._signatures = {}  # doc id -> signature
+        self._parent = {}
+        self._size = {}
+        self._anonymous = itertools.count()
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def anonymous_key(self):
+        """A fresh doc id for an item without one; never repeats in this index."""
+        return ("anon", next(self._anonymous))
+
+    def __contains__(self, doc_id):
+        return doc_id in self._signatures
+
+    def signature(self, text):
+        return self.signatures([text])[0]
+
+    def signatures(self, texts):
+        """MinHash signatures of texts as a (len(texts), num_perm) uint64 matrix.
+
+        Texts without any shingle get an all-_MAX_HASH signature.
+        """
+        out = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(texts), SIGNATURE_CHUNK):
+            chunk = texts[start : start + SIGNATURE_CHUNK]
+            x, counts = shingle_hashes(*normalized_bytes(chunk), self.shingle_k)
+            if not x.size:
+                continue
+            sig = out[start : start + len(chunk)]
+            y = _mix(x ^ self._salt)
+            cells = np.repeat(np.arange(len(chunk)) * self.num_perm, counts)
+            cells += (y % np.uint64(self.num_perm)).astype(np.intp)
+            np.minimum.at(sig.reshape(-1), cells, y)
+            self._densify(sig)
+        return out
+
+    def _densify(self, sig):
+        """Fill the empty bins of signatures in place (optimal densification).
+
+        Empty bin j takes the value of the first non-empty bin along a probe
+        sequence that depends only on j, so texts with the same shingles in
+        that bin fill it alike.
+        """
+        filled = sig != _MAX_HASH
+        rows, bins = np.nonzero(~filled & filled.any(axis=1)[:, None])
+        attempt = 0
+        while rows.size:
+            attempt += 1
+            probe = _mix(bins.astype(np.uint64) * np.uint64(self.num_perm + 1)
+                         + np.uint64(attempt) + self._probe_salt)
+            probe = (probe % np.uint64(self.num_perm)).astype(np.intp)
+            hit = filled[rows, probe]
+            sig[rows[hit], bins[hit]] = sig[rows[hit], probe[hit]]
+            rows, bins = rows[~hit], bins[~hit]
+
+    def signature_of(self, doc_id):
+        """Stored signature of an indexed doc id."""
+        return self._signatures[doc_id]
+
+    def _band_keys(self, sig):
+        r = self.rows
+        return [sig[i * r : (i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def similarity(self, sig_a, sig_b):
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.count_nonzero(sig_a == sig_b)) / self.num_perm
+
+    def candidates(self, sig, keys=None):
+        found = set()
+        for band, key in zip(self._buckets, keys or self._band_keys(sig)):
+            found.update(band.get(key, ()))
+        return found
+
+    def query(self, text):
+        """Doc ids whose estimated similarity to text reaches the threshold."""
+        return self.query_signature(self.signature(text))
+
+    def query_signature(self, sig):
+        return [
+            doc_id
+            for doc_id in self.candidates(sig)
+            if self.similarity(sig, self._signatures[doc_id]) >= self.threshold
+        ]
+
+    def add(self, doc_id, text):
+        """Index text under doc_id and return its cluster id.
+
+        Re-adding a known id is a no-op.
+        """
+        if doc_id in self._signatures:
+            return self.cluster_of(doc_id)
+        return self.add_signature(doc_id, self.signature(text))
+
+    def add_signature(self, doc_id, sig):
+        """add() for a signature from signature() of an index with the same seed.
+
+        Candidates are compared until one member of their cluster matches;
+        the rest of that cluster is skipped, as it is joined either way.
+        """
+        keys = self._band_keys(sig)
+        matched = set()  # roots of the clusters sig joins
+        for other in self.candidates(sig, keys):
+            root = self._find(other)
+            if root not in matched and self.similarity(sig, self._signatures[other]) >= self.threshold:
+                matched.add(root)
+        self._signatures[doc_id] = sig
+        self._parent[doc_id] = doc_id
+        self._size[doc_id] = 1
+        for band, key in zip(self._buckets, keys):
+            band.setdefault(key, []).append(doc_id)
+        for root in matched:
+            self._union(doc_id, root)
+        return self.cluster_of(doc_id)
+
+    def band_hashes(self, sigs):
+        """(len(sigs), bands) uint64 matrix: one hash per LSH band of each signature.
+
+        Rows that share a band hash share that band (up to 64-bit collisions).
+        The band number is hashed in, so hashes of different bands differ.
+        """
+        keys = np.empty((len(sigs), self.bands), dtype=np.uint64)
+        for band in range(self.bands):
+            block = sigs[:, band * self.rows : (band + 1) * self.rows]
+            key = np.full(len(sigs), band, dtype=np.uint64)
+            for col in range(self.rows):
+                key = _mix(key ^ block[:, col])
+            keys[:, band] = key
+        return keys
+
+    def components(self, sigs):
+        """Near-duplicate clusters of the rows of a signature matrix, in one batch.
+
+        Returns, for every row, the index of the first row of its cluster.
+        Every band of the whole matrix is bucketed at once, and each row is
+        compared only with the first row of each bucket it lands in, not
+        with every candidate. Does not touch the index.
+        """
+        n = len(sigs)
+        if n == 0:
+            return np.zeros(0, dtype=np.intp)
+        keys = self.band_hashes(sigs)
+        first_a, first_b = [], []
+        for band in range(self.bands):
+            key = keys[:, band]
+            order = np.argsort(key, kind="stable")
+            sorted_key = key[order]
+            starts = np.ones(n, dtype=bool)
+            starts[1:] = sorted_key[1:] != sorted_key[:-1]
+            # bucket representative: its first row (stable sort keeps row order)
+            head = order[np.maximum.accumulate(np.where(starts, np.arange(n), 0))]
+            paired = head != order
+            first_a.append(order[paired])
+            first_b.append(head[paired])
+        pairs = np.unique(np.concatenate(first_a).astype(np.int64) * n + np.concatenate(first_b))
+        a, b = pairs // n, pairs % n
+        confirmed = np.zeros(pairs.size, dtype=bool)
+        for i in range(0, pairs.size, PAIR_CHUNK):
+            same = np.count_nonzero(sigs[a[i : i + PAIR_CHUNK]] == sigs[b[i : i + PAIR_CHUNK]], axis=1)
+            confirmed[i : i + PAIR_CHUNK] = same >= self.threshold * self.num_perm
+        a, b = a[confirmed], b[confirmed]
+        # connected components: min-label propagation with pointer jumping
+        labels = np.arange(n)
+        while a.size:
+            la, lb = labels[a], labels[b]
+            if np.array_equal(la, lb):
+                break
+            low = np.minimum(la, lb)
+            np.minimum.at(labels, a, low)
+            np.minimum.at(labels, b, low)
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+        return labels
+
+    def _find(self, doc_id):
+        parent = self._parent
+        root = doc_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[doc_id] != root:  # path compression
+            parent[doc_id], doc_id = root, parent[doc_id]
+        return root
+
+    def _union(self, a, b):
+        ra, rb = self._find(a), self._find(b)
+        if ra == rb:
+            return
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size.pop(rb)
+
+    def cluster_of(self, doc_id):
+        return self._find(doc_id)
+
+    def cluster_size(self, doc_id):
+        return self._size[self._find(doc_id)]
+
+    def clusters(self):
+        """{cluster id: [doc ids]} for every cluster."""
+        out = {}
+        for doc_id in self._signatures:
+            out.setdefault(self._find(doc_id), []).append(doc_id)
+        return out
+
+
+class WindowedDuplicateIndex:
+    """Near-duplicate index over the last `window` documents only.
+
+    Used by the streaming pipeline, where keeping every signature of a long
+    backfill would make memory grow with the corpus. Documents go into the
+    current NearDuplicateIndex; once it holds window/2 of them it becomes the
+    previous generation and a fresh one is started, so between window/2 and
+    `window` documents are remembered at any time.
+
+    A document's cluster size is its cluster in its own generation plus the
+    number of documents in the other generation it matched, in either
+    direction (those are counted, not merged). Memory is bounded by the window;
+    duplicates further apart than that are not counted, which matters little
+    for stories that are republished within days of each other.
+
+    Has the anonymous_key()/signatures()/add_signature()/cluster_of()/
+    cluster_size() subset of NearDuplicateIndex that cluster_items() uses.
+    """
+
+    def __init__(self, window=4000, threshold=0.5, num_perm=128, shingle_k=5, seed=1):
+        self.window = max(int(window), 2)
+        self._params = dict(threshold=threshold, num_perm=num_perm, shingle_k=shingle_k, seed=seed)
+        self._current = NearDuplicateIndex(**self._params)
+        self._matched = {}  # doc id -> previous-generation matches
+        self._previous = None
+        self._previous_matched = {}
+        self._anonymous = itertools.count()  # shared by both generations
+
+    def __len__(self):
+        return len(self._current) + (len(self._previous) if self._previous is not None else 0)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._current or (self._previous is not None and doc_id in self._previous)
+
+    def _generation(self, doc_id):
+        if doc_id in self._current:
+            return self._current, self._matched
+        if self._previous is not None and doc_id in self._previous:
+            return self._previous, self._previous_matched
+        raise KeyError(doc_id)
+
+    def anonymous_key(self):
+        return ("anon", next(self._anonymous))
+
+    def signatures(self, texts):
+        return self._current.signatures(texts)
+
+    def add(self, doc_id, text):
+        if doc_id in self:
+            return self.cluster_of(doc_id)
+        return self.add_signature(doc_id, self._current.signature(text))
+
+    def add_signature(self, doc_id, sig):
+        if len(self._current) >= self.window // 2:
+            self._previous, self._previous_matched = self._current, self._matched
+            self._current, self._matched = NearDuplicateIndex(**self._params), {}
+        if self._previous is not None:
+            hits = self._previous.query_signature(sig)
+            if hits:
+                self._matched[doc_id] = len(hits)
+                for other in hits:
+                    self._previous_matched[other] = self._previous_matched.get(other, 0) + 1
+        return self._current.add_signature(doc_id, sig)
+
+    def cluster_of(self, doc_id):
+        return self._generation(doc_id)[0].cluster_of(doc_id)
+
+    def cluster_size(self, doc_id):
+        index, matched = self._generation(doc_id)
+        return index.cluster_size(doc_id) + matched.get(doc_id, 0)
+
+
+def item_text(item, summary_chars=200):
+    """Text used to compare two threat items, or None if the item is never a duplicate.
+
+    Items from DEDUP_SKIP_SOURCES are single indicators whose summary is a
+    boilerplate threat description shared by every row of that type; on that
+    text they would all land in one cluster and get the full duplication bonus.
+    """
+    if item.get("source") in DEDUP_SKIP_SOURCES:
+        return None
+    return f"{item.get('title', '')} {(item.get('summary') or '')[:summary_chars]}"
+
+
+def cluster_items(items, index=None, threshold=0.5):
+    """Near-duplicate clusters of items.
+
+    Without an index the items are clustered among themselves in one batch
+    (NearDuplicateIndex.components()). With one (a NearDuplicateIndex or a
+    WindowedDuplicateIndex) they are added to it and clustered against
+    everything it holds. Signatures are computed for all items in one pass
+    either way.
+
+    Items without an id get a fresh key from index.anonymous_key(), so
+    they never collide with items of earlier batches.
+
+    Returns (cluster ids, cluster sizes) as lists aligned with items.
+    """
+    batch = index is None
+    if batch:
+        index = NearDuplicateIndex(threshold=threshold)
+    keys, texts, rows = [], [], {}
+    for it in items:
+        key = it.get("id")
+        if key is None:
+            key = index.anonymous_key()
+        keys.append(key)
+        text = item_text(it)
+        if text is not None and key not in rows:
+            rows[key] = len(texts)
+            texts.append(text)
+
+    if batch:
+        labels = index.components(index.signatures(texts))
+        sizes = np.bincount(labels, minlength=len(labels))
+        heads = list(rows)  # row -> key
+        # items left out of the index are clusters of their own
+        cluster_ids = [heads[labels[rows[k]]] if k in rows else k for k in keys]
+        cluster_sizes = [int(sizes[labels[rows[k]]]) if k in rows else 1 for k in keys]
+        return cluster_ids, cluster_sizes
+
+    new = [key for key in rows if key not in index]
+    for key, sig in zip(new, index.signatures([texts[rows[key]] for key in new])):
+        index.add_signature(key, sig)
+    cluster_ids = [index.cluster_of(k) if k in rows else k for k in keys]
+    sizes = [index.cluster_size(k) if k in rows else 1 for k in keys]
+    return cluster_ids, sizes
@@ -1,11 +1,180 @@
+import ipaddress
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from core import metrics
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Sources whose text is reference material rather than reporting (ATT&CK
+# descriptions link to attack.mitre.org everywhere), so no IOCs are taken.
+IOC_SKIP_SOURCES = {"MITRE ATT&CK"}
+
+# Sources whose collector already fills item['iocs'] from structured data.
+# Their titles are the indicator itself, so extracting again only adds
+# variants of it (the bare IP of an ip:port, the host of a URL).
+STRUCTURED_IOC_SOURCES = {"ThreatFox"}
+
+# Real TLDs that are far more often file extensions in advisory text
+# ("update.zip", "README.md", "exploit.py").
+FILE_EXTENSION_TLDS = {"zip", "mov", "md", "py", "sh", "rs", "pm", "ps", "so"}
+
+# Batches smaller than this are extracted in-process
+PARALLEL_MIN_DOCS = 2000
+
+
+def _load_tlds(path=os.path.join(_DATA_DIR, "tlds.txt")):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            tlds = {line.strip().lower() for line in f if line.strip() and not line.startswith("#")}
+    except OSError:
+        tlds = {"com", "net", "org", "info", "biz", "io", "ru", "cn", "top", "xyz"}
+    return frozenset(tlds - FILE_EXTENSION_TLDS)
+
+
+TLDS = _load_tlds()
+
+# Defanged notation -> plain text
+_REFANG = re.compile(r"hxxps?|\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)|\[:\]|\[://\]|\[@\]", re.I)
+_REFANG_MAP = {
+    "[.]": ".", "(.)": ".", "{.}": ".", "[dot]": ".", "(dot)": ".",
+    "[:]": ":", "[://]": "://", "[@]": "@",
+}
+
+# One scan per document. The regex only finds candidates cheaply (URLs,
+# hex runs of hash length, and dotted/colon-separated tokens); deciding
+# whether a token is an IPv4, IPv6, host:port or domain is done in Python,
+# which is much faster than a regex alternative per indicator type.
+IOC_PATTERN = re.compile(
+    r"(?<![\w-])(?:"
+    r"(?P<url>(?:https?|ftp)://[^\s<>\"'`]+)"
+    r"|(?P<hash>(?:[0-9a-f]{64}|[0-9a-f]{40}|[0-9a-f]{32})(?![\w-]))"
+    r"|(?P<token>[\w-]+(?:[.:]+[\w-]+)+)"
+    r")",
+    re.I,
+)
+_DOMAIN = re.compile(r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z][a-z0-9-]{1,62}")
+
+_URL_TRAILING = ".,;:!?)]}'\""
+
+def refang(text):
+    """Undo common defanging: hxxp://, evil[.]com, 1.2.3[.]4, user[@]host."""
+    def repl(m):
+        tok = m.group(0)
+        low = tok.lower()
+        if low.startswith("hxxp"):
+            return "http" + tok[4:]
+        return _REFANG_MAP.get(low, tok)
+    return _REFANG.sub(repl, text)
+
+
+def _valid_ipv4(value):
+    parts = value.split(".")
+    return len(parts) == 4 and all(
+        p.isdigit() and int(p) <= 255 and (p == "0" or not p.startswith("0")) for p in parts
+    )
+
+
+def _valid_ipv6(value):
+    if value.count(":") < 2:
+        return False
+    try:
+        ip = ipaddress.IPv6Address(value)
+    except ValueError:
+        return False
+    return not ip.is_unspecified
+
+
+def _valid_domain(value):
+    value = value.lower()
+    return value.rsplit(".", 1)[-1] in TLDS and _DOMAIN.fullmatch(value) is not None
+
+
+def _add_host(host, out):
+    """Classify a bare host (URL host, token, host:port) into ips/domains."""
+    if not host:
+        return
+    if ":" in host:
+        if host.count(":") == 1:
+            host, port = host.split(":")
+            if port.isdigit():
+                _add_host(host, out)
+        elif _valid_ipv6(host):
+            out["ips"].setdefault(host.lower(), None)
+    elif host[-1].isdigit():
+        if _valid_ipv4(host):
+            out["ips"].setdefault(host, None)
+    elif _valid_domain(host):
+        out["domains"].setdefault(host.lower(), None)
 
-IOC_IP = re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")
-IOC_DOMAIN = re.compile(r"\b[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b")
-IOC_URL = re.compile(r"https?://[^\s]+" )
 
 def extract_iocs(text):
-    ips = IOC_IP.findall(text or "")
-    doms = [d for d in IOC_DOMAIN.findall(text or "") if not d.replace('.', '').isdigit()]
-    urls = IOC_URL.findall(text or "")
-    return {"ips": list(set(ips)), "domains": list(set(doms)), "urls": list(set(urls))}
+    """Single-pass IOC extraction with refanging and validation.
+
+    Returns {"ips", "domains", "urls", "hashes"} as de-duplicated lists in
+    order of first appearance. IPv4 and IPv6 addresses both go to "ips";
+    domains must end in a known TLD; hosts of URLs are reported as well.
+    """
+    # insertion-ordered dicts used as ordered sets
+    out = {"ips": {}, "domains": {}, "urls": {}, "hashes": {}}
+    if not text:
+        return {k: [] for k in out}
+    for m in IOC_PATTERN.finditer(refang(text)):
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "token":
+            _add_host(value, out)
+        elif kind == "hash":
+            out["hashes"].setdefault(value.lower(), None)
+        else:
+            value = value.rstrip(_URL_TRAILING)
+            out["urls"].setdefault(value, None)
+            try:
+                _add_host(urlsplit(value).hostname, out)
+            except ValueError:
+                pass
+    return {k: list(v) for k, v in out.items()}
+
+
+def _extract_chunk(texts):
+    return [extract_iocs(t) for t in texts]
+
+
+def extract_iocs_batch(texts, workers=None, chunksize=256):
+    """extract_iocs() over many documents, on a process pool for large batches."""
+    texts = list(texts)
+    if workers == 1 or len(texts) < PARALLEL_MIN_DOCS:
+        return _extract_chunk(texts)
+    chunks = [texts[i : i + chunksize] for i in range(0, len(texts), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = []
+        for part in pool.map(_extract_chunk, chunks):
+            results.extend(part)
+    return results
+
+
+def _merge_iocs(existing, found):
+    merged = {k: list(v or []) for k, v in (existing or {}).items()}
+    for kind, values in found.items():
+        current = merged.setdefault(kind, [])
+        seen = set(current)
+        current.extend(v for v in values if v not in seen)
+    return merged
+
+
+@metrics.timed("enrich.iocs")
+def add_iocs(items, workers=None):
+    """Pipeline stage after feeds.normalize_all: fill item['iocs'] from text.
+
+    Extracted indicators are merged with whatever the collector already set,
+    never replacing it. Items of STRUCTURED_IOC_SOURCES keep their own IOCs
+    and are not scanned.
+    """
+    skip = IOC_SKIP_SOURCES | STRUCTURED_IOC_SOURCES
+    targets = [it for it in items if it.get("source") not in skip]
+    texts = [f"{it.get('title', '')}\n{it.get('summary', '')}" for it in targets]
+    for it, found in zip(targets, extract_iocs_batch(texts, workers=workers)):
+        it["iocs"] = _merge_iocs(it.get("iocs"), found)
+    return items
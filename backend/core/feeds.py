@@ -1,12 +1,22 @@
 from dotenv import load_dotenv
 load_dotenv()  # ← load .env when this file is imported
 
-import json, os, re, datetime
+import hashlib, json, os, queue, re, threading, time, datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from email.utils import parsedate_to_datetime
 from dateutil import parser
 import requests
 import feedparser
 from html.parser import HTMLParser
 
+from core import metrics
+from core.attack_store import get_store as get_attack_store
+from core.cache import CACHE_DIR, DiskCache, cache_key
+from core.geoip import get_resolver as get_geoip
+from core.item import ThreatItem
+from core.matcher import get_matcher
+from core.nvd import get_collector as get_nvd_collector
+
 
 
 class MLStripper(HTMLParser):
@@ -21,165 +31,347 @@ class MLStripper(HTMLParser):
         return " ".join(self.texts).strip()
 
 
+_stripper_local = threading.local()
+
+
+def _stripper():
+    """Reusable per-thread MLStripper (HTMLParser setup is the costly part)."""
+    s = getattr(_stripper_local, "stripper", None)
+    if s is None:
+        s = _stripper_local.stripper = MLStripper()
+    else:
+        s.reset()
+        s.texts = []
+    return s
+
+
 def clean_html(text: str) -> str:
-    s = MLStripper()
-    s.feed(text or "")
+    text = text or ""
+    # Fast path: without '<' or '&' the parser would return the text as one
+    # data chunk, so skip it entirely.
+    if "<" not in text and "&" not in text:
+        return text.strip()
+    s = _stripper()
+    s.feed(text)
     return s.get_data()
 
 
-def _to_iso8601(dt):
-    if isinstance(dt, str):
+def _date_iso(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+def _date_rfc822(value):
+    dt = parsedate_to_datetime(value)
+    if dt.tzinfo is None:  # "-0000" means UTC with unknown local offset
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt
+
+
+def _date_utc_suffix(value):
+    # ThreatFox style: "2025-10-28 06:10:00 UTC"
+    return datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S UTC").replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+_DATE_PARSERS = (_date_iso, _date_rfc822, _date_utc_suffix, parser.parse)
+# source -> index into _DATE_PARSERS of the parser that last worked for it
+_date_format_memo = {}
+
+
+def _parse_date(value, source=None):
+    """Parse a timestamp string, trying the format last seen for source first."""
+    first = _date_format_memo.get(source, 0)
+    order = (first,) + tuple(i for i in range(len(_DATE_PARSERS)) if i != first)
+    for i in order:
         try:
-            return parser.parse(dt).isoformat()
+            dt = _DATE_PARSERS[i](value)
         except Exception:
-            return dt
-    try:
-        return dt.isoformat()
-    except Exception:
-        return str(dt)
+            continue
+        _date_format_memo[source] = i
+        return dt
+    return None
 
 
-def normalize(item: dict) -> dict:
-    return {
-        "id": item.get("id") or item.get("url") or item.get("title"),
-        "source": item.get("source", "UNKNOWN"),
-        "published_at": _to_iso8601(
-            item.get("published_at", datetime.datetime.utcnow().isoformat())
-        ),
-        "title": clean_html(item.get("title", "")),
-        "summary": clean_html(item.get("summary", "")),
-        "cve_list": item.get("cve_list", []),
-        "cvss_max": float(item.get("cvss_max", 0.0)),
-        "iocs": item.get(
-            "iocs",
-            {
-                "ips": [],
-                "domains": [],
-                "urls": [],
-            },
-        ),
-        "products": item.get("products", []),
-        "mitre_ttps": item.get("mitre_ttps", []),
+def _epoch(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def _to_iso8601(dt, source=None):
+    """Return (ISO string, epoch seconds or None) for a timestamp value."""
+    if isinstance(dt, str):
+        parsed = _parse_date(dt, source)
+        if parsed is None:
+            return dt, None
+        return parsed.isoformat(), _epoch(parsed)
+    try:
+        return dt.isoformat(), _epoch(dt)
+    except Exception:
+        return str(dt), None
+
+
+def normalize(item: dict) -> ThreatItem:
+    """Canonical, compact form of a raw collector item (see core.item)."""
+    source = item.get("source", "UNKNOWN")
+    published = item.get("published_at")
+    if published is None:
+        published = datetime.datetime.utcnow().isoformat()
+    published_at, published_ts = _to_iso8601(published, source)
+    return ThreatItem(
+        id=item.get("id") or item.get("url") or item.get("title"),
+        source=source,
+        published_at=published_at,
+        # epoch seconds next to the ISO string so later stages never reparse
+        published_ts=published_ts,
+        title=clean_html(item.get("title", "")),
+        summary=clean_html(item.get("summary", "")),
+        cve_list=item.get("cve_list"),
+        cvss_max=float(item.get("cvss_max", 0.0)),
+        iocs=item.get("iocs"),
+        products=item.get("products"),
+        mitre_ttps=item.get("mitre_ttps"),
         # geo_hints is optionally set by collectors; enrich_all() may extend it
-        "geo_hints": item.get("geo_hints", []),
-    }
+        geo_hints=item.get("geo_hints"),
+    )
 
 
+@metrics.timed("normalize")
 def normalize_all(items):
     return [normalize(x) for x in items]
 
 
+@metrics.timed("enrich.geo")
 def enrich_all(items):
     """Very light geo hinting based on keywords in title/summary.
     If a collector already set geo_hints, we extend that list instead of replacing it.
+    Keywords are matched in one pass per item by core.matcher. When an offline
+    GeoIP database is configured (GEOIP_DB_CSV), the countries of every item's
+    IP indicators are added too, resolved in a single batch lookup.
     """
-    GEO_KEYWORDS = [
-        ("USA", "US"),
-        ("United States", "US"),
-        ("Saudi Arabia", "SA"),
-        ("Saudi", "SA"),
-        ("KSA", "SA"),
-        ("United Arab Emirates", "AE"),
-        ("UAE", "AE"),
-        ("United Kingdom", "GB"),
-        ("UK", "GB"),
-        ("China", "CN"),
-        ("Russia", "RU"),
-        ("Europe", "EU"),
-    ]
-
+    m = get_matcher()
+    countries = ip_countries(items)
     for it in items:
         text = f"{it.get('title','')} {it.get('summary','')}"
-        lower = text.lower()
         geos = set(it.get("geo_hints", []))
-        for kw, iso in GEO_KEYWORDS:
-            if kw.lower() in lower:
-                geos.add(iso)
+        for kind, value in m.tags(text):
+            if kind == "geo":
+                geos.add(value)
+        if countries:
+            for ip in (it.get("iocs") or {}).get("ips") or ():
+                country = countries.get(ip)
+                if country:
+                    geos.add(country)
         it["geo_hints"] = sorted(geos)
     return items
 
 
+def ip_countries(items):
+    """{ip: ISO alpha-2} for all IP indicators in items (empty without a GeoIP DB)."""
+    resolver = get_geoip()
+    if resolver is None:
+        return {}
+    ips = list({ip for it in items for ip in ((it.get("iocs") or {}).get("ips") or ())})
+    return dict(zip(ips, resolver.lookup_many(ips)))
+
+
 # =========================
-#  NVD CVE FEED
+#  HTTP CACHE (conditional GET)
 # =========================
 
-def fetch_nvd_cves(limit: int = 5):
-    """Fetch recent CVEs from NVD REST API and map into the common item schema."""
-    url = f"https://services.nvd.nist.gov/rest/json/cves/2.0?resultsPerPage={limit}"
+# How long a cached response is served without asking upstream at all.
+# After the TTL we revalidate with If-None-Match / If-Modified-Since, so an
+# unchanged feed costs one small 304 round trip.
+SOURCE_TTL = {
+    "NVD": 300,
+    "CISA": 900,
+    "Cisco Talos": 900,
+    "MSRC": 900,
+    "MITRE ATT&CK": 24 * 3600,
+    "ThreatFox": 300,
+}
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+# cache key -> (body digest, parsed object); avoids re-parsing on 304 / TTL hits
+_parsed_cache = {}
+
+
+def _get_http_cache():
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = DiskCache(
+                os.path.join(CACHE_DIR, "http"), max_bytes=HTTP_CACHE_MAX_BYTES
+            )
+        return _http_cache
+
+
+def _parse_json(body: bytes):
+    return json.loads(body)
+
+
+def _parse_feed(body: bytes):
+    return feedparser.parse(body)
+
+
+def _parsed(key, meta, parse):
+    digest = meta.get("digest")
+    hit = _parsed_cache.get(key)
+    if hit is not None and hit[0] == digest:
+        _get_http_cache().touch(key)
+        return hit[1]
+    body = _get_http_cache().read(key)
+    if body is None:
+        return None
+    parsed = parse(body)
+    _parsed_cache[key] = (digest, parsed)
+    return parsed
+
+
+def cached_fetch(source, url, parse, method="GET", headers=None, json_body=None, timeout=10):
+    """Fetch url through the on-disk HTTP cache and return parse(body).
+
+    Within the source's TTL the cached result is returned without any network
+    traffic. Otherwise a conditional request is sent; on 304 the previously
+    parsed result is reused. If upstream fails, the last cached result is
+    served (stale) when there is one. Returns None when nothing is available.
+    Auth headers are not part of the cache key, only method, url and body.
+    """
+    key = cache_key(method, url, json_body)
+    meta = _get_http_cache().meta(key)
+    now = time.time()
+    parsed = _fresh_cached(source, key, meta, parse, now)
+    if parsed is not None:
+        return parsed
+
+    req_headers = _revalidation_headers(headers, meta)
+    t0 = time.perf_counter()
     try:
-        response = requests.get(url, timeout=10)
+        resp = requests.request(
+            method, url, headers=req_headers, json=json_body, timeout=timeout
+        )
     except Exception:
-        return []
+        return _stale_or_none(key, meta, parse)
+    metrics.observe(metrics.HTTP_SECONDS, time.perf_counter() - t0, source=source)
+    return _store_response(source, url, key, meta, parse, resp.status_code, resp.content, resp.headers, now)
 
-    if response.status_code != 200:
-        return []
 
-    data = response.json()
-    items = []
+def _revalidation_headers(headers, meta):
+    req_headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"):
+            req_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            req_headers["If-Modified-Since"] = meta["last_modified"]
+    return req_headers
 
-    for v in data.get("vulnerabilities", []):
-        cve = v.get("cve", {})
-        cve_id = cve.get("id") or cve.get("CVE", {}).get("ID")
-        if not cve_id:
-            continue
 
-        description = ""
-        descs = cve.get("descriptions") or []
-        if descs:
-            description = descs[0].get("value", "")
+def _stale_or_none(key, meta, parse):
+    """Last cached result after a failed round trip, if there is one."""
+    metrics.inc(metrics.CACHE_REQUESTS, cache="http", result="stale" if meta else "miss")
+    return _parsed(key, meta, parse) if meta else None
 
-        cvss = 0.0
-        metrics = cve.get("metrics", {})
-        if "cvssMetricV31" in metrics:
-            cvss = metrics["cvssMetricV31"][0].get("cvssData", {}).get(
-                "baseScore", 0.0
-            )
-        elif "cvssMetricV3" in metrics:
-            cvss = metrics["cvssMetricV3"][0].get("cvssData", {}).get(
-                "baseScore", 0.0
-            )
 
-        items.append(
-            {
-                "id": cve_id,
-                "source": "NVD",
-                "published_at": cve.get(
-                    "published", datetime.datetime.utcnow().isoformat()
-                ),
-                "title": cve_id,
-                "summary": description,
-                "cve_list": [cve_id],
-                "cvss_max": cvss,
-                "iocs": {"ips": [], "domains": [], "urls": []},
-                "products": [],
-                "mitre_ttps": [],
-            }
-        )
+def _store_response(source, url, key, meta, parse, status_code, body, resp_headers, now):
+    """Cache bookkeeping after a round trip; shared by the sync and async fetchers."""
+    cache = _get_http_cache()
+    metrics.inc(metrics.FETCH_BYTES, len(body or b""), source=source)
+    if status_code == 304 and meta:
+        metrics.inc(metrics.CACHE_REQUESTS, cache="http", result="revalidated")
+        meta["fetched_at"] = now
+        cache.set_meta(key, meta)
+        return _parsed(key, meta, parse)
 
-    return items
+    if status_code != 200:
+        return _stale_or_none(key, meta, parse)
+
+    try:
+        parsed = parse(body)
+    except Exception:
+        return _stale_or_none(key, meta, parse)
+    metrics.inc(metrics.CACHE_REQUESTS, cache="http", result="miss")
+
+    new_meta = {
+        "url": url,
+        "source": source,
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+        "fetched_at": now,
+        "digest": hashlib.sha1(body).hexdigest(),
+    }
+    cache.set(key, body, new_meta)
+    _parsed_cache[key] = (new_meta["digest"], parsed)
+    return parsed
+
+
+def _fresh_cached(source, key, meta, parse, now):
+    """Cached result when it is still within the source TTL, else None."""
+    if meta and now - meta.get("fetched_at", 0) < SOURCE_TTL.get(source, 300):
+        parsed = _parsed(key, meta, parse)
+        if parsed is not None:
+            metrics.inc(metrics.CACHE_REQUESTS, cache="http", result="hit")
+        return parsed
+    return None
 
 
 # =========================
-#  CISA ADVISORIES
+#  NVD CVE FEED
 # =========================
 
-def fetch_cisa_advisories(limit: int = 5):
-    """Fetch recent CISA advisories via the public XML feed."""
-    url = "https://www.cisa.gov/cybersecurity-advisories/all.xml"
-    feed = feedparser.parse(url)
+def iter_nvd_pages(limit: int = 50):
+    """Yield NVD CVEs page by page.
+
+    When the last sync is older than the source TTL, every page of the delta
+    (CVEs modified since the previous sync, see core.nvd) is yielded as soon
+    as NVD returns it. A final page then adds the `limit` most recently
+    published CVEs from the persisted buffer that were not in the delta, so
+    this still yields data when NVD is slow, rate-limits us or has nothing new.
+    """
+    collector = get_nvd_collector()
+    seen = set()
+    if collector.is_stale(SOURCE_TTL["NVD"]):
+        try:
+            for page in collector.iter_delta():
+                seen.update(it["id"] for it in page)
+                yield page
+        except Exception:
+            pass  # keep serving the last good buffer
+    rest = [it for it in collector.recent(limit) if it["id"] not in seen]
+    if rest:
+        yield rest
+
+
+def fetch_nvd_cves(limit: int = 50):
+    """List form of iter_nvd_pages(): the delta plus the recent buffer."""
+    return [it for page in iter_nvd_pages(limit) for it in page]
+
+
+# =========================
+#  RSS / ATOM FEEDS
+# =========================
+
+def feed_items(feed, source, limit):
+    """Map the first `limit` entries of a parsed RSS/Atom feed to raw items."""
+    if feed is None:
+        return []
     items = []
 
     for entry in feed.entries[:limit]:
+        title = entry.get("title", "")
         items.append(
             {
                 "id": entry.get("id") or entry.get("link"),
-                "source": "CISA",
+                "source": source,
                 "published_at": entry.get(
                     "published", datetime.datetime.utcnow().isoformat()
                 ),
-                "title": entry.get("title", ""),
+                "title": title,
                 "summary": entry.get("summary", ""),
-                "cve_list": [],
+                # MSRC titles carry the CVE id; other feeds rarely do
+                "cve_list": re.findall(r"CVE-\d{4}-\d+", title) if source == "MSRC" else [],
                 "cvss_max": 0.0,
                 "iocs": {"ips": [], "domains": [], "urls": []},
                 "products": [],
@@ -190,68 +382,43 @@ def fetch_cisa_advisories(limit: int = 5):
     return items
 
 
+# =========================
+#  CISA ADVISORIES
+# =========================
+
+CISA_URL = "https://www.cisa.gov/cybersecurity-advisories/all.xml"
+
+
+def fetch_cisa_advisories(limit: int = 5):
+    """Fetch recent CISA advisories via the public XML feed."""
+    feed = cached_fetch("CISA", CISA_URL, _parse_feed)
+    return feed_items(feed, "CISA", limit)
+
+
 # =========================
 #  CISCO TALOS VENDOR FEED
 # =========================
 
-def fetch_cisco_talos(limit: int = 5):
-    """Fetch recent posts from Cisco Talos Intelligence blog RSS feed."""
-    url = "http://feeds.feedburner.com/feedburner/Talos"
-    feed = feedparser.parse(url)
-    items = []
+TALOS_URL = "http://feeds.feedburner.com/feedburner/Talos"
 
-    for entry in feed.entries[:limit]:
-        items.append(
-            {
-                "id": entry.get("id") or entry.get("link"),
-                "source": "Cisco Talos",
-                "published_at": entry.get(
-                    "published", datetime.datetime.utcnow().isoformat()
-                ),
-                "title": entry.get("title", ""),
-                "summary": entry.get("summary", ""),
-                "cve_list": [],
-                "cvss_max": 0.0,
-                "iocs": {"ips": [], "domains": [], "urls": []},
-                "products": [],
-                "mitre_ttps": [],
-            }
-        )
 
-    return items
+def fetch_cisco_talos(limit: int = 5):
+    """Fetch recent posts from Cisco Talos Intelligence blog RSS feed."""
+    feed = cached_fetch("Cisco Talos", TALOS_URL, _parse_feed)
+    return feed_items(feed, "Cisco Talos", limit)
 
 
 # =========================
 #  MICROSOFT MSRC VENDOR FEED
 # =========================
 
-def fetch_msrc(limit: int = 5):
-    """Fetch recent Microsoft Security Update Guide entries via RSS."""
-    url = "https://msrc.microsoft.com/update-guide/rss"
-    feed = feedparser.parse(url)
-    items = []
+MSRC_URL = "https://msrc.microsoft.com/update-guide/rss"
 
-    for entry in feed.entries[:limit]:
-        title = entry.get("title", "")
-        cves = re.findall(r"CVE-\d{4}-\d+", title)
-        items.append(
-            {
-                "id": entry.get("id") or entry.get("link"),
-                "source": "MSRC",
-                "published_at": entry.get(
-                    "published", datetime.datetime.utcnow().isoformat()
-                ),
-                "title": title,
-                "summary": entry.get("summary", ""),
-                "cve_list": cves,
-                "cvss_max": 0.0,
-                "iocs": {"ips": [], "domains": [], "urls": []},
-                "products": [],
-                "mitre_ttps": [],
-            }
-        )
 
-    return items
+def fetch_msrc(limit: int = 5):
+    """Fetch recent Microsoft Security Update Guide entries via RSS."""
+    feed = cached_fetch("MSRC", MSRC_URL, _parse_feed)
+    return feed_items(feed, "MSRC", limit)
 
 
 # =========================
@@ -259,58 +426,38 @@ def fetch_msrc(limit: int = 5):
 # =========================
 
 def fetch_mitre_attack(limit: int = 20):
-    """Load MITRE ATT&CK Enterprise techniques from the official STIX JSON."""
-    url = (
-        "https://raw.githubusercontent.com/mitre-attack/attack-stix-data/master/"
-        "enterprise-attack/enterprise-attack.json"
-    )
+    """Return the most recently modified ATT&CK Enterprise techniques.
+
+    Techniques come from the local indexed store (core.attack_store), which
+    streams the official STIX bundle and is re-synced at most once per
+    SOURCE_TTL["MITRE ATT&CK"].
+    """
     try:
-        response = requests.get(url, timeout=20)
+        store = get_attack_store()
+        store.sync_if_stale(max_age=SOURCE_TTL["MITRE ATT&CK"])
+        techniques = store.recent_techniques(limit=limit)
     except Exception:
         return []
 
-    if response.status_code != 200:
-        return []
-
-    data = response.json()
-    objects = data.get("objects", [])
     items = []
-
-    for obj in objects:
-        if obj.get("type") != "attack-pattern":
-            continue
-
-        external_id = None
-        for ref in obj.get("external_references", []):
-            ext_id = ref.get("external_id")
-            if ext_id and ext_id.startswith("T"):
-                external_id = ext_id
-                break
-
-        if not external_id:
-            continue
-
+    for tech in techniques:
         items.append(
             {
-                "id": obj.get("id"),
+                "id": tech["stix_id"],
                 "source": "MITRE ATT&CK",
-                "published_at": obj.get(
-                    "modified",
-                    obj.get("created", datetime.datetime.utcnow().isoformat()),
-                ),
-                "title": obj.get("name", ""),
-                "summary": obj.get("description", ""),
+                "published_at": tech.get("modified")
+                or tech.get("created")
+                or datetime.datetime.utcnow().isoformat(),
+                "title": tech.get("name", ""),
+                "summary": tech.get("description", ""),
                 "cve_list": [],
                 "cvss_max": 0.0,
                 "iocs": {"ips": [], "domains": [], "urls": []},
                 "products": [],
-                "mitre_ttps": [external_id],
+                "mitre_ttps": [tech["technique_id"]],
             }
         )
 
-        if len(items) >= limit:
-            break
-
     return items
 
 
@@ -318,32 +465,59 @@ def fetch_mitre_attack(limit: int = 20):
 #  ThreatFox IOCs (Abuse.ch)
 # =========================
 
+THREATFOX_API_URL = os.getenv("THREATFOX_API_URL", "https://threatfox-api.abuse.ch/api/v1/")
+
+
+class FeedError(Exception):
+    """Upstream feed failed and no cached response is available."""
+
+
 def fetch_threatfox_iocs(limit: int = 50, days: int = 1):
     """Fetch recent Indicators of Compromise from ThreatFox.
 
     Requires an Auth-Key from abuse.ch in the THREATFOX_AUTH_KEY env var.
     We only map network IOCs which make sense for a geo map (IP, domain, URL).
+    Returns [] when ThreatFox is unavailable; see threatfox_iocs().
     """
-    auth_key = os.environ.get("THREATFOX_AUTH_KEY")
-    if not auth_key:
-        # No API key configured → skip gracefully
+    try:
+        return threatfox_iocs(limit=limit, days=days)
+    except FeedError:
         return []
 
-    url = "https://threatfox-api.abuse.ch/api/v1/"
-    headers = {"Auth-Key": auth_key}
-    payload = {"query": "get_iocs", "days": max(1, min(days, 7))}
 
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=20)
-    except Exception:
-        return []
+def threatfox_iocs(limit: int = 50, days: int = 1):
+    """Like fetch_threatfox_iocs, but raises FeedError when upstream fails.
 
-    if resp.status_code != 200:
+    Lets callers that keep their own last good copy (the /api/iocs cache)
+    tell an outage apart from an empty result.
+    """
+    request = threatfox_request(days)
+    if request is None:
         return []
+    data = cached_fetch("ThreatFox", THREATFOX_API_URL, _parse_json, method="POST", timeout=20, **request)
+    return threatfox_items(data, limit)
 
-    data = resp.json()
-    if data.get("query_status") != "ok":
+
+def threatfox_request(days):
+    """Headers and body of a get_iocs call, or None without an API key."""
+    auth_key = os.environ.get("THREATFOX_AUTH_KEY")
+    if not auth_key:
+        # No API key configured → skip gracefully
+        return None
+    return {
+        "headers": {"Auth-Key": auth_key},
+        "json_body": {"query": "get_iocs", "days": max(1, min(days, 7))},
+    }
+
+
+def threatfox_items(data, limit):
+    """Map a ThreatFox get_iocs response to raw items; FeedError if it failed."""
+    if not isinstance(data, dict):
+        raise FeedError("ThreatFox request failed")
+    if data.get("query_status") == "no_result":
         return []
+    if data.get("query_status") != "ok":
+        raise FeedError(f"ThreatFox query_status={data.get('query_status')!r}")
 
     items = []
     for row in data.get("data", [])[:limit]:
@@ -383,6 +557,7 @@ def fetch_threatfox_iocs(limit: int = 50, days: int = 1):
                 "products": [],
                 "mitre_ttps": [],
                 "geo_hints": geo_hints,
+                "threat_type": row.get("threat_type") or "",
             }
         )
 
@@ -393,6 +568,196 @@ def fetch_threatfox_iocs(limit: int = 50, days: int = 1):
 #  Aggregator
 # =========================
 
+# Registry of live collectors: (source name, fetcher, kwargs, per-source deadline in seconds)
+SOURCES = [
+    ("NVD", iter_nvd_pages, {"limit": 50}, 15.0),
+    ("CISA", fetch_cisa_advisories, {"limit": 5}, 10.0),
+    ("Cisco Talos", fetch_cisco_talos, {"limit": 5}, 10.0),
+    ("MSRC", fetch_msrc, {"limit": 5}, 10.0),
+    ("MITRE ATT&CK", fetch_mitre_attack, {"limit": 20}, 25.0),
+    ("ThreatFox", fetch_threatfox_iocs, {"limit": 50, "days": 1}, 20.0),
+]
+
+# Sources whose fetcher yields pages of items instead of returning a list;
+# iter_all_sources() hands each page on as soon as it arrives.
+PAGED_SOURCES = {"NVD"}
+
+# Pages a paged fetcher may run ahead of the consumer.
+PAGE_QUEUE_SIZE = 2
+
+# Upper bound on how long a single collection round may take overall.
+COLLECT_DEADLINE = float(os.getenv("COLLECT_DEADLINE", "30"))
+
+
+def collect_all_sources_with_status(deadline: float = None, max_workers: int = None):
+    """Run every collector concurrently and return (items, status).
+
+    Each fetcher runs on a bounded thread pool. A source that does not answer
+    within its own deadline (or before the overall deadline) is reported as
+    "timeout" and its items are dropped, so wall-clock time is bounded by the
+    slowest source that answers in time rather than the sum of all of them.
+
+    status maps source name -> {"status": "ok"|"timeout"|"error",
+    "items": int, "elapsed": seconds, "error": str|None}.
+    """
+    status = {}
+    all_items = list(iter_all_sources(status, deadline=deadline, max_workers=max_workers))
+    return all_items, status
+
+
+def iter_all_sources(status=None, deadline: float = None, max_workers: int = None):
+    """Yield raw items source by source, as collect_all_sources_with_status() collects them.
+
+    Same concurrency and deadlines, but each source's items are handed on as
+    soon as it is its turn instead of being concatenated into one list, so a
+    streaming consumer (core.pipeline) never holds more than one source's
+    response. Sources in PAGED_SOURCES are streamed page by page, so it holds
+    at most PAGE_QUEUE_SIZE pages of those. Per-source status records are
+    written into status if given.
+    """
+    status = {} if status is None else status
+    deadline = COLLECT_DEADLINE if deadline is None else deadline
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(
+        max_workers=max_workers or len(SOURCES),
+        thread_name_prefix="collector",
+    )
+    futures = {}
+    pages = {}
+    stops = {}
+    for name, fn, kwargs, _ in SOURCES:
+        if name in PAGED_SOURCES:
+            pages[name] = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+            stops[name] = threading.Event()
+            futures[name] = pool.submit(_timed_pages, name, fn, kwargs, pages[name], stops[name])
+        else:
+            futures[name] = pool.submit(_timed_call, name, fn, kwargs)
+
+    try:
+        # Keep the historical source order regardless of completion order
+        for name, _, _, source_deadline in SOURCES:
+            until = min(started + source_deadline, started + deadline)
+            if name in pages:
+                yielded = 0
+                try:
+                    for page in _drain_pages(futures[name], pages[name], until):
+                        yielded += len(page)
+                        yield from page
+                    _, elapsed = futures[name].result()
+                except FutureTimeout:
+                    stops[name].set()
+                    status[name] = {
+                        "status": "timeout",
+                        "items": yielded,
+                        "elapsed": round(time.monotonic() - started, 3),
+                        "error": None,
+                    }
+                    continue
+                except Exception as exc:
+                    status[name] = {
+                        "status": "error",
+                        "items": yielded,
+                        "elapsed": round(time.monotonic() - started, 3),
+                        "error": f"{type(exc).__name__}: {exc}",
+                    }
+                    continue
+                status[name] = {
+                    "status": "ok",
+                    "items": yielded,
+                    "elapsed": round(elapsed, 3),
+                    "error": None,
+                }
+                continue
+
+            try:
+                items, elapsed = futures[name].result(timeout=max(until - time.monotonic(), 0.0))
+            except FutureTimeout:
+                futures[name].cancel()
+                status[name] = {
+                    "status": "timeout",
+                    "items": 0,
+                    "elapsed": round(time.monotonic() - started, 3),
+                    "error": None,
+                }
+                continue
+            except Exception as exc:
+                status[name] = {
+                    "status": "error",
+                    "items": 0,
+                    "elapsed": round(time.monotonic() - started, 3),
+                    "error": f"{type(exc).__name__}: {exc}",
+                }
+                continue
+
+            items = items or []
+            status[name] = {
+                "status": "ok",
+                "items": len(items),
+                "elapsed": round(elapsed, 3),
+                "error": None,
+            }
+            futures[name] = None  # drop the future's reference to the list
+            yield from items
+    finally:
+        # Don't wait for stragglers: their threads finish in the background and
+        # their results are discarded. Paged fetchers stop at their next page.
+        for stop in stops.values():
+            stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _timed_call(name, fn, kwargs):
+    t0 = time.monotonic()
+    with metrics.span("fetch", source=name) as s:
+        items = fn(**kwargs)
+        s.items = len(items or ())
+    return items, time.monotonic() - t0
+
+
+def _timed_pages(name, fn, kwargs, pages, stop):
+    """Run a paged fetcher, putting each page on the pages queue."""
+    t0 = time.monotonic()
+    count = 0
+    with metrics.span("fetch", source=name) as s:
+        it = fn(**kwargs)
+        try:
+            for page in it:
+                count += len(page)
+                while True:
+                    if stop.is_set():
+                        return None, time.monotonic() - t0
+                    try:
+                        pages.put(page, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+        finally:
+            # close a fetcher stopped early now: an NVD delta cut short releases
+            # the collector and keeps the watermark of its last complete window
+            it.close()
+            s.items = count
+    return None, time.monotonic() - t0
+
+
+def _drain_pages(future, pages, until):
+    """Yield pages from a _timed_pages worker until it is done.
+
+    Raises FutureTimeout when `until` passes while waiting for the next page,
+    and re-raises the worker's exception if it failed.
+    """
+    while True:
+        try:
+            yield pages.get(timeout=0.05)
+            continue
+        except queue.Empty:
+            pass
+        if future.done() and pages.empty():
+            future.result()
+            return
+        if time.monotonic() >= until:
+            raise FutureTimeout()
+
+
 def collect_all_sources():
     """Aggregate all live sources into a single list.
 
@@ -403,21 +768,9 @@ def collect_all_sources():
       - Microsoft MSRC
       - MITRE ATT&CK techniques
       - ThreatFox IOCs (network indicators with geo)
-    """
-    nvd_items = fetch_nvd_cves(limit=5)
-    cisa_items = fetch_cisa_advisories(limit=5)
-    talos_items = fetch_cisco_talos(limit=5)
-    msrc_items = fetch_msrc(limit=5)
-    mitre_items = fetch_mitre_attack(limit=20)
-    threatfox_items = fetch_threatfox_iocs(limit=50, days=1)
-
-    all_items = (
-        nvd_items
-        + cisa_items
-        + talos_items
-        + msrc_items
-        + mitre_items
-        + threatfox_items
-    )
 
+    Sources are fetched in parallel; see collect_all_sources_with_status()
+    for the per-source status record.
+    """
+    all_items, _ = collect_all_sources_with_status()
     return all_items
@@ -0,0 +1,77 @@
+"""Per-country IOC aggregates for the globe.
+
+Country points come from data/country_centroids.csv, which is precomputed
+once by scripts/build_country_centroids.py, so neither the server nor the
+browser handles country geometry at request time.
+"""
+import csv
+import math
+import os
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CENTROIDS_CSV = os.path.join(_DATA_DIR, "country_centroids.csv")
+
+IOC_KINDS = ("ips", "domains", "urls", "hashes")
+
+_centroids = {}  # path -> table
+
+
+def load_centroids(path=CENTROIDS_CSV):
+    """{iso2: {"iso2", "iso3", "name", "lat", "lon"}} (loaded once per path)."""
+    table = _centroids.get(path)
+    if table is None:
+        with open(path, encoding="utf-8") as f:
+            rows = csv.DictReader(line for line in f if not line.startswith("#"))
+            table = {
+                r["iso2"]: {
+                    "iso2": r["iso2"],
+                    "iso3": r["iso3"],
+                    "name": r["name"],
+                    "lat": float(r["lat"]),
+                    "lon": float(r["lon"]),
+                }
+                for r in rows
+            }
+        _centroids[path] = table
+    return table
+
+
+def country_aggregate(items, include_empty=True):
+    """Per-country IOC counts with centroid and a 0..1 intensity.
+
+    Every item counts towards each country in its geo_hints. intensity is
+    log-scaled against the busiest country so one hot spot does not flatten
+    the rest of the globe. Countries without IOCs are listed with total 0
+    when include_empty is set (the globe draws a dot for every country).
+    """
+    centroids = load_centroids()
+    counts = {}
+    for it in items:
+        hints = it.get("geo_hints") or ()
+        if not hints:
+            continue
+        iocs = it.get("iocs") or {}
+        for iso in hints:
+            iso = str(iso).upper()
+            if iso not in centroids:
+                continue
+            c = counts.setdefault(iso, dict.fromkeys(IOC_KINDS, 0))
+            for kind in IOC_KINDS:
+                c[kind] += len(iocs.get(kind) or ())
+
+    max_total = max((sum(c.values()) for c in counts.values()), default=0)
+    scale = math.log1p(max_total) or 1.0
+    rows = []
+    for iso, point in centroids.items():
+        c = counts.get(iso)
+        if c is None and not include_empty:
+            continue
+        total = sum(c.values()) if c else 0
+        row = dict(point)
+        row["total"] = total
+        row["intensity"] = round(math.log1p(total) / scale, 4)
+        if total:
+            row["counts"] = {k: v for k, v in c.items() if v}
+        rows.append(row)
+    rows.sort(key=lambda r: (-r["total"], r["iso2"]))
+    return {"countries": rows, "total": sum(r["total"] for r in rows), "max": max_total}
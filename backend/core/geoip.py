@@ -0,0 +1,217 @@
+"""Offline IP -> country lookups from a local range database.
+
+GEOIP_DB_CSV points at a CSV of `start,end,country` rows, the layout of the
+free IP-to-country datasets (db-ip lite, ip2location lite, ...). start/end
+may be dotted/colon addresses or integers; a header row is skipped.
+
+The CSV is compiled once into sorted NumPy arrays under
+CACHE_DIR/geoip/<fingerprint>/ and opened with mmap_mode="r" afterwards,
+so every process (Streamlit, API workers, process pools) shares the same
+page-cache copy instead of parsing the CSV again:
+
+    v4_start, v4_end   uint32
+    v6_start, v6_end   S16, big-endian address bytes (sorts like uint128)
+    v4_cc, v6_cc       uint16, two ASCII letters of the country code
+
+A lookup is one np.searchsorted over the start array plus an end check, for
+a whole batch at once.
+"""
+import csv
+import hashlib
+import ipaddress
+import os
+import socket
+import threading
+from functools import partial
+
+import numpy as np
+
+from core.cache import CACHE_DIR
+
+GEOIP_DB_CSV = os.getenv("GEOIP_DB_CSV")
+GEOIP_CACHE_DIR = os.path.join(CACHE_DIR, "geoip")
+
+_ARRAYS = ("v4_start", "v4_end", "v4_cc", "v6_start", "v6_end", "v6_cc")
+
+_pack_v4 = partial(socket.inet_pton, socket.AF_INET)  # strict dotted quad, unlike inet_aton
+
+
+def host_of(ip):
+    """Bare address of an indicator: drops a :port suffix and IPv6 [brackets].
+
+    ThreatFox reports IP indicators as ip:port ("1.2.3.4:443",
+    "[2001:db8::1]:8080"); a bare IPv6 address has several colons and is
+    returned unchanged.
+    """
+    ip = str(ip).strip()
+    if ip.startswith("["):
+        return ip[1:].partition("]")[0]
+    if ip.count(":") == 1:
+        return ip.partition(":")[0]
+    return ip
+
+
+def _cc_code(country):
+    country = (country or "").strip().upper()
+    if len(country) != 2 or not country.isalpha() or country == "ZZ":
+        return 0
+    return (ord(country[0]) << 8) | ord(country[1])
+
+
+def _cc_str(code):
+    return chr(code >> 8) + chr(code & 0xFF)
+
+
+def _parse_bound(value):
+    value = value.strip()
+    if value.isdigit():
+        n = int(value)
+        return (4, n) if n <= 0xFFFFFFFF else (6, n)
+    ip = ipaddress.ip_address(value)
+    return ip.version, int(ip)
+
+
+def compile_csv(csv_path, out_dir):
+    """Parse the range CSV and write the sorted .npy arrays into out_dir."""
+    v4, v6 = [], []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            try:
+                (ver, start), (_, end) = _parse_bound(row[0]), _parse_bound(row[1])
+            except ValueError:
+                continue  # header or malformed row
+            code = _cc_code(row[2])
+            if not code:
+                continue
+            (v4 if ver == 4 else v6).append((start, end, code))
+    v4.sort()
+    v6.sort()
+
+    arrays = {
+        "v4_start": np.array([r[0] for r in v4], dtype=np.uint32),
+        "v4_end": np.array([r[1] for r in v4], dtype=np.uint32),
+        "v4_cc": np.array([r[2] for r in v4], dtype=np.uint16),
+        "v6_start": np.array([r[0].to_bytes(16, "big") for r in v6], dtype="S16"),
+        "v6_end": np.array([r[1].to_bytes(16, "big") for r in v6], dtype="S16"),
+        "v6_cc": np.array([r[2] for r in v6], dtype=np.uint16),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name, arr in arrays.items():
+        tmp = os.path.join(out_dir, f".{name}.tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, os.path.join(out_dir, name + ".npy"))
+
+
+class GeoIpResolver:
+    """Batch IP -> ISO alpha-2 country resolver over memory-mapped arrays."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode="r"))
+
+    @classmethod
+    def from_csv(cls, csv_path, cache_dir=GEOIP_CACHE_DIR):
+        """Open the compiled copy of csv_path, compiling it first if needed."""
+        st = os.stat(csv_path)
+        fingerprint = hashlib.sha1(
+            f"{os.path.abspath(csv_path)}|{st.st_size}|{st.st_mtime_ns}".encode()
+        ).hexdigest()[:16]
+        directory = os.path.join(cache_dir, fingerprint)
+        if not all(os.path.exists(os.path.join(directory, n + ".npy")) for n in _ARRAYS):
+            compile_csv(csv_path, directory)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.v4_start) + len(self.v6_start)
+
+    @staticmethod
+    def _resolve(keys, starts, ends, ccs):
+        """Country codes (uint16, 0 = unknown) for sorted-range lookups."""
+        if len(starts) == 0 or len(keys) == 0:
+            return np.zeros(len(keys), dtype=np.uint16)
+        idx = np.searchsorted(starts, keys, side="right") - 1
+        safe = np.maximum(idx, 0)
+        hit = (idx >= 0) & (keys <= ends[safe])
+        return np.where(hit, ccs[safe], 0).astype(np.uint16)
+
+    def lookup_v4_ints(self, addrs):
+        """uint16 country codes for an array of IPv4 addresses as uint32."""
+        return self._resolve(np.asarray(addrs, dtype=np.uint32), self.v4_start, self.v4_end, self.v4_cc)
+
+    def lookup_many(self, ips):
+        """[ISO alpha-2 or None] for a list of address strings (ports allowed, see host_of())."""
+        ips = list(ips)
+        try:
+            # fast path: every entry is a dotted quad (inet_pton and join run in C)
+            packed = b"".join(map(_pack_v4, ips))
+        except (OSError, TypeError):
+            ips = list(map(host_of, ips))
+            try:
+                # ip:port indicators, once the ports are gone
+                packed = b"".join(map(_pack_v4, ips))
+            except (OSError, TypeError):
+                return self._lookup_mixed(ips)
+        codes = self._resolve(
+            np.frombuffer(packed, dtype=">u4"), self.v4_start, self.v4_end, self.v4_cc
+        )
+        return self._countries(codes)
+
+    @staticmethod
+    def _countries(codes):
+        names = {int(c): _cc_str(int(c)) for c in np.unique(codes)}
+        names[0] = None
+        return list(map(names.__getitem__, codes.tolist()))
+
+    def _lookup_mixed(self, ips):
+        out = [None] * len(ips)
+        v4_pos, v4_keys, v6_pos, v6_keys = [], [], [], []
+        for pos, ip in enumerate(ips):
+            try:
+                addr = ipaddress.ip_address(host_of(ip))
+            except ValueError:
+                continue
+            if addr.version == 6 and addr.ipv4_mapped is not None:
+                addr = addr.ipv4_mapped
+            if addr.version == 4:
+                v4_pos.append(pos)
+                v4_keys.append(int(addr))
+            else:
+                v6_pos.append(pos)
+                v6_keys.append(addr.packed)
+        if v4_pos:
+            codes = self.lookup_v4_ints(v4_keys)
+            for pos, country in zip(v4_pos, self._countries(codes)):
+                out[pos] = country
+        if v6_pos:
+            codes = self._resolve(
+                np.array(v6_keys, dtype="S16"), self.v6_start, self.v6_end, self.v6_cc
+            )
+            for pos, country in zip(v6_pos, self._countries(codes)):
+                out[pos] = country
+        return out
+
+    def lookup(self, ip):
+        return self.lookup_many([ip])[0]
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+_resolver_failed = False
+
+
+def get_resolver():
+    """Process-wide resolver for GEOIP_DB_CSV, or None when not configured."""
+    global _resolver, _resolver_failed
+    if _resolver is not None or _resolver_failed or not GEOIP_DB_CSV:
+        return _resolver
+    with _resolver_lock:
+        if _resolver is None and not _resolver_failed:
+            try:
+                _resolver = GeoIpResolver.from_csv(GEOIP_DB_CSV)
+            except Exception as exc:
+                print("GeoIP database unavailable:", exc)
+                _resolver_failed = True
+        return _resolver
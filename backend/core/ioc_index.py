@@ -0,0 +1,303 @@
+"""In-memory match index over the collected indicators.
+
+Observables from our own logs (IPs, hostnames, URLs, file hashes) are matched
+against every collected IOC without scanning item lists:
+
+* IPs / CIDRs   exact addresses in a dict keyed by integer value, networks in
+                one dict per prefix length keyed by the masked network value.
+                A lookup masks the address once per prefix length in use,
+                which is the hashed form of a radix-tree walk.
+* domains       reversed-label trie ("com" -> "evil" -> "c2"), so an indicator
+                also matches every subdomain below it.
+* URLs, hashes  hash tables.
+
+IndexBuilder keeps the index current in the background: it covers the
+ThreatFox rows served by /api/iocs plus every IOC archived in the item store,
+and is rebuilt off the event loop whenever either of them changes.
+"""
+import asyncio
+import ipaddress
+import os
+from urllib.parse import urlsplit
+
+from core.store import get_store
+
+# Seconds between checks of the indicator sources for changes
+INDEX_INTERVAL = float(os.getenv("IOC_INDEX_INTERVAL", "60"))
+
+_IDS = ""  # trie key holding the item ids of a node; no label is empty
+
+HASH_LENGTHS = (32, 40, 64)
+_HEX = frozenset("0123456789abcdef")
+
+
+def _ipv4_int(value):
+    """Fast path for dotted IPv4 strings; None when value is not one."""
+    parts = value.split(".")
+    if len(parts) != 4:
+        return None
+    n = 0
+    for p in parts:
+        if not p.isdigit() or len(p) > 3:
+            return None
+        octet = int(p)
+        if octet > 255:
+            return None
+        n = (n << 8) | octet
+    return n
+
+
+def parse_ip(value):
+    """(version, int) for an IPv4/IPv6 address string, or None."""
+    n = _ipv4_int(value)
+    if n is not None:
+        return 4, n
+    if ":" not in value:
+        return None
+    try:
+        ip = ipaddress.IPv6Address(value.strip("[]").split("%", 1)[0])
+    except ValueError:
+        return None
+    if ip.ipv4_mapped is not None:
+        return 4, int(ip.ipv4_mapped)
+    return 6, int(ip)
+
+
+def normalize_url(value):
+    """Lower-case scheme and host, drop the fragment and a bare trailing slash."""
+    try:
+        parts = urlsplit(value.strip())
+    except ValueError:
+        return value.strip()
+    path = parts.path if parts.path != "/" else ""
+    url = f"{parts.scheme.lower()}://{parts.netloc.lower()}{path}"
+    if parts.query:
+        url += "?" + parts.query
+    return url
+
+
+def classify(value):
+    """Best-guess indicator kind of a raw observable string."""
+    v = value.strip()
+    if "://" in v:
+        return "url"
+    if "/" in v:
+        return "cidr"
+    if parse_ip(v) is not None:
+        return "ip"
+    low = v.lower()
+    if len(low) in HASH_LENGTHS and _HEX.issuperset(low):
+        return "hash"
+    return "domain"
+
+
+class IocIndex:
+    """Match index; build with add()/add_item(), then call match()."""
+
+    def __init__(self):
+        self._ips = {4: {}, 6: {}}
+        self._nets = {4: {}, 6: {}}  # version -> {prefixlen: {network int: ids}}
+        self._prefixes = {4: (), 6: ()}  # prefix lengths in use, longest first
+        self._domains = {}
+        self._urls = {}
+        self._hashes = {}
+        self.size = 0
+
+    # -- building ---------------------------------------------------------
+    def add(self, value, item_id, kind=None):
+        value = (value or "").strip()
+        if not value:
+            return
+        kind = kind or classify(value)
+        if kind == "ips" or kind == "ip":
+            if "/" in value:
+                kind = "cidr"
+            else:
+                if value.count(":") == 1:
+                    value = value.split(":", 1)[0]  # ThreatFox "ip:port" rows
+                parsed = parse_ip(value)
+                if parsed is None:
+                    return
+                version, n = parsed
+                self._ips[version].setdefault(n, set()).add(item_id)
+                self.size += 1
+                return
+        if kind == "cidr":
+            try:
+                net = ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                return
+            buckets = self._nets[net.version].setdefault(net.prefixlen, {})
+            buckets.setdefault(int(net.network_address), set()).add(item_id)
+            self._prefixes[net.version] = tuple(sorted(self._nets[net.version], reverse=True))
+        elif kind in ("domains", "domain"):
+            node = self._domains
+            for label in reversed(value.lower().rstrip(".").split(".")):
+                node = node.setdefault(label, {})
+            node.setdefault(_IDS, set()).add(item_id)
+        elif kind in ("urls", "url"):
+            self._urls.setdefault(normalize_url(value), set()).add(item_id)
+        elif kind in ("hashes", "hash"):
+            self._hashes.setdefault(value.lower(), set()).add(item_id)
+        else:
+            return
+        self.size += 1
+
+    def add_item(self, item):
+        item_id = item.get("id")
+        for kind, values in (item.get("iocs") or {}).items():
+            for value in values or ():
+                self.add(str(value), item_id, kind)
+
+    # -- matching ---------------------------------------------------------
+    def match_ip(self, value):
+        """[(indicator, ids)] for an address: exact hit plus containing networks."""
+        parsed = parse_ip(value)
+        if parsed is None:
+            return []
+        version, n = parsed
+        bits = 32 if version == 4 else 128
+        hits = []
+        ids = self._ips[version].get(n)
+        if ids:
+            hits.append((str(ipaddress.ip_address(n)), ids))
+        nets = self._nets[version]
+        for plen in self._prefixes[version]:
+            mask = ((1 << plen) - 1) << (bits - plen)
+            ids = nets[plen].get(n & mask)
+            if ids:
+                hits.append((f"{ipaddress.ip_address(n & mask)}/{plen}", ids))
+        return hits
+
+    def match_domain(self, value):
+        """[(indicator, ids)] for every indicator that is value or a parent of it."""
+        labels = value.lower().rstrip(".").split(".")
+        hits = []
+        node = self._domains
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            ids = node.get(_IDS)
+            if ids:
+                hits.append((".".join(labels[-depth:]), ids))
+        return hits
+
+    def match_one(self, value):
+        """[(kind, indicator, ids)] for a single observable."""
+        value = value.strip()
+        kind = classify(value)
+        if kind == "ip":
+            return [("ip", ind, ids) for ind, ids in self.match_ip(value)]
+        if kind == "domain":
+            return [("domain", ind, ids) for ind, ids in self.match_domain(value)]
+        if kind == "hash":
+            ids = self._hashes.get(value.lower())
+            return [("hash", value.lower(), ids)] if ids else []
+        if kind == "url":
+            url = normalize_url(value)
+            hits = []
+            # the item store keeps IOC values lower-cased
+            ids = self._urls.get(url) or self._urls.get(url.lower())
+            if ids:
+                hits.append(("url", url, ids))
+            try:
+                host = urlsplit(url).hostname or ""
+            except ValueError:
+                host = ""
+            if host:
+                hits.extend(self.match_one(host))
+            return hits
+        return []
+
+    def match(self, observables):
+        """Match many observables; only observables with hits are returned."""
+        results = []
+        for value in observables:
+            hits = self.match_one(str(value))
+            if not hits:
+                continue
+            item_ids = set()
+            for _, _, ids in hits:
+                item_ids.update(ids)
+            results.append(
+                {
+                    "observable": value,
+                    "matches": [
+                        {"kind": kind, "indicator": ind, "item_ids": sorted(ids, key=str)}
+                        for kind, ind, ids in hits
+                    ],
+                    "item_ids": sorted(item_ids, key=str),
+                }
+            )
+        return results
+
+
+def build_index(items, store=None):
+    """Index over the IOCs of items, plus every IOC archived in store if given."""
+    index = IocIndex()
+    for it in items:
+        index.add_item(it)
+    if store is not None:
+        for value, kind, item_id in store.execute("SELECT value, kind, item_id FROM item_iocs"):
+            index.add(value, item_id, kind)
+    return index
+
+
+def _store_version(store):
+    return tuple(store.execute("SELECT COUNT(*), MAX(updated_at) FROM items")[0])
+
+
+class IndexBuilder:
+    """Rebuilds the match index in the background. Use from one event loop only.
+
+    `index` is None until the first build finishes. When the loader fails
+    the index is built from the item store alone and the previous loader
+    items are kept for later builds.
+    """
+
+    def __init__(self, loader, interval=INDEX_INTERVAL, store=None):
+        self._loader = loader  # async () -> list of items with "iocs"
+        self.interval = interval
+        self._store = store
+        self._items = []
+        self._version = None
+        self._task = None
+        self.index = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:
+                # keep serving the previous index
+                print("IOC index build failed:", exc)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self):
+        """Rebuild the index if the loader items or the item store changed."""
+        try:
+            items = await self._loader()
+        except Exception as exc:
+            print("IOC index loader failed:", exc)
+            items = self._items
+        store = self._store or get_store()
+        stored = await asyncio.to_thread(_store_version, store)
+        if self.index is not None and items is self._items and stored == self._version:
+            return False
+        self.index = await asyncio.to_thread(build_index, items, store)
+        self._items, self._version = items, stored
+        return True
@@ -0,0 +1,208 @@
+"""Live IOC deltas for /api/iocs/stream (Server-Sent Events).
+
+One producer task polls the indicator set on a fixed interval and diffs it
+against the previous poll. Only changes are published: indicators that were
+added, indicators that expired, and per-country count deltas. Each event is
+encoded once and fanned out to every subscriber queue, so CPU and bandwidth
+follow the change rate, not the number of connected globes.
+
+* resume      the last RING_SIZE events are kept; a client reconnecting with
+              Last-Event-ID gets exactly the events it missed
+* snapshot    new clients, and clients whose id is too old, first get the full
+              current state as a "snapshot" event
+* backpressure  every subscriber has a bounded queue; when a slow client
+              falls behind, its backlog is dropped and replaced by a fresh
+              snapshot, so it never holds memory for more than one state
+"""
+import asyncio
+import json
+import os
+import time
+from collections import Counter, deque
+
+STREAM_INTERVAL = float(os.getenv("IOC_STREAM_INTERVAL", "30"))
+STREAM_LIMIT = 1000  # ThreatFox rows considered by the stream
+RING_SIZE = 256
+SUBSCRIBER_QUEUE = 64
+HEARTBEAT_SECONDS = 15
+RECONNECT_MS = 5000  # "retry:" hint for EventSource
+
+
+def _indicator_key(it):
+    iocs = it.get("iocs") or {}
+    for kind in ("ips", "domains", "urls"):
+        for value in iocs.get(kind) or ():
+            return kind, value
+    return None
+
+
+def indicator_state(items):
+    """{(kind, value): {"kind", "value", "country", "id"}} for a list of items."""
+    state = {}
+    for it in items:
+        key = _indicator_key(it)
+        if key is None:
+            continue
+        hints = it.get("geo_hints") or []
+        state[key] = {
+            "kind": key[0],
+            "value": key[1],
+            "country": hints[0] if hints else None,
+            "id": it.get("id"),
+        }
+    return state
+
+
+def country_counts(state):
+    return Counter(v["country"] for v in state.values() if v["country"])
+
+
+def diff_states(old, new):
+    """(added, expired, per-country deltas) between two indicator states."""
+    added = [new[k] for k in new.keys() - old.keys()]
+    expired = [old[k] for k in old.keys() - new.keys()]
+    deltas = Counter()
+    for v in added:
+        if v["country"]:
+            deltas[v["country"]] += 1
+    for v in expired:
+        if v["country"]:
+            deltas[v["country"]] -= 1
+    return added, expired, {c: n for c, n in deltas.items() if n}
+
+
+def format_sse(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class _Subscriber:
+    __slots__ = ("queue", "needs_snapshot")
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        self.needs_snapshot = False
+
+
+class IocStream:
+    """Single producer, many subscribers. Use from one event loop only."""
+
+    def __init__(self, loader, interval=STREAM_INTERVAL):
+        self._loader = loader  # async () -> list of raw items
+        self.interval = interval
+        self._state = {}
+        self._last_id = 0
+        self._ring = deque(maxlen=RING_SIZE)  # (event id, encoded event)
+        self._subscribers = set()
+        self._snapshot = None  # (event id, encoded snapshot) cache
+        self._task = None
+        self._ready = asyncio.Event()
+
+    # -- producer -----------------------------------------------------------
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.update(await self._loader())
+            except Exception as exc:
+                # keep the previous state; clients simply see no change
+                print("IOC stream poll failed:", exc)
+            self._ready.set()
+            await asyncio.sleep(self.interval)
+
+    def update(self, items):
+        """Diff items against the current state and publish the change, if any."""
+        new_state = indicator_state(items)
+        added, expired, deltas = diff_states(self._state, new_state)
+        self._state = new_state
+        if not added and not expired:
+            return None
+        self._last_id += 1
+        encoded = format_sse(
+            self._last_id,
+            "delta",
+            {"added": added, "expired": expired, "country_deltas": deltas, "ts": time.time()},
+        )
+        self._ring.append((self._last_id, encoded))
+        for sub in self._subscribers:
+            self._offer(sub, encoded)
+        return self._last_id
+
+    @staticmethod
+    def _offer(sub, encoded):
+        if sub.needs_snapshot:
+            return  # backlog already dropped; a snapshot covers this event
+        try:
+            sub.queue.put_nowait(encoded)
+        except asyncio.QueueFull:
+            # slow client: drop its backlog and resync it with one snapshot
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.needs_snapshot = True
+            sub.queue.put_nowait(None)  # wake the consumer
+
+    # -- subscribers --------------------------------------------------------
+    def snapshot_event(self):
+        """Full current state as one encoded event (cached per event id)."""
+        if self._snapshot is None or self._snapshot[0] != self._last_id:
+            data = {
+                "indicators": list(self._state.values()),
+                "country_counts": dict(country_counts(self._state)),
+                "ts": time.time(),
+            }
+            self._snapshot = (self._last_id, format_sse(self._last_id, "snapshot", data))
+        return self._snapshot[1]
+
+    def _replay(self, last_event_id):
+        """Encoded events after last_event_id, or None if they are not all kept."""
+        if last_event_id == self._last_id:
+            return []
+        if not self._ring or last_event_id < self._ring[0][0] - 1 or last_event_id > self._last_id:
+            return None
+        return [enc for eid, enc in self._ring if eid > last_event_id]
+
+    async def events(self, last_event_id=None):
+        """Async iterator of encoded SSE chunks for one client."""
+        self.start()
+        await self._ready.wait()
+        sub = _Subscriber()
+        backlog = None if last_event_id is None else self._replay(last_event_id)
+        if backlog is None or len(backlog) > SUBSCRIBER_QUEUE:
+            sub.needs_snapshot = True
+        else:
+            for enc in backlog:
+                sub.queue.put_nowait(enc)
+        self._subscribers.add(sub)
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n".encode()
+            while True:
+                if sub.needs_snapshot:
+                    sub.needs_snapshot = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    yield self.snapshot_event()
+                    continue
+                try:
+                    chunk = await asyncio.wait_for(sub.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"  # keeps proxies from closing idle streams
+                    continue
+                if chunk is not None:
+                    yield chunk
+        finally:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
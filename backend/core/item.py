@@ -0,0 +1,226 @@
+"""Compact in-memory representation of a normalized feed item.
+
+A normalized item used to be a dict holding a nested `iocs` dict and up to
+eight lists, most of them empty. ThreatItem keeps the same fields in
+__slots__ instead:
+
+* list fields are tuples; every empty one is the shared EMPTY tuple
+* the four IOC lists are flattened into slots (no nested dict per item)
+* `source` and the short repeated strings of the list fields (country
+  codes, CVE IDs, products, technique IDs) are interned, so each distinct
+  value is stored once; IOC values rarely repeat and are stored as they are
+* `published_ts` holds the epoch seconds next to the ISO `published_at`
+
+ThreatItem is also a MutableMapping with the dict's keys, so pipeline stages
+keep using it.get("iocs"), it["geo_hints"] = [...] and so on. Reading
+"iocs" builds a small dict of tuples on the fly. Keys outside the known
+fields are kept in a per-item `extra` dict. to_dict()/from_dict() convert
+losslessly to and from the plain-dict form (lists instead of tuples) that
+JSON, pandas and the item store expect.
+"""
+import sys
+from collections.abc import Mapping, MutableMapping
+
+EMPTY = ()
+IOC_KINDS = ("ips", "domains", "urls", "hashes")
+
+_SCALARS = ("id", "source", "published_at", "published_ts", "title", "summary", "cvss_max")
+_SEQUENCES = ("cve_list", "products", "mitre_ttps", "geo_hints")
+# Dict key order of feeds.normalize()
+_KEYS = ("id", "source", "published_at", "published_ts", "title", "summary",
+         "cve_list", "cvss_max", "iocs", "products", "mitre_ttps", "geo_hints")
+_FIELDS = frozenset(_SCALARS + _SEQUENCES)
+_INTERN_MAX_LEN = 64
+# extra key holding IOC kinds outside IOC_KINDS; never exposed as a key
+_OTHER_IOCS = ("iocs",)
+
+
+def _freeze(values, intern=True):
+    """Tuple with short strings interned (unless intern=False); EMPTY for anything empty."""
+    if not values:
+        return EMPTY
+    if isinstance(values, str):
+        values = (values,)
+    if not intern:
+        return tuple(values)
+    return tuple(
+        sys.intern(v) if type(v) is str and len(v) <= _INTERN_MAX_LEN else v
+        for v in values
+    )
+
+
+class ThreatItem(MutableMapping):
+    __slots__ = (
+        "id", "source", "published_at", "published_ts", "title", "summary", "cvss_max",
+        "cve_list", "products", "mitre_ttps", "geo_hints",
+        "ips", "domains", "urls", "hashes",
+        "rank_score", "extra",
+    )
+
+    def __init__(self, id=None, source="UNKNOWN", published_at=None, published_ts=None,
+                 title="", summary="", cve_list=EMPTY, cvss_max=0.0, iocs=None,
+                 products=EMPTY, mitre_ttps=EMPTY, geo_hints=EMPTY):
+        self.id = id
+        self.source = sys.intern(source) if type(source) is str else source
+        self.published_at = published_at
+        self.published_ts = published_ts
+        self.title = title
+        self.summary = summary
+        self.cvss_max = float(cvss_max or 0.0)
+        self.cve_list = _freeze(cve_list)
+        self.products = _freeze(products)
+        self.mitre_ttps = _freeze(mitre_ttps)
+        self.geo_hints = _freeze(geo_hints)
+        self.rank_score = None
+        self.extra = None
+        self._set_iocs(iocs)
+
+    # -- conversion ---------------------------------------------------------
+    @classmethod
+    def from_dict(cls, d):
+        """ThreatItem from a normalized item dict (as produced by to_dict())."""
+        item = cls(
+            id=d.get("id"),
+            source=d.get("source", "UNKNOWN"),
+            published_at=d.get("published_at"),
+            published_ts=d.get("published_ts"),
+            title=d.get("title", ""),
+            summary=d.get("summary", ""),
+            cve_list=d.get("cve_list"),
+            cvss_max=d.get("cvss_max", 0.0),
+            iocs=d.get("iocs"),
+            products=d.get("products"),
+            mitre_ttps=d.get("mitre_ttps"),
+            geo_hints=d.get("geo_hints"),
+        )
+        for key, value in d.items():
+            if key not in _FIELDS and key != "iocs":
+                item[key] = value
+        return item
+
+    def to_dict(self):
+        """Plain dict with lists, in feeds.normalize() key order."""
+        return {key: self._plain(key) for key in self}
+
+    def _plain(self, key):
+        value = self[key]
+        if key == "iocs":
+            return {kind: list(values) for kind, values in value.items()}
+        if type(value) is tuple:
+            return list(value)
+        return value
+
+    # -- iocs ---------------------------------------------------------------
+    def _set_iocs(self, iocs):
+        iocs = iocs or {}
+        self.ips = _freeze(iocs.get("ips"), intern=False)
+        self.domains = _freeze(iocs.get("domains"), intern=False)
+        self.urls = _freeze(iocs.get("urls"), intern=False)
+        # None: no "hashes" key at all (IOC extraction has not run)
+        self.hashes = _freeze(iocs["hashes"], intern=False) if "hashes" in iocs else None
+        other = {k: list(v or ()) for k, v in iocs.items() if k not in IOC_KINDS}
+        if other:
+            self._extra()[_OTHER_IOCS] = other
+        elif self.extra:
+            self.extra.pop(_OTHER_IOCS, None)
+
+    def _iocs(self):
+        iocs = {"ips": self.ips, "domains": self.domains, "urls": self.urls}
+        if self.hashes is not None:
+            iocs["hashes"] = self.hashes
+        if self.extra and _OTHER_IOCS in self.extra:
+            iocs.update(self.extra[_OTHER_IOCS])
+        return iocs
+
+    def _extra(self):
+        if self.extra is None:
+            self.extra = {}
+        return self.extra
+
+    # -- mapping interface --------------------------------------------------
+    def __getitem__(self, key):
+        if key in _FIELDS:
+            return getattr(self, key)
+        if key == "iocs":
+            return self._iocs()
+        if key == "rank_score" and self.rank_score is not None:
+            return self.rank_score
+        if self.extra and key in self.extra and key != _OTHER_IOCS:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELDS:
+            return getattr(self, key)
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        if key in _SEQUENCES:
+            setattr(self, key, _freeze(value))
+        elif key == "source":
+            self.source = sys.intern(value) if type(value) is str else value
+        elif key == "cvss_max":
+            self.cvss_max = float(value or 0.0)
+        elif key in _FIELDS:
+            setattr(self, key, value)
+        elif key == "iocs":
+            self._set_iocs(value)
+        elif key == "rank_score":
+            self.rank_score = value
+        else:
+            self._extra()[key] = value
+
+    def __delitem__(self, key):
+        if key == "rank_score" and self.rank_score is not None:
+            self.rank_score = None
+        elif self.extra and key in self.extra and key != _OTHER_IOCS:
+            del self.extra[key]
+        elif key in _FIELDS or key == "iocs":
+            raise TypeError(f"{key!r} is a fixed ThreatItem field and cannot be deleted")
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELDS or key == "iocs":
+            return True
+        if key == "rank_score":
+            return self.rank_score is not None
+        return bool(self.extra) and key in self.extra and key != _OTHER_IOCS
+
+    def __iter__(self):
+        yield from _KEYS
+        if self.rank_score is not None:
+            yield "rank_score"
+        if self.extra:
+            for key in self.extra:
+                if key != _OTHER_IOCS:
+                    yield key
+
+    def __len__(self):
+        n = len(_KEYS) + (self.rank_score is not None)
+        if self.extra:
+            n += len(self.extra) - (_OTHER_IOCS in self.extra)
+        return n
+
+    def __eq__(self, other):
+        if isinstance(other, ThreatItem):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (ThreatItem.from_dict, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"ThreatItem(id={self.id!r}, source={self.source!r}, title={self.title[:40]!r})"
+
+
+def as_dict(item):
+    """Plain dict for a ThreatItem or a dict (returned as is)."""
+    return item.to_dict() if isinstance(item, ThreatItem) else item
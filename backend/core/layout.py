@@ -1,6 +1,11 @@
+import os
 import streamlit as st
 import urllib.parse as urlparse
 
+import pandas as pd
+
+from core import metrics
+
 def add_top_links():
     """
     Adds right-aligned 'Quick actions: Report Threat | Ask Help' links.
@@ -69,3 +74,21 @@ def add_top_links():
         """,
         unsafe_allow_html=True,
     )
+
+
+def add_timing_panel():
+    """
+    Optional sidebar panel with this process's pipeline timings (core.metrics).
+    Shown when "Show pipeline timings" is ticked on the Settings page or
+    SHOW_TIMINGS=1 is set, and only while metrics are enabled.
+    """
+    wanted = st.session_state.get("show_timings", os.getenv("SHOW_TIMINGS") == "1")
+    if not wanted or not metrics.enabled():
+        return
+    rows = metrics.stage_summary()
+    with st.sidebar.expander("Pipeline timings", expanded=True):
+        if not rows:
+            st.caption("No stage has run in this process yet.")
+            return
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.caption("Per process since start · last run, mean and total seconds · RSS delta of the last run")
@@ -1,4 +1,7 @@
-import os, json, textwrap
+import os, json, textwrap, threading, time
+
+from core import matcher, metrics, summarize
+from core.cache import CACHE_DIR, DiskCache, cache_key
 
 # Optional: real LLM client (OpenAI). If this import fails, the dashboard will
 # still work using the fallback templated summaries below.
@@ -11,6 +14,29 @@ except ImportError:  # handled at runtime
 # The default here uses a small, fast model that is good for summaries.
 DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 
+# Bump whenever the summarization prompt changes so cached summaries are
+# not reused across prompt versions.
+PROMPT_VERSION = "2"
+
+# Batch scheduling for summarize_items() (see core.summarize)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS", "6000"))
+LLM_BATCH_MAX_ITEMS = 20
+LLM_MAX_RETRIES = 2
+
+# Cached summaries are served for SUMMARY_TTL seconds; older entries are only
+# used as a fallback when the API errors, and removed after SUMMARY_MAX_AGE.
+SUMMARY_TTL = int(os.getenv("LLM_SUMMARY_TTL", str(24 * 3600)))
+SUMMARY_MAX_AGE = int(os.getenv("LLM_SUMMARY_MAX_AGE", str(7 * 24 * 3600)))
+SUMMARY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+_last_purge = 0.0
+_token_bucket = None
+_token_bucket_lock = threading.Lock()
+
 
 def _get_client():
     """
@@ -89,135 +115,243 @@ def _serialize_item_for_llm(it):
     }
 
 
-def _summarize_with_gpt(items):
+_SYSTEM_PROMPT = (
+    "You are powering a cyber attack awareness dashboard for SOC analysts.\n"
+    "You receive a JSON array of threat items under the key 'items'.\n"
+    "For EACH item, generate a concise summary that is:\n"
+    "- Focused on what is impacted and how an attacker would abuse it.\n"
+    "- Easy to skim in <3 sentences.\n"
+    "- Free of marketing/fluff.\n\n"
+    "For each item, output an object with these keys:\n"
+    "- id: the item's id, copied exactly from the input (string).\n"
+    "- title: short human-readable title (string).\n"
+    "- risk: one of Critical, High, Medium, Low.\n"
+    "- summary: <=3 sentences plain text.\n"
+    "- products: array of up to 4 key affected products/technologies.\n"
+    "- cves: array of up to 5 relevant CVE IDs.\n"
+    "- actions: array of 2–4 short SOC actions (verbs first, imperative).\n\n"
+    "Return ONLY valid JSON with this shape (no extra commentary):\n"
+    "{ \"items\": [ { ... }, ... ] }"
+)
+
+
+def _request_summaries(client, payloads, model=None):
+    """One Responses API call for {id: serialized item}.
+
+    Returns {id: generated dict} for the ids the model answered. Raises on
+    API or JSON errors so the scheduler can retry the batch.
     """
-    Ask GPT to turn the raw feed items into short SOC-friendly summaries.
-
-    Returns a list of dicts with the same shape as _template_summary().
-    On any error it returns None so the caller can fall back.
-    """
-    client = _get_client()
-    if client is None:
-        return None
-
-    # Build the JSON payload the model will see
-    payload = {"items": [_serialize_item_for_llm(it) for it in items]}
-
-    system_prompt = (
-        "You are powering a cyber attack awareness dashboard for SOC analysts.\n"
-        "You receive a JSON array of up to 5 threat items under the key 'items'.\n"
-        "For EACH item, generate a concise summary that is:\n"
-        "- Focused on what is impacted and how an attacker would abuse it.\n"
-        "- Easy to skim in <3 sentences.\n"
-        "- Free of marketing/fluff.\n\n"
-        "For each item, output an object with these keys:\n"
-        "- title: short human-readable title (string).\n"
-        "- risk: one of Critical, High, Medium, Low.\n"
-        "- summary: <=3 sentences plain text.\n"
-        "- products: array of up to 4 key affected products/technologies.\n"
-        "- cves: array of up to 5 relevant CVE IDs.\n"
-        "- actions: array of 2–4 short SOC actions (verbs first, imperative).\n\n"
-        "Return ONLY valid JSON with this shape (no extra commentary):\n"
-        "{ \"items\": [ { ... }, ... ] }"
-    )
-
+    payload = {"items": list(payloads.values())}
     user_prompt = (
         "Use this JSON as your input and follow the instructions above.\n"
         f"{json.dumps(payload, ensure_ascii=False)}"
     )
 
-    try:
-        # Using the Responses API (Python SDK):
-        # response = client.responses.create(model=..., input=...)
-        # https://platform.openai.com/docs/guides/text
+    # Using the Responses API (Python SDK):
+    # response = client.responses.create(model=..., input=...)
+    # https://platform.openai.com/docs/guides/text
+    with metrics.span("llm.request") as s:
+        s.items = len(payloads)
+        s.bytes = len(user_prompt)
         resp = client.responses.create(
-            model=DEFAULT_MODEL,
+            model=model or DEFAULT_MODEL,
             input=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": _SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
-            response_format={"type": "json_object"},
+            text={"format": {"type": "json_object"}},
         )
 
-        # With response_format=json_object the SDK exposes JSON as text.
-        raw = resp.output_text  # type: ignore[attr-defined]
-        data = json.loads(raw)
-    except Exception:
-        # Any problem with the API or JSON parsing -> signal failure.
-        return None
-
-    results = []
+    # With the json_object format the SDK exposes JSON as text.
+    data = json.loads(resp.output_text)  # type: ignore[attr-defined]
     generated_items = data.get("items", []) if isinstance(data, dict) else []
-    for original, gen in zip(items, generated_items):
-        # Start from the deterministic template and then layer GPT output on top
-        base = _template_summary(original)
-        if isinstance(gen, dict):
-            base["title"] = gen.get("title", base["title"]) or base["title"]
-            base["risk"] = gen.get("risk", base["risk"]) or base["risk"]
-
-            if gen.get("summary"):
-                base["summary"] = textwrap.shorten(
-                    str(gen["summary"]),
-                    width=550,
-                    placeholder="…",
-                )
+    answered = {}
+    for gen in generated_items:
+        if isinstance(gen, dict) and str(gen.get("id")) in payloads:
+            answered[str(gen["id"])] = gen
+    return answered
+
+
+def _merge_summary(original, gen):
+    """Start from the deterministic template and then layer GPT output on top."""
+    base = _template_summary(original)
+    if isinstance(gen, dict):
+        base["title"] = gen.get("title", base["title"]) or base["title"]
+        base["risk"] = gen.get("risk", base["risk"]) or base["risk"]
+
+        if gen.get("summary"):
+            base["summary"] = textwrap.shorten(
+                str(gen["summary"]),
+                width=550,
+                placeholder="…",
+            )
+
+        if isinstance(gen.get("products"), list) and gen["products"]:
+            base["products"] = gen["products"][:4]
 
-            if isinstance(gen.get("products"), list) and gen["products"]:
-                base["products"] = gen["products"][:4]
+        if isinstance(gen.get("cves"), list) and gen["cves"]:
+            base["cves"] = gen["cves"][:5]
 
-            if isinstance(gen.get("cves"), list) and gen["cves"]:
-                base["cves"] = gen["cves"][:5]
+        if isinstance(gen.get("actions"), list) and gen["actions"]:
+            base["actions"] = [str(a) for a in gen["actions"][:6]]
 
-            if isinstance(gen.get("actions"), list) and gen["actions"]:
-                base["actions"] = [str(a) for a in gen["actions"][:6]]
+    return base
 
-        results.append(base)
 
-    # If GPT returned fewer entries than we sent, fill the rest with templates
-    if len(results) < len(items):
-        for it in items[len(results) :]:
-            results.append(_template_summary(it))
+def summarize_items(items, client=None, model=None, concurrency=None):
+    """Summarize any number of items with batched, concurrent GPT calls.
 
-    return results
+    Items are packed into batches of at most LLM_BATCH_TOKENS estimated input
+    tokens (summaries are already truncated by _serialize_item_for_llm), run
+    LLM_CONCURRENCY at a time under an LLM_TOKENS_PER_MINUTE budget, and
+    matched back by id. Returns a list aligned with items; entries are None
+    where every attempt failed, and the whole result is None without a client.
+    """
+    client = client or _get_client()
+    if client is None:
+        return None
+
+    entries, keys = [], []
+    for pos, it in enumerate(items):
+        key = str(it.get("id") or f"item-{pos}")
+        if key in keys:
+            key = f"{key}#{pos}"  # keep ids unique within one request
+        keys.append(key)
+        payload = dict(_serialize_item_for_llm(it), id=key)
+        entries.append((key, payload, summarize.estimate_tokens(payload)))
+
+    batches = summarize.pack_batches(entries, LLM_BATCH_TOKENS, LLM_BATCH_MAX_ITEMS)
+    with metrics.span("llm.summarize") as s:
+        answered = summarize.run_batches(
+            batches,
+            lambda payloads: _request_summaries(client, payloads, model=model),
+            concurrency=concurrency or LLM_CONCURRENCY,
+            bucket=_get_token_bucket(),
+            max_retries=LLM_MAX_RETRIES,
+        )
+        s.items = len(answered)
+    return [
+        _merge_summary(it, answered[key]) if key in answered else None
+        for it, key in zip(items, keys)
+    ]
+
+
+def _get_token_bucket():
+    global _token_bucket
+    with _token_bucket_lock:
+        if _token_bucket is None:
+            _token_bucket = summarize.TokenBucket(
+                rate=LLM_TOKENS_PER_MINUTE / 60.0, capacity=LLM_TOKENS_PER_MINUTE
+            )
+        return _token_bucket
+
+
+def _get_summary_cache():
+    global _summary_cache, _last_purge
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = DiskCache(
+                os.path.join(CACHE_DIR, "llm"), max_bytes=SUMMARY_CACHE_MAX_BYTES
+            )
+        if time.time() - _last_purge > 3600:
+            _last_purge = time.time()
+            _summary_cache.purge(SUMMARY_MAX_AGE)
+        return _summary_cache
+
+
+def _summary_key(it, model=None):
+    """Content address of one item's summary: payload + model + prompt version."""
+    return cache_key(_serialize_item_for_llm(it), model or DEFAULT_MODEL, PROMPT_VERSION)
+
+
+def _cached_summary(cache, key):
+    """(summary or None, is_fresh) for a cache key."""
+    meta = cache.meta(key)
+    if not meta:
+        return None, False
+    age = time.time() - meta.get("stored_at", 0)
+    if age > SUMMARY_MAX_AGE:
+        cache.delete(key)
+        return None, False
+    body = cache.read(key)
+    if body is None:
+        return None, False
+    try:
+        return json.loads(body), age <= SUMMARY_TTL
+    except ValueError:
+        return None, False
 
 
 def build_top5_brief(top5_items):
     """Main entrypoint used by app.py.
 
-    Tries GPT first (if configured), otherwise falls back to static summaries.
+    Summaries are cached on disk per item (see _summary_key), so only items
+    without a fresh cached summary are sent to GPT. If GPT is unavailable,
+    stale cached summaries are used before falling back to static templates.
+    Works for any number of items; uncached ones are summarized in batches.
+    Each brief carries the id of its item under "id".
     """
-    # Try live GPT summaries
-    llm_results = _summarize_with_gpt(top5_items)
-    if llm_results is not None:
-        return llm_results
+    cache = _get_summary_cache()
+    keys = [_summary_key(it) for it in top5_items]
+    results = [None] * len(top5_items)
+    stale = {}
+    for i, key in enumerate(keys):
+        summary, fresh = _cached_summary(cache, key)
+        if summary is not None and fresh:
+            results[i] = summary
+        elif summary is not None:
+            stale[i] = summary
+    hits = sum(r is not None for r in results)
+    metrics.inc(metrics.CACHE_REQUESTS, hits, cache="llm_summary", result="hit")
+    metrics.inc(metrics.CACHE_REQUESTS, len(stale), cache="llm_summary", result="stale")
+    metrics.inc(metrics.CACHE_REQUESTS, len(keys) - hits - len(stale), cache="llm_summary", result="miss")
+
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        # Try live GPT summaries for the uncached items only
+        llm_results = summarize_items([top5_items[i] for i in missing])
+        for pos, i in enumerate(missing):
+            summary = llm_results[pos] if llm_results is not None else None
+            if summary is not None:
+                cache.set(
+                    keys[i],
+                    json.dumps(summary, ensure_ascii=False).encode("utf-8"),
+                    {"model": DEFAULT_MODEL, "prompt_version": PROMPT_VERSION},
+                )
+                results[i] = summary
+            elif i in stale:
+                results[i] = stale[i]
+            else:
+                # Fallback for offline / no key / errors
+                metrics.inc(metrics.STAGE_ITEMS, stage="llm.template_fallback")
+                results[i] = _template_summary(top5_items[i])
+
+    return [{**r, "id": it.get("id")} for it, r in zip(top5_items, results)]
+
+
+# Same cache + batching path for longer lists (ATT&CK and All Feeds views)
+build_brief = build_top5_brief
+
 
-    # Fallback for offline / no key / errors
-    return [_template_summary(it) for it in top5_items]
+def llm_enabled():
+    return _get_client() is not None
 
 
+@metrics.timed("attack")
 def map_attack_techniques(items):
     """Lightweight ATT&CK mapping.
 
     This still uses a simple keyword heuristic. If you want, you can extend this
-    to call GPT in a similar way to _summarize_with_gpt and ask it to propose
+    to call GPT in a similar way to summarize_items and ask it to propose
     ATT&CK technique IDs, but keeping it static here avoids extra token usage.
+    Keywords (including data/attack_rules.json) are matched by core.matcher.
     """
+    m = matcher.get_matcher()
     out = []
     for it in items:
-        title = (it.get("title", "") + " " + it.get("summary", "")).lower()
-        mapped = []
-
-        if any(k in title for k in ["phish", "social engineering", "credential"]):
-            mapped.append(("T1566", 0.7, "phishing / credential harvesting indicators"))
-
-        if any(k in title for k in ["command injection", "rce", "remote code execution"]):
-            mapped.append(("T1059", 0.8, "remote command execution patterns"))
-
-        if any(k in title for k in ["brute", "password spray", "credential stuffing"]):
-            mapped.append(("T1110", 0.6, "authentication brute-force activity"))
-
-        if "ransom" in title:
-            mapped.append(("T1486", 0.7, "ransomware / data encryption behavior"))
+        text = it.get("title", "") + " " + it.get("summary", "")
+        attack_ids = {value for kind, value in m.tags(text) if kind == "attack"}
+        mapped = matcher.attack_techniques(attack_ids)
 
         if not mapped:
             mapped.append(("TTP-UNKNOWN", 0.3, "no heuristic rule hit"))
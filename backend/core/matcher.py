@@ -0,0 +1,212 @@
+"""Single-pass keyword tagging (Aho-Corasick) for geo hints, actors and ATT&CK.
+
+All keyword dictionaries are compiled once into one automaton, so tagging a
+text is a single linear scan no matter how many patterns there are. Matching
+is case-insensitive and word-boundary aware: a pattern must start at a word
+boundary ("UK" does not match inside "Ukraine", "rce" not inside "source"),
+and whole-word patterns must also end at one. Prefix patterns such as
+"phish" still match "phishing".
+"""
+import json
+import os
+import threading
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+ATTACK_RULES_PATH = os.path.join(DATA_DIR, "attack_rules.json")
+
+# keyword -> ISO country / region code. Names match at a word start and may
+# run on ("Russian", "Europeans", "Saudis"); all-caps codes (USA, UK, KSA,
+# UAE) only match as whole words, so "UK" stays out of "Ukraine".
+GEO_KEYWORDS = [
+    ("USA", "US"),
+    ("United States", "US"),
+    ("Saudi Arabia", "SA"),
+    ("Saudi", "SA"),
+    ("KSA", "SA"),
+    ("United Arab Emirates", "AE"),
+    ("UAE", "AE"),
+    ("United Kingdom", "GB"),
+    ("UK", "GB"),
+    ("China", "CN"),
+    ("Russia", "RU"),
+    ("Europe", "EU"),
+]
+
+# actor display name -> aliases. Aliases match at a word start and may run
+# on, as versions and suffixes often follow them ("LockBit3.0", "APT28s").
+KNOWN_ACTORS = {
+    "Lazarus Group": ["lazarus"],
+    "APT41": ["apt41", "apt-41"],
+    "FIN7": ["fin7", "fin 7"],
+    "APT28 (Fancy Bear)": ["apt28", "apt-28", "fancy bear"],
+    "APT29 (Cozy Bear)": ["apt29", "apt-29", "cozy bear"],
+    "Conti": ["conti"],
+    "LockBit": ["lockbit"],
+    "REvil": ["revil", "sodinokibi"],
+}
+
+# Aliases that also start common words ("continue", "reviled") and so only
+# match as whole words.
+WHOLE_WORD_ALIASES = {"conti", "revil"}
+
+# (technique, confidence, rationale, keyword prefixes), in reporting order
+ATTACK_HEURISTICS = [
+    ("T1566", 0.7, "phishing / credential harvesting indicators",
+     ["phish", "social engineering", "credential"]),
+    ("T1059", 0.8, "remote command execution patterns",
+     ["command injection", "rce", "remote code execution"]),
+    ("T1110", 0.6, "authentication brute-force activity",
+     ["brute", "password spray", "credential stuffing"]),
+    ("T1486", 0.7, "ransomware / data encryption behavior",
+     ["ransom"]),
+]
+
+# Confidence for techniques that only come from data/attack_rules.json
+RULE_CONFIDENCE = 0.5
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over lower-cased patterns.
+
+    Each pattern carries a tag (any hashable value). whole_word=False only
+    requires a word boundary before the match, so it behaves like a prefix.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._patterns = []  # (length, tag, whole_word)
+        self._built = False
+
+    def add(self, pattern, tag, whole_word=True):
+        pattern = pattern.lower()
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append(len(self._patterns))
+        self._patterns.append((len(pattern), tag, whole_word))
+        self._built = False
+
+    def build(self):
+        """Compute failure links (BFS) and merge outputs along them."""
+        queue = list(self._goto[0].values())
+        for s in queue:
+            self._fail[s] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def finditer(self, text):
+        """Yield (start, end, tag) for every boundary-respecting match."""
+        if not self._built:
+            self.build()
+        if not text:
+            return
+        lower = text.lower()
+        n = len(lower)
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(lower):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            for idx in out[state]:
+                length, tag, whole_word = patterns[idx]
+                start = i - length + 1
+                if start > 0 and lower[start - 1].isalnum():
+                    continue
+                if whole_word and i + 1 < n and lower[i + 1].isalnum():
+                    continue
+                yield start, i + 1, tag
+
+    def tags(self, text):
+        """Set of tags found in text."""
+        return {tag for _, _, tag in self.finditer(text)}
+
+    def __len__(self):
+        return len(self._patterns)
+
+
+def load_attack_rules(path=ATTACK_RULES_PATH):
+    """keyword -> [technique IDs] from data/attack_rules.json ({} if missing)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {kw: list(tids) for kw, tids in rules.items() if isinstance(tids, list)}
+
+
+def build_default_matcher():
+    """Tags are ("geo", iso), ("actor", name) and ("attack", technique_id)."""
+    m = KeywordMatcher()
+    for kw, iso in GEO_KEYWORDS:
+        m.add(kw, ("geo", iso), whole_word=kw.isupper())
+    for name, aliases in KNOWN_ACTORS.items():
+        for alias in aliases:
+            m.add(alias, ("actor", name), whole_word=alias in WHOLE_WORD_ALIASES)
+    for tid, _, _, keywords in ATTACK_HEURISTICS:
+        for kw in keywords:
+            m.add(kw, ("attack", tid), whole_word=False)
+    for kw, tids in load_attack_rules().items():
+        for tid in tids:
+            m.add(kw, ("attack", tid), whole_word=False)
+    return m.build()
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_matcher():
+    """Process-wide matcher, compiled on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = build_default_matcher()
+        return _default
+
+
+def tag_text(text):
+    """{"geo": set, "actor": set, "attack": set} for one text."""
+    out = {"geo": set(), "actor": set(), "attack": set()}
+    for kind, value in get_matcher().tags(text):
+        out.setdefault(kind, set()).add(value)
+    return out
+
+
+def attack_techniques(attack_ids):
+    """Order matched technique IDs as (technique, confidence, rationale)."""
+    mapped = []
+    seen = set()
+    for tid, conf, why, _ in ATTACK_HEURISTICS:
+        if tid in attack_ids:
+            mapped.append((tid, conf, why))
+            seen.add(tid)
+    for tid in sorted(attack_ids - seen):
+        mapped.append((tid, RULE_CONFIDENCE, "matched data/attack_rules.json keyword"))
+    return mapped
@@ -0,0 +1,290 @@
+"""In-process pipeline metrics: timing spans, histograms and counters.
+
+    with metrics.span("rank.dedup") as s:
+        ...
+        s.items = len(items)
+
+    @metrics.timed("normalize")      # items = len(return value)
+    def normalize_all(items): ...
+
+    metrics.inc(metrics.CACHE_REQUESTS, cache="http", result="hit")
+
+Every span records its duration in a histogram, item/byte counters and the
+process RSS delta, labelled by stage (plus any extra labels, e.g. source).
+render_prometheus() serves them in the Prometheus text format (api.py
+/metrics); stage_summary() feeds the Streamlit timing panel.
+
+Metrics are per process. With METRICS_ENABLED=0 span() returns a shared
+no-op object and inc()/observe() return after one flag check, so the
+instrumented code pays next to nothing.
+"""
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+STAGE_SECONDS = "threatintel_stage_seconds"
+STAGE_ITEMS = "threatintel_stage_items_total"
+STAGE_BYTES = "threatintel_stage_bytes_total"
+STAGE_ERRORS = "threatintel_stage_errors_total"
+STAGE_MEMORY = "threatintel_stage_memory_delta_bytes"
+FETCH_BYTES = "threatintel_fetch_bytes_total"
+HTTP_SECONDS = "threatintel_http_request_seconds"
+CACHE_REQUESTS = "threatintel_cache_requests_total"
+
+# name -> (type, help)
+METRICS = {
+    STAGE_SECONDS: ("histogram", "Wall-clock time of a pipeline stage or fetcher"),
+    STAGE_ITEMS: ("counter", "Items produced by a pipeline stage or fetcher"),
+    STAGE_BYTES: ("counter", "Bytes handled by a pipeline stage"),
+    STAGE_ERRORS: ("counter", "Stage runs that raised"),
+    STAGE_MEMORY: ("gauge", "Process RSS change during the last run of a stage"),
+    FETCH_BYTES: ("counter", "Response bytes downloaded from upstream feeds"),
+    HTTP_SECONDS: ("histogram", "Upstream HTTP round trip time"),
+    CACHE_REQUESTS: ("counter", "Cache lookups by cache and result (hit, miss, stale, revalidated)"),
+}
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_enabled = METRICS_ENABLED
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_histograms = {}  # (name, labels) -> _Histogram
+_last = {}        # labels of a stage -> {"seconds", "items", "memory"} of its last run
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss():
+    """Resident set size in bytes, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+        _last.clear()
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1.0, **labels):
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def set_gauge(name, value, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def observe(name, value, buckets=SECONDS_BUCKETS, **labels):
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = _Histogram(buckets)
+        hist.observe(value)
+
+
+# =========================
+#  SPANS
+# =========================
+class _Span:
+    """Times a block; set .items / .bytes inside it to count them too."""
+
+    __slots__ = ("labels", "items", "bytes", "_t0", "_rss0")
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.items = None
+        self.bytes = None
+
+    def __enter__(self):
+        self._rss0 = _rss()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._t0
+        rss = _rss()
+        memory = rss - self._rss0 if rss is not None and self._rss0 is not None else None
+        key = _labels(self.labels)
+        with _lock:
+            hist = _histograms.get((STAGE_SECONDS, key))
+            if hist is None:
+                hist = _histograms[(STAGE_SECONDS, key)] = _Histogram(SECONDS_BUCKETS)
+            hist.observe(elapsed)
+            if self.items is not None:
+                _counters[(STAGE_ITEMS, key)] = _counters.get((STAGE_ITEMS, key), 0.0) + self.items
+            if self.bytes:
+                _counters[(STAGE_BYTES, key)] = _counters.get((STAGE_BYTES, key), 0.0) + self.bytes
+            if exc_type is not None:
+                _counters[(STAGE_ERRORS, key)] = _counters.get((STAGE_ERRORS, key), 0.0) + 1
+            if memory is not None:
+                _gauges[(STAGE_MEMORY, key)] = memory
+            _last[key] = {"seconds": elapsed, "items": self.items, "memory": memory}
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+    items = None
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass  # span.items = ... is ignored while disabled
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage, **labels):
+    """Context manager timing one run of stage."""
+    if not _enabled:
+        return _NOOP_SPAN
+    labels["stage"] = stage
+    return _Span(labels)
+
+
+def timed(stage):
+    """Decorator: run the function inside span(stage), counting len(result) items."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(stage) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, (list, tuple, dict)):
+                    s.items = len(result)
+                return result
+        return wrapper
+    return decorate
+
+
+# =========================
+#  EXPORT
+# =========================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v):
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted(
+            ((k, (h.bounds, list(h.counts), h.sum, h.count)) for k, h in _histograms.items()),
+            key=lambda kv: kv[0],
+        )
+
+    by_name = {}
+    for (name, labels), value in counters + gauges:
+        by_name.setdefault(name, []).append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+    for (name, labels), (bounds, counts, total, count) in histograms:
+        lines = by_name.setdefault(name, [])
+        running = 0
+        for bound, n in zip(list(bounds) + [math.inf], counts):
+            running += n
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', _fmt_value(bound))])} {running}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {count}")
+
+    out = []
+    for name in sorted(by_name):
+        kind, help_text = METRICS.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(by_name[name])
+    return "\n".join(out) + "\n"
+
+
+def stage_summary():
+    """Rows for the timing panel: one per stage (and label set), slowest first."""
+    with _lock:
+        rows = []
+        for (name, labels), hist in _histograms.items():
+            if name != STAGE_SECONDS:
+                continue
+            last = _last.get(labels, {})
+            label_map = dict(labels)
+            stage = label_map.pop("stage", "")
+            rows.append({
+                "stage": stage + "".join(f" [{v}]" for _, v in sorted(label_map.items())),
+                "runs": hist.count,
+                "last_s": round(last.get("seconds", 0.0), 4),
+                "mean_s": round(hist.sum / hist.count, 4) if hist.count else 0.0,
+                "total_s": round(hist.sum, 3),
+                "last_items": last.get("items"),
+                "last_mem_mb": None if last.get("memory") is None else round(last["memory"] / 1e6, 1),
+            })
+    rows.sort(key=lambda r: -r["total_s"])
+    return rows
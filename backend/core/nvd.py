@@ -0,0 +1,257 @@
+"""Incremental NVD CVE ingestion.
+
+Each sync asks NVD only for CVEs modified since the last successful run
+(lastModStartDate / lastModEndDate), walks every page with startIndex and
+yields items page by page. The watermark and a bounded buffer of recent items
+are persisted under CACHE_DIR so a refresh with no new CVEs costs one request.
+The saved watermark trails the end of the synced range by WATERMARK_OVERLAP
+seconds, so changes NVD indexes late are picked up by the next sync; CVEs
+seen twice are merged by id. A large delta is walked in windows of a few
+pages each and the watermark advances after every completed window, so a
+sync cut short by the collection deadline still makes progress.
+
+Point NVD_API_URL at a local stand-in server to run against fixtures.
+"""
+import collections
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from core.cache import CACHE_DIR
+
+NVD_API_URL = os.getenv("NVD_API_URL", "https://services.nvd.nist.gov/rest/json/cves/2.0")
+NVD_API_KEY = os.getenv("NVD_API_KEY")
+NVD_STATE_PATH = os.path.join(CACHE_DIR, "nvd_state.json")
+
+# NVD allows 5 requests per rolling 30s without a key and 50 with one.
+RATE_LIMIT = (50, 30.0) if NVD_API_KEY else (5, 30.0)
+PAGE_SIZE = 2000          # NVD maximum for the CVE API
+MAX_WINDOW_DAYS = 120     # NVD rejects lastMod ranges longer than this
+INITIAL_BACKFILL_DAYS = 1
+RECENT_MAX = 500          # items kept in the persisted buffer
+WATERMARK_OVERLAP = 300   # seconds of the previous range re-requested each sync
+WINDOW_MAX_PAGES = 3      # pages per lastMod window; larger windows are narrowed
+MIN_WINDOW_SECONDS = 60   # windows are never narrowed below this
+
+
+class RatePacer:
+    """Blocks just long enough to keep at most max_calls per rolling period."""
+
+    def __init__(self, max_calls, period, clock=time.monotonic, sleep=time.sleep):
+        self.max_calls = max_calls
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._calls = collections.deque()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = self._clock()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+            if len(self._calls) >= self.max_calls:
+                delay = self.period - (now - self._calls[0])
+                if delay > 0:
+                    self._sleep(delay)
+                now = self._clock()
+                self._calls.popleft()
+            self._calls.append(now)
+
+
+def _fmt(dt):
+    return dt.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+00:00")
+
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def map_cve(v):
+    """Map one NVD 'vulnerabilities' entry into the common item schema."""
+    cve = v.get("cve", {})
+    cve_id = cve.get("id") or cve.get("CVE", {}).get("ID")
+    if not cve_id:
+        return None
+
+    description = ""
+    for desc in cve.get("descriptions") or []:
+        if desc.get("lang", "en") == "en":
+            description = desc.get("value", "")
+            break
+
+    cvss = 0.0
+    metrics = cve.get("metrics", {})
+    for key in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV3"):
+        if metrics.get(key):
+            cvss = metrics[key][0].get("cvssData", {}).get("baseScore", 0.0)
+            break
+
+    return {
+        "id": cve_id,
+        "source": "NVD",
+        "published_at": cve.get("published", datetime.datetime.utcnow().isoformat()),
+        "last_modified": cve.get("lastModified"),
+        "title": cve_id,
+        "summary": description,
+        "cve_list": [cve_id],
+        "cvss_max": cvss,
+        "iocs": {"ips": [], "domains": [], "urls": []},
+        "products": [],
+        "mitre_ttps": [],
+    }
+
+
+class NvdCollector:
+    def __init__(self, base_url=NVD_API_URL, api_key=NVD_API_KEY,
+                 state_path=NVD_STATE_PATH, pacer=None, page_size=PAGE_SIZE,
+                 timeout=30):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.state_path = state_path
+        self.page_size = page_size
+        self.timeout = timeout
+        self.pacer = pacer or RatePacer(*RATE_LIMIT)
+        self._lock = threading.Lock()
+
+    # ---------- persisted state ----------
+
+    def load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"watermark": None, "recent": []}
+
+    def save_state(self, state):
+        directory = os.path.dirname(self.state_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    # ---------- paging ----------
+
+    def _get_page(self, start, end, start_index):
+        params = {
+            "lastModStartDate": _fmt(start),
+            "lastModEndDate": _fmt(end),
+            "startIndex": start_index,
+            "resultsPerPage": self.page_size,
+        }
+        headers = {"apiKey": self.api_key} if self.api_key else {}
+        self.pacer.wait()
+        resp = requests.get(self.base_url, params=params, headers=headers, timeout=self.timeout)
+        if resp.status_code != 200:
+            raise RuntimeError(f"NVD returned HTTP {resp.status_code}")
+        return resp.json()
+
+    def iter_pages(self, start, end, on_window=None):
+        """Yield lists of mapped items for every page modified in [start, end].
+
+        The range is walked in windows no longer than NVD's 120-day limit.
+        When the first page of a window reports more than WINDOW_MAX_PAGES
+        pages of results, its items are still yielded and the window is
+        narrowed in proportion; CVEs already yielded are not yielded again.
+        on_window(window_end) is called once every page of a window was
+        yielded.
+        """
+        budget = WINDOW_MAX_PAGES * self.page_size
+        min_window = datetime.timedelta(seconds=MIN_WINDOW_SECONDS)
+        seen = set()
+        window_start = start
+        while window_start < end:
+            window_end = min(end, window_start + datetime.timedelta(days=MAX_WINDOW_DAYS))
+            start_index = 0
+            while True:
+                data = self._get_page(window_start, window_end, start_index)
+                vulns = data.get("vulnerabilities", [])
+                items = [it for it in (map_cve(v) for v in vulns) if it and it["id"] not in seen]
+                if items:
+                    seen.update(it["id"] for it in items)
+                    yield items
+                total = data.get("totalResults", 0)
+                span = window_end - window_start
+                if start_index == 0 and total > budget and span > min_window:
+                    window_end = window_start + max(min_window, span * (budget / total))
+                    continue
+                start_index += len(vulns)
+                if not vulns or start_index >= total:
+                    break
+            if on_window is not None:
+                on_window(window_end)
+            window_start = window_end
+
+    def iter_delta(self):
+        """Yield pages of items changed since the persisted watermark.
+
+        The watermark and the recent buffer are saved after every completed
+        window, so a run that fails or is stopped part way is resumed from
+        the last complete window. synced_at is only set once the whole delta
+        was received.
+        """
+        with self._lock:
+            state = self.load_state()
+            end = _utcnow()
+            if state.get("watermark"):
+                start = datetime.datetime.fromisoformat(state["watermark"])
+            else:
+                start = end - datetime.timedelta(days=INITIAL_BACKFILL_DAYS)
+
+            overlap = datetime.timedelta(seconds=WATERMARK_OVERLAP)
+            received = []
+
+            def commit(window_end):
+                state["watermark"] = max(start, window_end - overlap).isoformat()
+                state["recent"] = _merge_recent(state.get("recent", []), received)
+                received.clear()
+                self.save_state(state)
+
+            for page in self.iter_pages(start, end, on_window=commit):
+                received.extend(page)
+                yield page
+
+            state["synced_at"] = time.time()
+            self.save_state(state)
+
+    def sync(self):
+        """Pull the delta and return the number of changed CVEs."""
+        return sum(len(page) for page in self.iter_delta())
+
+    def is_stale(self, max_age):
+        return time.time() - self.load_state().get("synced_at", 0) >= max_age
+
+    def sync_if_stale(self, max_age):
+        if self.is_stale(max_age):
+            return self.sync()
+        return 0
+
+    def recent(self, limit=50):
+        """Most recently published items from the persisted buffer."""
+        return self.load_state().get("recent", [])[:limit]
+
+
+def _merge_recent(recent, new_items):
+    by_id = {it["id"]: it for it in recent}
+    for it in new_items:
+        by_id[it["id"]] = it
+    merged = sorted(by_id.values(), key=lambda it: it.get("published_at") or "", reverse=True)
+    return merged[:RECENT_MAX]
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def get_collector():
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = NvdCollector()
+        return _collector
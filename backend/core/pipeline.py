@@ -0,0 +1,208 @@
+"""Streaming pipeline: collect -> normalize -> enrich -> score as generators.
+
+The batch pipeline (core.snapshot) materialises the whole corpus several
+times over: the concatenated raw list, the normalized list and the sorted
+copy made by rank.score_and_group(). That is fine for one refresh of the live
+feeds, but memory grows with the corpus when backfilling a large export, even
+though the consumer only wants the top few items and a handful of counters.
+
+Here every stage is a generator over items, and the stages that work best in
+bulk (IOC extraction, the GeoIP lookup, vectorized scoring) run on batches of
+STREAM_BATCH items. The tail of the pipeline keeps
+
+* TopK   the k best items in a bounded min-heap
+* Kpis   the Home page counters (items today, unique CVEs, sources)
+
+so peak memory is bounded by the batch size, k, the duplicate window and the
+number of distinct CVEs/sources, not by the number of items streamed.
+
+    result = pipeline.run(feeds.iter_all_sources(), k=5)
+    result.top, result.kpis
+
+Scores match rank.score_and_group() except for the duplication feature: it
+is counted against a dedup.WindowedDuplicateIndex of the STREAM_DEDUP_WINDOW
+items around each item instead of against the whole corpus.
+"""
+import datetime
+import heapq
+import os
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+from core import dedup, enrich, feeds, metrics, rank, store
+
+STREAM_BATCH = int(os.getenv("STREAM_BATCH", "512"))
+STREAM_DEDUP_WINDOW = int(os.getenv("STREAM_DEDUP_WINDOW", "4000"))
+
+
+def batched(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# =========================
+#  STAGES
+# =========================
+def normalize_stream(raw):
+    for item in raw:
+        yield feeds.normalize(item)
+
+
+def enrich_stream(items, batch_size=STREAM_BATCH, archive=False):
+    """add_iocs + enrich_all per batch; with archive=True each batch is upserted into the item store."""
+    item_store = store.get_store() if archive else None
+    for batch in batched(items, batch_size):
+        batch = feeds.enrich_all(enrich.add_iocs(batch, workers=1))
+        if item_store is not None:
+            with metrics.span("store.archive") as s:
+                item_store.upsert_many(batch)
+                s.items = len(batch)
+        yield from batch
+
+
+def score_stream(items, batch_size=STREAM_BATCH, now=None, window=STREAM_DEDUP_WINDOW):
+    """Set rank_score on every item, scoring one batch at a time.
+
+    now is fixed for the whole stream (epoch seconds, default: when the
+    stream starts) so early and late batches are ranked on the same clock.
+
+    Each batch enters the duplicate index as soon as it arrives but is only
+    scored a few batches later, so its duplication feature also counts the
+    near-duplicates published after it (up to about window/2 items later),
+    as the batch ranker does for the whole corpus.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc).timestamp() if now is None else now
+    window = max(window, 4 * batch_size)
+    dup_index = dedup.WindowedDuplicateIndex(window=window, threshold=rank.DUP_THRESHOLD)
+    # scored items must still be in the index: at most window/2 items behind
+    lag = max(window // 2 // batch_size - 1, 1)
+    pending = deque()
+    for batch in batched(items, batch_size):
+        dedup.cluster_items(batch, index=dup_index)
+        pending.append(batch)
+        if len(pending) > lag:
+            yield from _score(pending.popleft(), now, dup_index)
+    while pending:
+        yield from _score(pending.popleft(), now, dup_index)
+
+
+def _score(batch, now, dup_index):
+    with metrics.span("rank.stream") as s:
+        # items are already in dup_index; re-adding them only reads their cluster sizes
+        scores = np.round(rank.score_batch(batch, now=now, dup_index=dup_index), 4)
+        for it, score in zip(batch, scores.tolist()):
+            it["rank_score"] = score
+        s.items = len(batch)
+    return batch
+
+
+# =========================
+#  SINKS
+# =========================
+class TopK:
+    """The k highest-scoring items seen so far, in a bounded min-heap.
+
+    Ties keep stream order (the earlier item wins), like the stable sort in
+    rank.score_and_group().
+    """
+
+    def __init__(self, k=5, key="rank_score"):
+        self.k = k
+        self.key = key
+        self._heap = []  # (score, -seq, item); the root is the weakest kept item
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item):
+        entry = (item.get(self.key) or 0.0, -self._seq, item)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    @property
+    def threshold(self):
+        """Score an item has to beat to enter a full heap (None while not full)."""
+        return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    def items(self):
+        """Kept items, best first."""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+class Kpis:
+    """Home page counters, updated one item at a time."""
+
+    def __init__(self, today=None):
+        self.today = today or datetime.datetime.utcnow().strftime("%Y-%m-%d")
+        self.items = 0
+        self.items_today = 0
+        self.cves = set()
+        self.sources = set()
+
+    def add(self, item):
+        self.items += 1
+        if (item.get("published_at") or "")[:10] == self.today:
+            self.items_today += 1
+        self.cves.update(item.get("cve_list") or ())
+        self.sources.add(item.get("source"))
+
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "items_today": self.items_today,
+            "unique_cves": len(self.cves),
+            "sources": len(self.sources),
+        }
+
+
+def kpis(items, today=None):
+    """Kpis.as_dict() for a list of items."""
+    counter = Kpis(today=today)
+    for it in items:
+        counter.add(it)
+    return counter.as_dict()
+
+
+# =========================
+#  RUNNER
+# =========================
+class StreamResult:
+    __slots__ = ("top", "kpis")
+
+    def __init__(self, top, kpis):
+        self.top = top
+        self.kpis = kpis
+
+
+def run(raw, k=5, now=None, batch_size=STREAM_BATCH, archive=False, today=None):
+    """Stream raw collector items through the pipeline; return top-k and KPIs.
+
+    raw is any iterable of raw items (feeds.iter_all_sources(), a JSON Lines
+    reader, ...). Items that fall out of the top-k are dropped as soon as
+    their batch has been counted.
+    """
+    top = TopK(k)
+    counter = Kpis(today=today)
+    with metrics.span("pipeline.stream") as s:
+        scored = score_stream(
+            enrich_stream(normalize_stream(raw), batch_size=batch_size, archive=archive),
+            batch_size=batch_size,
+            now=now,
+        )
+        for it in scored:
+            counter.add(it)
+            top.push(it)
+        s.items = counter.items
+    if archive:
+        store.get_store().compact()
+    return StreamResult(top=top.items(), kpis=counter.as_dict())
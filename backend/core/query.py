@@ -0,0 +1,74 @@
+"""Read-side queries over the item store (core.store)."""
+import json
+
+from core.store import get_store, to_epoch
+
+MAX_LIMIT = 1000
+
+
+def query_items(since=None, source=None, min_cvss=None, cve=None, ioc=None,
+                limit=100, offset=0, store=None):
+    """Return stored items matching every given filter, newest first.
+
+    since     ISO date/datetime (or epoch seconds); items published at or after it
+    source    exact source name, e.g. "CISA"
+    min_cvss  minimum cvss_max
+    cve       CVE ID, matched through the item_cves index
+    ioc       indicator value (IP, domain, URL, hash), matched through item_iocs
+    """
+    store = store or get_store()
+    clauses, params = [], []
+    sql = "SELECT items.data FROM items"
+
+    if cve:
+        sql += " JOIN item_cves c ON c.item_id = items.id"
+        clauses.append("c.cve = ?")
+        params.append(cve.strip().upper())
+    if ioc:
+        sql += " JOIN item_iocs i ON i.item_id = items.id"
+        clauses.append("i.value = ?")
+        params.append(ioc.strip().lower())
+    if since is not None:
+        since_ts = to_epoch(since)
+        if since_ts is None:
+            raise ValueError(f"Unrecognized 'since' value: {since!r}")
+        clauses.append("items.published_ts >= ?")
+        params.append(since_ts)
+    if source:
+        clauses.append("items.source = ?")
+        params.append(source)
+    if min_cvss is not None:
+        clauses.append("items.cvss_max >= ?")
+        params.append(float(min_cvss))
+
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY items.published_ts DESC LIMIT ? OFFSET ?"
+    params.extend([max(1, min(int(limit), MAX_LIMIT)), max(0, int(offset))])
+
+    return [json.loads(row["data"]) for row in store.execute(sql, params)]
+
+
+def items_by_id(ids, store=None):
+    """Stored items for ids, in the order given; unknown ids are skipped."""
+    store = store or get_store()
+    ids = [str(i) for i in ids]
+    found = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        marks = ",".join("?" * len(chunk))
+        for row in store.execute(f"SELECT id, data FROM items WHERE id IN ({marks})", chunk):
+            found[row["id"]] = json.loads(row["data"])
+    return [found[i] for i in ids if i in found]
+
+
+def source_counts(since=None, store=None):
+    """{source: item count}, optionally restricted to items since a time."""
+    store = store or get_store()
+    sql = "SELECT source, COUNT(*) AS n FROM items"
+    params = []
+    if since is not None:
+        sql += " WHERE published_ts >= ?"
+        params.append(to_epoch(since))
+    sql += " GROUP BY source"
+    return {row["source"]: row["n"] for row in store.execute(sql, params)}
@@ -1,7 +1,21 @@
-from collections import defaultdict
 from datetime import datetime, timezone
 import math
 
+import numpy as np
+
+from core import dedup, metrics
+
+HALF_LIFE_DAYS = 7.0
+UNPARSEABLE_AGE_DAYS = 999
+# published value of items whose date can't be parsed
+MISSING_TS = -1.0
+TRUSTED_SOURCES = ('CISA', 'CERT', 'NVD')
+# estimated Jaccard similarity at which two stories count as duplicates
+DUP_THRESHOLD = 0.5
+
+# score = W_CVSS*cvss + W_DUP*dup + W_SOURCE*source_w + W_RECENCY*recency + W_IOC*ioc_density
+W_CVSS, W_DUP, W_SOURCE, W_RECENCY, W_IOC = 0.35, 0.25, 0.15, 0.15, 0.10
+
 def _days_since(dt_iso):
     try:
         dt = datetime.fromisoformat(dt_iso.replace('Z','+00:00'))
@@ -13,31 +27,117 @@ def _days_since(dt_iso):
 def _recency_decay(days, half_life=7.0):
     return math.exp(-math.log(2) * days/half_life)
 
-def _duplication_score(items):
-    # group by normalized title key
-    buckets = defaultdict(list)
-    for it in items:
-        key = (it['title'][:50].lower()).strip()
-        buckets[key].append(it)
-    dup_score = {it['id']: (len(buckets[(it['title'][:50].lower()).strip()]) - 1) / 4.0
-                 for it in items}
+def _duplication_array(items, index=None):
+    # near-duplicate cluster sizes (core.dedup), aligned with items
+    with metrics.span("rank.dedup") as s:
+        _, sizes = dedup.cluster_items(items, index=index, threshold=DUP_THRESHOLD)
+        s.items = len(items)
     # cap at 1
-    return {k: min(1.0, v) for k, v in dup_score.items()}
+    return np.minimum((np.asarray(sizes, dtype=np.float64) - 1.0) / 4.0, 1.0)
+
+def _duplication_score(items):
+    dup = _duplication_array(items)
+    return {it['id']: float(v) for it, v in zip(items, dup)}
+
+def _epoch(it):
+    """Publication time in epoch seconds, or None if it can't be parsed."""
+    ts = it.get('published_ts')
+    if ts is not None:
+        return ts
+    try:
+        dt = datetime.fromisoformat(it.get('published_at', '').replace('Z', '+00:00'))
+    except Exception:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _ioc_count(it):
+    iocs = it.get('iocs') or {}
+    return len(iocs.get('ips', [])) + len(iocs.get('domains', [])) + len(iocs.get('urls', []))
+
+def static_features(items):
+    """Columns that depend neither on the clock nor on other items.
+
+    cvss, source_w and ioc_density as in extract_features(), plus published
+    (epoch seconds, MISSING_TS when the date can't be parsed).
+    """
+    n = len(items)
+    return {
+        'cvss': np.clip(
+            np.fromiter((float(it.get('cvss_max', 0.0)) for it in items), dtype=np.float64, count=n),
+            0.0, 10.0,
+        ) / 10.0,
+        'source_w': np.fromiter(
+            (1.0 if it.get('source', 'UNKNOWN') in TRUSTED_SOURCES else 0.7 for it in items),
+            dtype=np.float64, count=n,
+        ),
+        'ioc_density': np.minimum(
+            np.fromiter(map(_ioc_count, items), dtype=np.float64, count=n) / 5.0, 1.0
+        ),
+        'published': np.fromiter(
+            ((MISSING_TS if ts is None else ts) for ts in map(_epoch, items)), dtype=np.float64, count=n
+        ),
+    }
+
+def extract_features(items, now=None, dup_index=None):
+    """Column arrays for the scorer: cvss, age_s, source_w, dup, ioc_density.
+
+    now is epoch seconds (defaults to the current time). Unparseable dates get
+    an age of UNPARSEABLE_AGE_DAYS, as in _days_since(). Pass a shared
+    dedup.NearDuplicateIndex as dup_index to count duplicates against history.
+    """
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    f = static_features(items)
+    published = f.pop('published')
+    age_s = np.maximum(now - published, 0.0)
+    age_s[published == MISSING_TS] = UNPARSEABLE_AGE_DAYS * 86400.0
+    f['age_s'] = age_s
+    f['dup'] = _duplication_array(items, index=dup_index)
+    return f
+
+def score_features(f, half_life=HALF_LIFE_DAYS):
+    """Vectorized score over the arrays returned by extract_features()."""
+    recency = np.exp(-math.log(2) * (f['age_s'] / 86400.0) / half_life)
+    return (W_CVSS * f['cvss'] + W_DUP * f['dup'] + W_SOURCE * f['source_w']
+            + W_RECENCY * recency + W_IOC * f['ioc_density'])
+
+def score_batch(items, now=None, dup_index=None):
+    """Scores for all items as one float64 array (same order as items)."""
+    if not items:
+        return np.zeros(0)
+    return score_features(extract_features(items, now=now, dup_index=dup_index))
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without a full sort."""
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    if k < n:
+        part = np.argpartition(-scores, k - 1)[:k]
+    else:
+        part = np.arange(n)
+    # stable order among the selected (ties keep input order)
+    part.sort()
+    return part[np.argsort(-scores[part], kind='stable')]
+
+def top_k(items, k=5, now=None):
+    """Highest-ranked k items (with rank_score set) using partial selection."""
+    scores = np.round(score_batch(items, now=now), 4)
+    out = []
+    for i in top_k_indices(scores, k):
+        items[i]['rank_score'] = float(scores[i])
+        out.append(items[i])
+    return out
 
+@metrics.timed("rank")
 def score_and_group(items):
-    dup = _duplication_score(items)
-    for it in items:
-        cvss = min(max(float(it.get('cvss_max', 0.0)), 0.0), 10.0) / 10.0
-        recency = _recency_decay(_days_since(it.get('published_at','')))
-        source = it.get('source','UNKNOWN')
-        source_w = 1.0 if source in ('CISA','CERT','NVD') else 0.7
-        ioc_density = 0.0
-        iocs = it.get('iocs', {})
-        if iocs:
-            ioc_density = min(1.0, (len(iocs.get('ips',[])) + len(iocs.get('domains',[])) + len(iocs.get('urls',[]))) / 5.0)
-        score = 0.35*cvss + 0.25*dup.get(it['id'],0.0) + 0.15*source_w + 0.15*recency + 0.10*ioc_density
-        it['rank_score'] = round(score, 4)
-    return sorted(items, key=lambda x: x['rank_score'], reverse=True)
+    scores = np.round(score_batch(items), 4)
+    for it, score in zip(items, scores.tolist()):
+        it['rank_score'] = score
+    order = np.argsort(-scores, kind='stable')
+    return [items[i] for i in order.tolist()]
 
 def select_top(items, k=5):
     return items[:k]
@@ -0,0 +1,446 @@
+"""Persistent, incremental score index for the ranker.
+
+rank.score_and_group() rescores every item on every refresh, but only two
+parts of the score ever change for an item that did not change itself:
+
+* duplication, when a near-duplicate of it arrives (or expires), and
+* recency, W_RECENCY * 2**(-(now - published) / H) with H the half-life.
+
+Recency factors into 2**(published / H) * 2**(-now / H), so an item is
+stored once as
+
+    base        W_CVSS*cvss + W_SOURCE*source_w + W_IOC*ioc_density + W_DUP*dup
+    half_lives  published / H
+
+and its score at any time is base + W_RECENCY * min(1, 2**(half_lives - now/H))
+(min(1, ...) is the clamp for items dated in the future). Nothing has to be
+touched as time passes.
+
+The index is a SQLite table with B-tree indexes on base and on half_lives.
+update() writes only new items, items whose scoring inputs changed (by
+digest), and the members of the duplicate clusters they joined. top_k() is
+Fagin's threshold algorithm over the two sorted orders: the score is
+monotone in both columns, so reading both indexes in descending order can
+stop as soon as the k-th best score seen beats the best score any unread
+row could still have. Refreshes cost O(delta); queries read O(depth) rows.
+
+Near-duplicate clusters are stored with the rows: every row carries the
+label of its cluster, and the LSH band hashes of its MinHash signature are
+kept in rank_bands. A new item is compared only with the rows that share a
+band with it, and the clusters it joins are relabelled in place, so no
+process keeps cluster state in memory and writes by the Streamlit app and
+api.py (both build snapshots) need no catching up. A known id keeps the
+signature of the text it was first seen with, as with any
+NearDuplicateIndex. Clusters don't split when an item is discarded.
+"""
+import hashlib
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from core import dedup, metrics, rank
+from core.cache import CACHE_DIR
+
+RANK_INDEX_PATH = os.getenv("RANK_INDEX_PATH", os.path.join(CACHE_DIR, "rank_index.sqlite3"))
+
+HALF_LIFE_SECONDS = rank.HALF_LIFE_DAYS * 86400.0
+# recency term of items whose date can't be parsed (part of their base)
+UNDATED_RECENCY = rank.W_RECENCY * 2.0 ** (-rank.UNPARSEABLE_AGE_DAYS / rank.HALF_LIFE_DAYS)
+# rows fetched per step from each sorted order in top_k()
+TA_FETCH = 64
+
+# Table layout of this module; PRAGMA user_version holds it together with
+# dedup.SIGNATURE_VERSION, and a file with another one is started over.
+LAYOUT_VERSION = 2
+_USER_VERSION = LAYOUT_VERSION * 1000 + dedup.SIGNATURE_VERSION
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranks (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    id          TEXT NOT NULL UNIQUE,
+    digest      TEXT NOT NULL,
+    static      REAL NOT NULL,
+    base        REAL NOT NULL,
+    half_lives  REAL,
+    cluster     INTEGER NOT NULL DEFAULT 0,
+    signature   BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ranks_base ON ranks(base);
+CREATE INDEX IF NOT EXISTS idx_ranks_half_lives ON ranks(half_lives);
+CREATE INDEX IF NOT EXISTS idx_ranks_cluster ON ranks(cluster);
+
+CREATE TABLE IF NOT EXISTS rank_bands (
+    key     INTEGER NOT NULL,
+    seq     INTEGER NOT NULL,
+    PRIMARY KEY (key, seq)
+) WITHOUT ROWID;
+"""
+
+
+def _dup(size):
+    return min((size - 1) / 4.0, 1.0)
+
+
+def _digest(it):
+    """Fingerprint of the inputs of an item's static score."""
+    key = repr((
+        it.get("source", "UNKNOWN"),
+        float(it.get("cvss_max") or 0.0),
+        rank._ioc_count(it),
+        rank._epoch(it),
+    ))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def score_at(base, half_lives, now):
+    """Score of rows (base, half_lives) at epoch seconds now; works on scalars and arrays."""
+    c = now / HALF_LIFE_SECONDS
+    if isinstance(base, np.ndarray):
+        hl = np.where(np.isnan(half_lives), -np.inf, half_lives)
+        return base + rank.W_RECENCY * np.minimum(1.0, np.exp2(hl - c))
+    if half_lives is None:
+        return base
+    return base + rank.W_RECENCY * min(1.0, 2.0 ** (half_lives - c))
+
+
+class RankIndex:
+    def __init__(self, path=RANK_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._minhash = dedup.NearDuplicateIndex(threshold=rank.DUP_THRESHOLD)  # signatures only
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode = WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != _USER_VERSION:
+            with self._write() as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != _USER_VERSION:
+                    # rows of another layout or MinHash scheme: start over,
+                    # the next update() rescores every item it is given
+                    conn.execute("DROP TABLE IF EXISTS ranks")
+                    conn.execute("DROP TABLE IF EXISTS rank_bands")
+                    for statement in _SCHEMA.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {_USER_VERSION}")
+
+    def _conn(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM ranks").fetchone()[0]
+
+    # =========================
+    #  WRITES
+    # =========================
+    def update(self, items):
+        """Insert new items and rescore changed ones. Returns the number of rows written.
+
+        An item is rescored when its digest (source, CVSS, IOC count,
+        publication time) differs from the stored one. Members of the
+        clusters a new item joins get their duplication term adjusted.
+        Several processes may update the same index file.
+        """
+        latest = {}
+        for it in items:
+            if it.get("id"):
+                latest[str(it["id"])] = it
+        with metrics.span("rank.index.update") as s, self._write() as conn:
+            known = self._digests(list(latest))
+            changed = [(item_id, it) for item_id, it in latest.items()
+                       if known.get(item_id) != _digest(it)]
+            s.items = len(changed)
+            if not changed:
+                return 0
+
+            f = rank.static_features([it for _, it in changed])
+            static = rank.W_CVSS * f["cvss"] + rank.W_SOURCE * f["source_w"] + rank.W_IOC * f["ioc_density"]
+            published = f["published"]
+            undated = published == rank.MISSING_TS
+            static[undated] += UNDATED_RECENCY
+            half_lives = np.where(undated, np.nan, published / HALF_LIFE_SECONDS)
+
+            # signatures of new items; empty: left out of duplicate detection
+            signatures = {}
+            texts = {item_id: dedup.item_text(it) for item_id, it in changed if item_id not in known}
+            texts = {item_id: text for item_id, text in texts.items() if text is not None}
+            if texts:
+                signatures = dict(zip(texts, self._minhash.signatures(list(texts.values()))))
+            rows = [
+                # the signature is only written for new rows
+                (item_id, _digest(it), st, None if np.isnan(hl) else hl,
+                 signatures[item_id].tobytes() if item_id in signatures else b"")
+                for (item_id, it), st, hl in zip(changed, static.tolist(), half_lives.tolist())
+            ]
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ranks").fetchone()[0]
+            conn.executemany(
+                """
+                INSERT INTO ranks(id, digest, static, base, half_lives, signature)
+                VALUES (?, ?, ?, 0, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    digest = excluded.digest,
+                    static = excluded.static,
+                    half_lives = excluded.half_lives
+                """,
+                rows,
+            )
+            # every new row starts as a cluster of its own, labelled by its seq
+            conn.execute("UPDATE ranks SET cluster = seq WHERE seq > ?", (last_seq,))
+            new_seqs = dict(conn.execute("SELECT id, seq FROM ranks WHERE seq > ?", (last_seq,)))
+            clusters = self._join(conn, {new_seqs[i]: sig for i, sig in signatures.items()})
+            clusters.update(self._clusters_of(conn, [item_id for item_id, _ in changed]))
+            self._write_base(conn, clusters)
+            return len(changed)
+
+    @contextmanager
+    def _write(self):
+        """Write transaction that takes the database write lock up front."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _band_rows(self, signatures):
+        """(band hash, seq) rows of rank_bands for {seq: signature}."""
+        seqs = list(signatures)
+        if not seqs:
+            return []
+        keys = self._minhash.band_hashes(np.stack([signatures[q] for q in seqs])).view(np.int64)
+        return [(key, seq) for seq, row in zip(seqs, keys.tolist()) for key in row]
+
+    def _join(self, conn, signatures):
+        """Merge new rows {seq: signature} into the clusters they duplicate.
+
+        Rows are taken in seq order and each one is compared with the
+        older rows it shares a band with, until one member of a candidate
+        cluster matches, as NearDuplicateIndex.add_signature() does.
+        Returns the labels of the clusters that grew.
+        """
+        band_rows = self._band_rows(signatures)
+        if not band_rows:
+            return set()
+        conn.executemany("INSERT OR IGNORE INTO rank_bands(key, seq) VALUES (?, ?)", band_rows)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS new_bands (key INTEGER, seq INTEGER)")
+        conn.execute("DELETE FROM temp.new_bands")
+        conn.executemany("INSERT INTO temp.new_bands(key, seq) VALUES (?, ?)", band_rows)
+        pairs = conn.execute(
+            """
+            SELECT DISTINCT n.seq, o.seq, r.cluster
+            FROM temp.new_bands n
+            JOIN rank_bands o ON o.key = n.key AND o.seq < n.seq
+            JOIN ranks r ON r.seq = o.seq
+            ORDER BY n.seq, o.seq
+            """
+        ).fetchall()
+        conn.execute("DELETE FROM temp.new_bands")
+
+        older = sorted({o for _, o, _ in pairs if o not in signatures})
+        sigs = dict(signatures)
+        for i in range(0, len(older), 500):
+            chunk = older[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for seq, sig in conn.execute(f"SELECT seq, signature FROM ranks WHERE seq IN ({marks})", chunk):
+                sigs[seq] = np.frombuffer(sig, dtype=np.uint64)
+
+        parent = {}  # union-find over cluster labels; the oldest label is the root
+
+        def find(label):
+            root = label
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(label, label) != root:  # path compression
+                parent[label], label = root, parent[label]
+            return root
+
+        threshold = self._minhash.threshold
+        for seq, group in itertools.groupby(pairs, key=lambda p: p[0]):
+            matched = set()  # roots of the clusters seq joins
+            for _, other, label in group:
+                root = find(label)
+                if root not in matched and self._minhash.similarity(sigs[seq], sigs[other]) >= threshold:
+                    matched.add(root)
+            root = min(matched | {find(seq)})
+            for label in matched | {find(seq)}:
+                parent[label] = root
+
+        relabel = [(find(label), label) for label in parent if find(label) != label]
+        conn.executemany("UPDATE ranks SET cluster = ? WHERE cluster = ?", relabel)
+        return {root for root, _ in relabel}
+
+    def _clusters_of(self, conn, ids):
+        out = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            out.update(r[0] for r in conn.execute(f"SELECT cluster FROM ranks WHERE id IN ({marks})", chunk))
+        return out
+
+    def _write_base(self, conn, clusters):
+        """Recompute base for every member of the given clusters."""
+        clusters = sorted(clusters)
+        sizes = {}
+        for i in range(0, len(clusters), 500):
+            chunk = clusters[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            sizes.update(conn.execute(
+                f"SELECT cluster, COUNT(*) FROM ranks WHERE cluster IN ({marks}) GROUP BY cluster", chunk
+            ))
+        conn.executemany(
+            "UPDATE ranks SET base = static + ? WHERE cluster = ?",
+            [(rank.W_DUP * _dup(size), label) for label, size in sizes.items()],
+        )
+
+    def discard(self, ids):
+        """Drop items from the index and shrink their clusters.
+
+        Clusters can't split, so two items that were only linked through a
+        discarded one stay in one cluster.
+        """
+        ids = [str(i) for i in ids]
+        with self._write() as conn:
+            clusters, signatures = set(), {}
+            for i in range(0, len(ids), 500):
+                chunk = ids[i : i + 500]
+                marks = ",".join("?" * len(chunk))
+                for seq, label, sig in conn.execute(
+                    f"SELECT seq, cluster, signature FROM ranks WHERE id IN ({marks})", chunk
+                ):
+                    clusters.add(label)
+                    if sig:
+                        signatures[seq] = np.frombuffer(sig, dtype=np.uint64)
+            conn.executemany("DELETE FROM ranks WHERE id = ?", [(i,) for i in ids])
+            conn.executemany("DELETE FROM rank_bands WHERE key = ? AND seq = ?", self._band_rows(signatures))
+            self._write_base(conn, clusters)
+        return len(ids)
+
+    def discard_before(self, cutoff_ts):
+        """Drop items published before cutoff_ts (epoch seconds); undated items are kept."""
+        rows = self._conn().execute(
+            "SELECT id FROM ranks WHERE half_lives < ?", (cutoff_ts / HALF_LIFE_SECONDS,)
+        ).fetchall()
+        return self.discard([r[0] for r in rows]) if rows else 0
+
+    # =========================
+    #  READS
+    # =========================
+    def _digests(self, ids):
+        out = {}
+        conn = self._conn()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            out.update(conn.execute(f"SELECT id, digest FROM ranks WHERE id IN ({marks})", chunk))
+        return out
+
+    def scores(self, ids, now=None):
+        """Scores at now for ids (aligned; NaN for ids not in the index)."""
+        now = time.time() if now is None else now
+        ids = [str(i) for i in ids]
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i : i + 500]
+            marks = ",".join("?" * len(chunk))
+            for item_id, base, hl in conn.execute(
+                f"SELECT id, base, half_lives FROM ranks WHERE id IN ({marks})", chunk
+            ):
+                found[item_id] = (base, np.nan if hl is None else hl)
+        rows = np.array([found.get(i, (np.nan, np.nan)) for i in ids], dtype=np.float64).reshape(-1, 2)
+        return score_at(rows[:, 0], rows[:, 1], now)
+
+    def top_k(self, k=5, now=None):
+        """[(id, score)] of the k best items at now (epoch seconds), best first.
+
+        Threshold algorithm: rows are read in descending order of base and
+        of half_lives in lockstep; every row carries both columns, so each one
+        is scored on sight. The best score an unread row could have is the
+        last base read plus the recency of the last half_lives read.
+        """
+        now = time.time() if now is None else now
+        if k <= 0:
+            return []
+        conn = self._conn()
+        by_base = conn.execute("SELECT seq, id, base, half_lives FROM ranks ORDER BY base DESC")
+        by_recency = conn.execute(
+            "SELECT seq, id, base, half_lives FROM ranks WHERE half_lives IS NOT NULL "
+            "ORDER BY half_lives DESC"
+        )
+        heap = []  # (score, -seq, id); ties go to the item indexed first
+        seen = set()
+        read = 0
+        with metrics.span("rank.index.top") as s:
+            while True:
+                a = by_base.fetchmany(TA_FETCH)
+                b = by_recency.fetchmany(TA_FETCH)
+                if not a and not b:
+                    break
+                for seq, item_id, base, hl in a + b:
+                    if seq in seen:
+                        continue
+                    seen.add(seq)
+                    entry = (score_at(base, hl, now), -seq, item_id)
+                    if len(heap) < k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+                read += len(a) + len(b)
+                if len(heap) < k:
+                    continue
+                if not a:
+                    break  # every row has been seen through the base order
+                # recency bound: the last half_lives read, or 0 once that order is exhausted
+                bound = a[-1][2] + (rank.W_RECENCY * min(1.0, 2.0 ** (b[-1][3] - now / HALF_LIFE_SECONDS))
+                                    if b else 0.0)
+                if heap[0][0] >= bound:
+                    break
+            s.items = read
+        return [(item_id, round(score, 4)) for score, _, item_id in sorted(heap, reverse=True)]
+
+    # =========================
+    #  RANKING
+    # =========================
+    @metrics.timed("rank")
+    def score_and_group(self, items, now=None):
+        """rank.score_and_group() backed by the index: update, then read scores.
+
+        Duplicates are counted against every indexed item, not only this batch.
+        Items without an id are scored by rank.score_batch() instead.
+        """
+        now = time.time() if now is None else now
+        self.update(items)
+        scores = np.round(self.scores([it.get("id") for it in items], now=now), 4)
+        missing = np.isnan(scores)
+        if missing.any():
+            idx = np.flatnonzero(missing)
+            scores[idx] = np.round(rank.score_batch([items[i] for i in idx], now=now), 4)
+        for it, score in zip(items, scores.tolist()):
+            it["rank_score"] = score
+        order = np.argsort(-scores, kind="stable")
+        return [items[i] for i in order.tolist()]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RankIndex()
+        return _index
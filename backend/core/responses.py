@@ -0,0 +1,208 @@
+"""Paging, projection and wire encoding for the JSON API.
+
+* cursors     opaque tokens holding the sort key of the last item of a page,
+              so pages stay consistent while new items arrive at the top
+* projection  ?fields= keeps only the requested top-level fields
+* columnar    one array per field; low-cardinality string fields are
+              dictionary-encoded as {"values": [...], "codes": [...]}
+* encoding    orjson when installed, gzip or brotli (when installed) by
+              Accept-Encoding, and a strong ETag over the uncompressed bytes
+              so unchanged responses can be answered with 304
+
+Everything here works on plain dicts and bytes; api.py turns the result into
+HTTP responses.
+"""
+import base64
+import bisect
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson  # pip install orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli  # pip install brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 11 is ~10x slower for a few percent on JSON
+
+
+def dumps(obj):
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+# =========================
+#  CURSOR PAGINATION
+# =========================
+def sort_key(item):
+    """Newest first, then by id, so every item has a unique position."""
+    return (-(item.get("published_ts") or 0), str(item.get("id") or ""))
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(dumps(list(key))).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor):
+    """Sort key from a cursor; ValueError if it was not made by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, item_id = json.loads(raw)
+        return (float(ts), str(item_id))
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def paginate(items, keys, limit, cursor=None):
+    """(page, next cursor or None) from items sorted by sort_key.
+
+    keys is [sort_key(it) for it in items], computed once per item list.
+    """
+    start = 0 if cursor is None else bisect.bisect_right(keys, decode_cursor(cursor))
+    page = items[start:start + limit]
+    more = start + limit < len(items)
+    return page, (encode_cursor(keys[start + limit - 1]) if more else None)
+
+
+# =========================
+#  PROJECTION / COLUMNAR
+# =========================
+def parse_fields(fields, allowed):
+    """Tuple of requested field names (None for all); ValueError on unknown names."""
+    if not fields:
+        return None
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in allowed]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return names or None
+
+
+def project(items, fields):
+    if fields is None:
+        return items
+    return [{f: it.get(f) for f in fields} for it in items]
+
+
+def columnar(items, fields, dictionary=()):
+    """{field: [values]} with the fields in dictionary sent as values + codes."""
+    columns = {}
+    for f in fields:
+        values = [it.get(f) for it in items]
+        if f in dictionary:
+            table = {}
+            codes = [table.setdefault(v, len(table)) for v in values]
+            columns[f] = {"values": list(table), "codes": codes}
+        else:
+            columns[f] = values
+    return columns
+
+
+# =========================
+#  WIRE ENCODING
+# =========================
+def choose_encoding(accept_encoding):
+    """"br", "gzip" or None for an Accept-Encoding header value."""
+    prefs = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        prefs[name.strip()] = q
+    for enc in ("br", "gzip"):
+        if enc == "br" and brotli is None:
+            continue
+        if prefs.get(enc, prefs.get("*", 0.0)) > 0:
+            return enc
+    return None
+
+
+class Encoded:
+    """One representation of a response body, ready to send."""
+
+    __slots__ = ("content", "etag", "encoding")
+
+    def __init__(self, content, etag, encoding):
+        self.content = content
+        self.etag = etag
+        self.encoding = encoding
+
+    def headers(self):
+        h = {"ETag": self.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if self.encoding:
+            h["Content-Encoding"] = self.encoding
+        return h
+
+
+def encode(obj, encoding=None):
+    """Serialize and compress obj; the ETag differs per content-coding."""
+    raw = dumps(obj)
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    if encoding and len(raw) >= MIN_COMPRESS_BYTES:
+        if encoding == "br":
+            return Encoded(brotli.compress(raw, quality=BROTLI_QUALITY), f'"{digest}-br"', "br")
+        return Encoded(gzip.compress(raw, GZIP_LEVEL, mtime=0), f'"{digest}-gzip"', "gzip")
+    return Encoded(raw, f'"{digest}"', None)
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    return tag.rsplit("-", 1)[0] if tag.endswith(("-gzip", "-br")) else tag
+
+
+def not_modified(if_none_match, etag):
+    """True if an If-None-Match header matches etag (any content-coding)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = _opaque(etag)
+    return any(_opaque(tag) == current for tag in if_none_match.split(","))
+
+
+class RenderCache:
+    """Encoded responses memoized per key for as long as their source is current.
+
+    source is the object the response was built from (e.g. a cached upstream
+    body); once it is replaced, the entry is rebuilt on the next request.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (source, Encoded)
+        self._lock = threading.Lock()
+
+    def get(self, key, source, build, encoding=None):
+        key = (key, encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                return entry[1]
+        encoded = encode(build(), encoding)
+        with self._lock:
+            self._entries[key] = (source, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return encoded
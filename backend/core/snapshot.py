@@ -0,0 +1,151 @@
+"""Process-wide pipeline snapshot shared by every Streamlit session.
+
+The pages used to run collect -> normalize -> enrich -> score at the top of
+every script run. Instead, one immutable Snapshot is built per process and
+swapped atomically when a newer one is ready. Reads never block once the
+first snapshot exists: an expired snapshot is still served while a single
+background thread rebuilds it (stale-while-revalidate).
+"""
+import os
+import threading
+import time
+
+from core import enrich, feeds, metrics, pipeline, rank, rank_index, store
+
+# Seconds a snapshot is considered fresh.
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "300"))
+
+# How many top-ranked items are precomputed for the pages.
+SNAPSHOT_TOP_K = 50
+
+
+class Snapshot:
+    """Immutable result of one pipeline run. Treat the lists as read-only."""
+
+    __slots__ = ("items", "scored", "top_items", "kpis", "status", "built_at", "build_seconds")
+
+    def __init__(self, items, scored, top_items, kpis, status, built_at, build_seconds):
+        self.items = items
+        self.scored = scored
+        self.top_items = top_items
+        self.kpis = kpis
+        self.status = status
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+    @property
+    def age(self):
+        return time.time() - self.built_at
+
+    def top(self, k=5):
+        if k <= len(self.top_items):
+            return self.top_items[:k]
+        return rank.select_top(self.scored, k)
+
+
+def build_snapshot():
+    """Run the full pipeline once and return a new Snapshot."""
+    started = time.time()
+    with metrics.span("snapshot.build") as s:
+        with metrics.span("collect") as c:
+            raw, status = feeds.collect_all_sources_with_status()
+            c.items = len(raw)
+        items = feeds.enrich_all(enrich.add_iocs(feeds.normalize_all(raw)))
+        _archive(items)
+        scored = _rank(items)
+        top_items = rank.select_top(scored, SNAPSHOT_TOP_K)
+        kpis = pipeline.kpis(items)
+        s.items = len(items)
+    return Snapshot(
+        items=items,
+        scored=scored,
+        top_items=top_items,
+        kpis=kpis,
+        status=status,
+        built_at=time.time(),
+        build_seconds=round(time.time() - started, 3),
+    )
+
+
+def _archive(items):
+    """Keep history in the item store; never let it break a refresh."""
+    try:
+        with metrics.span("store.archive") as s:
+            item_store = store.get_store()
+            item_store.upsert_many(items)
+            item_store.compact()
+            s.items = len(items)
+    except Exception as exc:
+        print("Item store update failed:", exc)
+
+
+def _rank(items):
+    """Rank through the persistent index; fall back to a full rescore if it fails."""
+    try:
+        index = rank_index.get_index()
+        scored = index.score_and_group(items)
+        index.discard_before(time.time() - store.RETENTION_DAYS * 86400)
+        return scored
+    except Exception as exc:
+        print("Rank index update failed:", exc)
+        return rank.score_and_group(items)
+
+
+class SnapshotManager:
+    def __init__(self, builder=build_snapshot, ttl=SNAPSHOT_TTL):
+        self._builder = builder
+        self.ttl = ttl
+        self._current = None
+        self._build_lock = threading.Lock()  # only one build at a time
+        self._refreshing = False
+        self._state_lock = threading.Lock()
+
+    def get(self):
+        """Return the current snapshot, building or refreshing as needed."""
+        snap = self._current
+        if snap is None:
+            # First request in this process: everybody waits on one build.
+            with self._build_lock:
+                if self._current is None:
+                    self._current = self._builder()
+                return self._current
+
+        if snap.age > self.ttl:
+            self._refresh_in_background()
+        return snap
+
+    def refresh(self):
+        """Rebuild synchronously and swap the new snapshot in."""
+        with self._build_lock:
+            self._current = self._builder()
+            return self._current
+
+    def _refresh_in_background(self):
+        with self._state_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as exc:
+                # Keep serving the previous snapshot
+                print("Snapshot refresh failed:", exc)
+            finally:
+                with self._state_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="snapshot-refresh", daemon=True).start()
+
+
+_manager = SnapshotManager()
+
+
+def get_snapshot():
+    """Shared snapshot for the current process (see module docstring)."""
+    return _manager.get()
+
+
+def refresh_snapshot():
+    return _manager.refresh()
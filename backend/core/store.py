@@ -0,0 +1,184 @@
+"""Embedded SQLite store for normalized threat items.
+
+Items are kept in WAL mode so the Streamlit pages and api.py can read while a
+snapshot refresh writes. Every item is stored whole as JSON, with the columns
+we filter on (source, published time, CVSS) and the CVE / IOC values broken
+out into indexed side tables.
+"""
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dateutil import parser
+
+from core.cache import CACHE_DIR
+from core.item import as_dict
+
+ITEM_DB_PATH = os.getenv("ITEM_DB_PATH", os.path.join(CACHE_DIR, "items.sqlite3"))
+
+# How long items are kept before compact() removes them.
+RETENTION_DAYS = float(os.getenv("ITEM_RETENTION_DAYS", "45"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id           TEXT PRIMARY KEY,
+    source       TEXT NOT NULL,
+    published_at TEXT,
+    published_ts REAL,
+    cvss_max     REAL NOT NULL DEFAULT 0,
+    title        TEXT,
+    data         TEXT NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_source ON items(source, published_ts);
+CREATE INDEX IF NOT EXISTS idx_items_published ON items(published_ts);
+CREATE INDEX IF NOT EXISTS idx_items_cvss ON items(cvss_max);
+
+CREATE TABLE IF NOT EXISTS item_cves (
+    cve     TEXT NOT NULL,
+    item_id TEXT NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+    PRIMARY KEY (cve, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_item_cves_item ON item_cves(item_id);
+
+CREATE TABLE IF NOT EXISTS item_iocs (
+    value   TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    item_id TEXT NOT NULL REFERENCES items(id) ON DELETE CASCADE,
+    PRIMARY KEY (value, kind, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_item_iocs_item ON item_iocs(item_id);
+"""
+
+
+def to_epoch(value):
+    """Epoch seconds for an ISO timestamp (naive values are taken as UTC)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        dt = datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = parser.parse(str(value))
+        except Exception:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+class ItemStore:
+    def __init__(self, path=ITEM_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        # auto_vacuum must be chosen before the first table is created
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert_many(self, items):
+        """Insert or replace items keyed on `id`. Returns the number written."""
+        now = time.time()
+        rows, cves, iocs, ids = [], [], [], []
+        for it in items:
+            item_id = it.get("id")
+            if not item_id:
+                continue
+            item_id = str(item_id)
+            ids.append((item_id,))
+            published_ts = it.get("published_ts")
+            if published_ts is None:
+                published_ts = to_epoch(it.get("published_at"))
+            rows.append((
+                item_id,
+                it.get("source", "UNKNOWN"),
+                it.get("published_at"),
+                published_ts,
+                float(it.get("cvss_max") or 0.0),
+                it.get("title", ""),
+                json.dumps(as_dict(it), ensure_ascii=False, default=str),
+                now,
+            ))
+            for cve in it.get("cve_list") or []:
+                cves.append((cve.upper(), item_id))
+            for kind, values in (it.get("iocs") or {}).items():
+                for value in values or []:
+                    iocs.append((str(value).lower(), kind, item_id))
+
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO items(id, source, published_at, published_ts,
+                    cvss_max, title, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    source = excluded.source,
+                    published_at = excluded.published_at,
+                    published_ts = excluded.published_ts,
+                    cvss_max = excluded.cvss_max,
+                    title = excluded.title,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+            # Side tables are rebuilt for the upserted ids
+            conn.executemany("DELETE FROM item_cves WHERE item_id = ?", ids)
+            conn.executemany("DELETE FROM item_iocs WHERE item_id = ?", ids)
+            conn.executemany("INSERT OR IGNORE INTO item_cves(cve, item_id) VALUES (?, ?)", cves)
+            conn.executemany(
+                "INSERT OR IGNORE INTO item_iocs(value, kind, item_id) VALUES (?, ?, ?)", iocs
+            )
+        return len(rows)
+
+    def compact(self, retention_days=RETENTION_DAYS):
+        """Drop items published before the retention window and reclaim space."""
+        cutoff = time.time() - retention_days * 86400
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM items WHERE published_ts IS NOT NULL AND published_ts < ?",
+                (cutoff,),
+            )
+            removed = cur.rowcount
+        if removed:
+            conn.execute("PRAGMA incremental_vacuum")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def execute(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchall()
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ItemStore()
+        return _store
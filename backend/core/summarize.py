@@ -0,0 +1,109 @@
+"""Batch scheduler for LLM summarization.
+
+Items are packed into token-budgeted batches, the batches run concurrently
+under a concurrency limit and a tokens-per-minute bucket, and results are
+matched back by item id. Only failed batches (or the ids a batch did not
+answer for) are retried. The actual API call is injected as request_fn, see
+core.llm.summarize_items.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, n):
+        """Block until n tokens (capped at capacity) are available, then take them."""
+        n = min(float(n), self.capacity)
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+def estimate_tokens(payload):
+    """Rough token count of a JSON payload (~4 characters per token)."""
+    return len(json.dumps(payload, ensure_ascii=False)) // 4 + 1
+
+
+def pack_batches(entries, max_tokens, max_items):
+    """Greedily pack (key, payload, tokens) entries into batches.
+
+    A batch never exceeds max_items entries or max_tokens estimated tokens,
+    except that a single oversized entry still gets a batch of its own.
+    """
+    batches, current, used = [], [], 0
+    for entry in entries:
+        tokens = entry[2]
+        if current and (len(current) >= max_items or used + tokens > max_tokens):
+            batches.append(current)
+            current, used = [], 0
+        current.append(entry)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def run_batches(batches, request_fn, concurrency=4, bucket=None,
+                max_retries=2, backoff=1.0, output_tokens_per_item=250):
+    """Run request_fn over batches concurrently.
+
+    request_fn({key: payload}) must return {key: result} and may raise.
+    Returns {key: result} for every key that was answered; keys of batches
+    that still fail after max_retries are simply missing.
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def run_one(batch):
+        pending = list(batch)
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(backoff * (2 ** (attempt - 1)))
+            if bucket is not None:
+                bucket.acquire(
+                    sum(tokens for _, _, tokens in pending)
+                    + output_tokens_per_item * len(pending)
+                )
+            try:
+                answered = request_fn({key: payload for key, payload, _ in pending}) or {}
+            except Exception:
+                continue  # retry the whole batch
+            with lock:
+                for key, _, _ in pending:
+                    if key in answered:
+                        results[key] = answered[key]
+            # retry only what the model did not answer for
+            pending = [e for e in pending if e[0] not in answered]
+            if not pending:
+                return
+
+    if not batches:
+        return results
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(batches))),
+        thread_name_prefix="llm-batch",
+    ) as pool:
+        list(pool.map(run_one, batches))
+    return results
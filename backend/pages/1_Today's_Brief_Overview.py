@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
 from collections import Counter
-from core import feeds, rank, llm, export
+from core import llm, export, matcher, snapshot
 from core.ui_effects import add_fireflies_background
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 
@@ -15,13 +15,9 @@ add_fireflies_background()
 # -----------------------------
 # Load & process feed data
 # -----------------------------
-items = feeds.enrich_all(
-    feeds.normalize_all(
-        feeds.collect_all_sources()
-    )
-)
-scored = rank.score_and_group(items)
-top5 = rank.select_top(scored, 5)
+snap = snapshot.get_snapshot()
+items = snap.items
+top5 = snap.top(5)
 brief = llm.build_top5_brief(top5)
 
 # -----------------------------
@@ -35,17 +31,8 @@ st.title("Today's Brief")
 st.divider()
 st.subheader("Trending Threat Actors")
 
-# Known actor patterns
-KNOWN_ACTORS = {
-    "Lazarus Group": ["lazarus"],
-    "APT41": ["apt41", "apt-41"],
-    "FIN7": ["fin7", "fin 7"],
-    "APT28 (Fancy Bear)": ["apt28", "apt-28", "fancy bear"],
-    "APT29 (Cozy Bear)": ["apt29", "apt-29", "cozy bear"],
-    "Conti": ["conti"],
-    "LockBit": ["lockbit"],
-    "REvil": ["revil", "sodinokibi"],
-}
+# Known actor patterns live in core.matcher.KNOWN_ACTORS
+actor_matcher = matcher.get_matcher()
 
 actor_counts = Counter()
 
@@ -57,10 +44,10 @@ for it in items:
             str(it.get("description", "")),
             str(it.get("summary", "")),
         ]
-    ).lower()
+    )
 
-    for actor_name, patterns in KNOWN_ACTORS.items():
-        if any(pat in text for pat in patterns):
+    for kind, actor_name in actor_matcher.tags(text):
+        if kind == "actor":
             actor_counts[actor_name] += 1
 
 if not actor_counts:
@@ -97,3 +84,5 @@ if st.button("Export Markdown"):
         data=md,
         file_name="daily_threat_brief.md"
     )
+
+add_timing_panel()
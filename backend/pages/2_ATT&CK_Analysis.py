@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from core import feeds, rank, llm
+from core import llm, snapshot
 from core.ui_effects import add_fireflies_background
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 
@@ -12,12 +12,11 @@ st.set_page_config(page_title="ATT&CK · AI Threat Intel", layout="wide")
 # ----------------------------
 # Load and Score Data
 # ----------------------------
-items = feeds.enrich_all(feeds.normalize_all(feeds.collect_all_sources()))
-scored = rank.score_and_group(items)
+snap = snapshot.get_snapshot()
 
 # Expand the number of entries used
 TOP_N = 15   # You can increase to 20, 30, or even ALL data
-expanded_top = rank.select_top(scored, TOP_N)
+expanded_top = snap.top(TOP_N)
 
 # Generate ATT&CK mapping for more data
 attack_map = llm.map_attack_techniques(expanded_top)
@@ -60,3 +59,17 @@ if attack_map:
     st.dataframe(df, use_container_width=True, height=700)
 else:
     st.info("No techniques mapped yet.")
+
+# ----------------------------
+# AI summaries for the same items (batched + cached, only with an API key)
+# ----------------------------
+if llm.llm_enabled():
+    st.subheader(f"AI Summaries for Top {TOP_N} Threats")
+    briefs = llm.build_brief(expanded_top)
+    st.dataframe(
+        pd.DataFrame(briefs)[["title", "risk", "summary"]],
+        use_container_width=True,
+        height=500,
+    )
+
+add_timing_panel()
@@ -7,7 +7,7 @@ import streamlit.components.v1 as components
 
 from core import feeds
 from core.ui_effects import add_fireflies_background
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 add_fireflies_background()
@@ -205,3 +205,5 @@ else:
         use_container_width=True,
         hide_index=True,
     )
+
+add_timing_panel()
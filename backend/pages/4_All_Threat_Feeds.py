@@ -1,8 +1,8 @@
 import streamlit as st
 import pandas as pd
-from core import feeds, rank
+from core import llm, snapshot
 from core.ui_effects import add_fireflies_background
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 
@@ -10,9 +10,19 @@ add_fireflies_background()
 
 st.set_page_config(page_title="All Feeds · AI Threat Intel", layout="wide")
 
-items = feeds.enrich_all(feeds.normalize_all(feeds.collect_all_sources()))
-scored = rank.score_and_group(items)
+scored = snapshot.get_snapshot().scored
+
+# How many of the highest-ranked items get an AI summary (cached per item)
+SUMMARY_TOP_N = 100
 
 st.title("All Feeds")
-df = pd.DataFrame(scored)
-st.dataframe(df[["source","published_at","title","cvss_max","rank_score","cve_list","products"]], use_container_width=True, height=600)
+df = pd.DataFrame([it.to_dict() for it in scored])
+columns = ["source","published_at","title","cvss_max","rank_score","cve_list","products"]
+if llm.llm_enabled() and not df.empty:
+    briefs = llm.build_brief(scored[:SUMMARY_TOP_N])
+    summaries = {b["id"]: b["summary"] for b in briefs}
+    df["ai_summary"] = [summaries.get(i, "") for i in df["id"]]
+    columns.insert(3, "ai_summary")
+st.dataframe(df[columns], use_container_width=True, height=600)
+
+add_timing_panel()
@@ -1,6 +1,7 @@
+import os
 import streamlit as st
 from core.ui_effects import add_fireflies_background
-from core.layout import add_top_links
+from core.layout import add_timing_panel, add_top_links
 
 add_top_links()
 
@@ -10,3 +11,12 @@ st.set_page_config(page_title="Settings · AI Threat Intel", layout="wide")
 
 st.title("Settings")
 st.write("This starter keeps settings minimal. In a full deployment, this page can include fields for connecting provider keys, adjusting threat-scoring weights, and enabling data-redaction toggles..")
+
+st.subheader("Diagnostics")
+# stored outside the widget key so the choice survives page switches
+st.session_state["show_timings"] = st.checkbox(
+    "Show pipeline timings",
+    value=st.session_state.get("show_timings", os.getenv("SHOW_TIMINGS") == "1"),
+    help="Adds a sidebar panel with per-stage timings, item counts and memory deltas on every page.",
+)
+add_timing_panel()
@@ -0,0 +1,178 @@
+"""Regenerate data/country_centroids.csv.
+
+    python -m scripts.build_country_centroids --geojson naturalearth_lowres.geojson \
+        --zone-tab /usr/share/zoneinfo/zone.tab
+    python -m scripts.build_country_centroids --geojson countries.geo.json
+
+--geojson takes any world countries GeoJSON with ISO alpha-3 feature ids
+(feature "id" or an "iso_a3" property, e.g. Natural Earth admin-0 countries
+or johan/world.geo.json) and writes the area-weighted centroid of each
+country's largest polygon, so islands and overseas territories do not drag
+the point into the sea. Where that centroid falls outside a concave polygon,
+the middle of the widest span along its latitude is used instead.
+
+--zone-tab needs no download: it takes the median coordinate of the tz
+database reference cities of each country. That point sits over populated
+land, not at the geometric centre (Spain lands in Ceuta), so together with
+--geojson it only fills in countries the polygons do not cover, typically
+microstates and small islands missing from 1:110m data.
+
+The bundled file was built from Natural Earth 1:110m admin-0 countries (the
+naturalearth_lowres dataset shipped with geopandas 0.14, converted to
+GeoJSON), with tz zone.tab for the rest.
+
+Names and alpha-2/alpha-3 codes come from the iso-codes package
+(/usr/share/iso-codes/json/iso_3166-1.json).
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+
+ISO_CODES = "/usr/share/iso-codes/json/iso_3166-1.json"
+OUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "country_centroids.csv")
+
+
+def load_iso_codes(path=ISO_CODES):
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)["3166-1"]
+    return {r["alpha_2"]: (r["alpha_3"], r.get("common_name") or r["name"]) for r in rows}
+
+
+def _ring_centroid(ring):
+    """(area, lon, lat) of a closed ring via the shoelace formula."""
+    a = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        cross = x0 * y1 - x1 * y0
+        a += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    a *= 0.5
+    if a == 0:
+        xs, ys = zip(*ring)
+        return 0.0, sum(xs) / len(xs), sum(ys) / len(ys)
+    return abs(a), cx / (6 * a), cy / (6 * a)
+
+
+def _inside(ring, x, y):
+    """Even-odd point-in-polygon test."""
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def _representative_point(ring, x, y):
+    """(lon, lat) inside the ring: the centroid itself, or for concave shapes
+    whose centroid falls outside, the middle of the widest span of the ring
+    along the centroid's latitude."""
+    if _inside(ring, x, y):
+        return x, y
+    xs = sorted(
+        x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])
+        if (y0 > y) != (y1 > y)
+    )
+    spans = list(zip(xs[::2], xs[1::2]))
+    if not spans:
+        return x, y
+    left, right = max(spans, key=lambda s: s[1] - s[0])
+    return (left + right) / 2, y
+
+
+def from_geojson(path):
+    """{alpha-3: (lat, lon)} from the largest outer ring of every feature."""
+    with open(path, encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    out = {}
+    for feat in features:
+        geom = feat.get("geometry") or {}
+        if geom.get("type") == "Polygon":
+            polygons = [geom["coordinates"]]
+        elif geom.get("type") == "MultiPolygon":
+            polygons = geom["coordinates"]
+        else:
+            continue
+        rings = [[tuple(p[:2]) for p in poly[0]] for poly in polygons]
+        if not rings:
+            continue
+        (_, x, y), ring = max(((_ring_centroid(r), r) for r in rings), key=lambda c: c[0][0])
+        iso3 = feat.get("id") or (feat.get("properties") or {}).get("iso_a3")
+        if iso3 and iso3 != "-99":
+            x, y = _representative_point(ring, x, y)
+            out[iso3] = (y, x)
+    return out
+
+
+def _iso6709(value):
+    """'+4230+00131' -> (42.5, 1.5166)."""
+    for i in range(1, len(value)):
+        if value[i] in "+-":
+            lat, lon = value[:i], value[i:]
+            break
+
+    def deg(part, deg_digits):
+        sign = -1 if part[0] == "-" else 1
+        digits = part[1:]
+        d = int(digits[:deg_digits])
+        m = int(digits[deg_digits:deg_digits + 2] or 0)
+        s = int(digits[deg_digits + 2:deg_digits + 4] or 0)
+        return sign * (d + m / 60 + s / 3600)
+
+    return deg(lat, 2), deg(lon, 3)
+
+
+def from_zone_tab(path):
+    """{alpha-2: (lat, lon)} as the median of each country's tz reference points."""
+    points = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            code, coords = line.split("\t")[:2]
+            points.setdefault(code, []).append(_iso6709(coords))
+    return {
+        code: (statistics.median(p[0] for p in pts), statistics.median(p[1] for p in pts))
+        for code, pts in points.items()
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--geojson", help="country polygons; wins over --zone-tab")
+    ap.add_argument("--zone-tab", help="tz zone.tab; fills countries --geojson lacks")
+    ap.add_argument("--out", default=OUT)
+    args = ap.parse_args()
+    if not (args.geojson or args.zone_tab):
+        ap.error("pass --geojson and/or --zone-tab")
+
+    codes = load_iso_codes()
+    points = {}
+    sources = []
+    if args.geojson:
+        by_iso3 = from_geojson(args.geojson)
+        points = {a2: by_iso3[a3] for a2, (a3, _) in codes.items() if a3 in by_iso3}
+        sources.append(f"{os.path.basename(args.geojson)} (largest polygon centroid)")
+    if args.zone_tab:
+        for a2, point in from_zone_tab(args.zone_tab).items():
+            points.setdefault(a2, point)
+        sources.append("tz zone.tab (median of reference cities)")
+    source = ", then ".join(sources)
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        f.write(f"# generated by scripts/build_country_centroids.py from {source}\n")
+        w = csv.writer(f)
+        w.writerow(["iso2", "iso3", "name", "lat", "lon"])
+        for a2 in sorted(points):
+            if a2 not in codes:
+                continue
+            a3, name = codes[a2]
+            lat, lon = points[a2]
+            w.writerow([a2, a3, name, f"{lat:.3f}", f"{lon:.3f}"])
+    print(f"wrote {len(points)} countries to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
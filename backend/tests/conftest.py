@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# core.* resolves its cache and store paths at import time: point them at a
+# scratch directory before any test imports it.
+os.environ.setdefault("THREAT_INTEL_CACHE_DIR", tempfile.mkdtemp(prefix="threatintel-tests-"))
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
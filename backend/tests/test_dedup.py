@@ -0,0 +1,83 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from bench.corpus import make_story_corpus
+from core import dedup, rank_index
+
+EDGE_TEXTS = [
+    "",
+    "   ",
+    "ab",
+    "abcd",
+    "abcde",
+    "--a--",
+    "Hello\x02World",
+    "Ünïcode — Kelvin K İstanbul",
+    "CVE-2025-1234: RCE in Exchange (CVSS 9.8)",
+]
+
+
+@pytest.fixture(scope="module")
+def docs():
+    return make_story_corpus(300, seed=5)
+
+
+def test_batch_normalization_matches_per_text(docs):
+    texts = [text for _, _, text in docs] + EDGE_TEXTS
+    data, lens = dedup.normalized_bytes(texts)
+    ends = np.cumsum(lens)
+    assert [bytes(data[e - n:e]).decode() for e, n in zip(ends, lens)] == [
+        dedup.normalize_text(t) for t in texts
+    ]
+
+    hashes, counts = dedup.shingle_hashes(data, lens)
+    starts = np.cumsum(counts) - counts
+    for text, start, n in zip(texts, starts, counts):
+        assert np.array_equal(np.unique(hashes[start:start + n]), dedup.shingles(text))
+
+
+def test_separator_in_text_falls_back():
+    data, lens = dedup.normalized_bytes(["a\x01b", "c"])
+    assert bytes(data).decode() == "a bc" and lens.tolist() == [3, 1]
+
+
+def test_signatures_match_single_text(docs):
+    index = dedup.NearDuplicateIndex()
+    texts = [text for _, _, text in docs[:50]] + EDGE_TEXTS
+    sigs = index.signatures(texts)
+    for text, sig in zip(texts, sigs):
+        assert np.array_equal(index.signature(text), sig)
+    assert (sigs[texts.index("")] == dedup._MAX_HASH).all()
+
+
+def test_batch_clusters_match_incremental(docs):
+    incremental = dedup.NearDuplicateIndex()
+    for doc_id, _, text in docs:
+        incremental.add(doc_id, text)
+    items = [{"id": doc_id, "title": text} for doc_id, _, text in docs]
+    _, sizes = dedup.cluster_items(items)
+    assert sizes == [incremental.cluster_size(doc_id) for doc_id, _, _ in docs]
+
+
+def test_rank_index_drops_signatures_of_another_version(tmp_path):
+    path = str(tmp_path / "rank.sqlite3")
+    index = rank_index.RankIndex(path)
+    index.update([{"id": "a", "title": "Exchange RCE exploited", "source": "CISA"}])
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    assert rank_index.RankIndex(path).count() == 0
+
+
+@pytest.mark.parametrize("make_index", [dedup.NearDuplicateIndex, dedup.WindowedDuplicateIndex])
+def test_items_without_id_do_not_collide_across_batches(make_index):
+    index = make_index()
+    story = "Critical Exchange Server RCE exploited in the wild by ransomware crews"
+    dedup.cluster_items([{"title": story}, {"title": "Bank phishing wave hits Europe"}], index=index)
+    ids, sizes = dedup.cluster_items([{"title": story + "!"}, {"title": "New Linux rootkit found"}], index=index)
+    assert sizes == [2, 1]
+    assert index.cluster_of(("anon", 0)) == ids[0] != ids[1]
+    assert len(index) == 4
@@ -0,0 +1,18 @@
+from core import enrich, feeds
+
+
+def test_structured_iocs_are_not_extracted_again():
+    rows = [
+        {"id": "1", "ioc": "203.0.113.7:443", "ioc_type": "ip:port", "threat_type": "botnet_cc"},
+        {"id": "2", "ioc": "http://evil.example/gate.php", "ioc_type": "url", "threat_type": "payload_delivery"},
+    ]
+    items = feeds.threatfox_items({"query_status": "ok", "data": rows}, limit=10)
+    items.append({"id": "3", "source": "CISA", "title": "C2 at 198.51.100.9 and bad-c2.com", "summary": ""})
+
+    enrich.add_iocs(items, workers=1)
+    assert [it["iocs"] for it in items[:2]] == [
+        {"ips": ["203.0.113.7:443"], "domains": [], "urls": []},
+        {"ips": [], "domains": [], "urls": ["http://evil.example/gate.php"]},
+    ]
+    assert items[2]["iocs"]["ips"] == ["198.51.100.9"]
+    assert items[2]["iocs"]["domains"] == ["bad-c2.com"]
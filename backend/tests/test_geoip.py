@@ -0,0 +1,58 @@
+import pytest
+
+from core import feeds, geoip
+
+RANGES = """start,end,country
+1.2.3.0,1.2.3.255,AU
+5.6.0.0,5.6.255.255,DE
+2001:db8::,2001:db8:ffff:ffff:ffff:ffff:ffff:ffff,NL
+"""
+
+
+@pytest.fixture
+def resolver(tmp_path, monkeypatch):
+    path = tmp_path / "ranges.csv"
+    path.write_text(RANGES)
+    resolver = geoip.GeoIpResolver.from_csv(str(path), cache_dir=str(tmp_path / "compiled"))
+    monkeypatch.setattr(feeds, "get_geoip", lambda: resolver)
+    return resolver
+
+
+@pytest.mark.parametrize("value, host", [
+    ("1.2.3.4:443", "1.2.3.4"),
+    (" 1.2.3.4 ", "1.2.3.4"),
+    ("[2001:db8::1]:8080", "2001:db8::1"),
+    ("[2001:db8::1]", "2001:db8::1"),
+    ("2001:db8::1", "2001:db8::1"),
+])
+def test_host_of(value, host):
+    assert geoip.host_of(value) == host
+
+
+def test_ip_port_indicators_resolve(resolver):
+    assert resolver.lookup_many(["1.2.3.4:443", "5.6.7.8:8080"]) == ["AU", "DE"]
+    assert resolver.lookup_many(
+        ["1.2.3.4:443", "1.2.3.4", "[2001:db8::1]:8080", "2001:db8::1", "bogus", "9.9.9.9:53"]
+    ) == ["AU", "AU", "NL", "NL", None, None]
+
+
+def threatfox_raw(rows):
+    data = [
+        {"id": str(i), "ioc": ioc, "ioc_type": "ip:port", "threat_type": "botnet_cc",
+         "first_seen": "2025-10-28 06:00:00 UTC", "country": country}
+        for i, (ioc, country) in enumerate(rows)
+    ]
+    return feeds.threatfox_items({"query_status": "ok", "data": data}, len(data))
+
+
+def test_enrich_all_adds_countries_for_ip_port(resolver):
+    items = feeds.enrich_all(feeds.normalize_all(threatfox_raw([("1.2.3.4:443", None)])))
+    assert "AU" in items[0]["geo_hints"]
+
+
+def test_api_iocs_body_is_geolocated(resolver):
+    api = pytest.importorskip("api")
+    body = api._iocs_body(threatfox_raw([("1.2.3.4:443", None), ("5.6.7.8:80", "FR")]))
+    hints = {it["title"]: it["geo_hints"] for it in body["items"]}
+    assert hints["1.2.3.4:443"] == ["AU"]
+    assert hints["5.6.7.8:80"] == ["FR", "DE"]  # ThreatFox's own country stays first
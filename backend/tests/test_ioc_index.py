@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from core import ioc_index
+from core.store import ItemStore
+
+ROWS = [
+    {"id": "threatfox-1", "iocs": {"ips": ["203.0.113.7:443"], "domains": [], "urls": []}},
+    {"id": "threatfox-2", "iocs": {"ips": [], "domains": ["evil.example"], "urls": []}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = ItemStore(str(tmp_path / "items.sqlite3"))
+    s.upsert_many([{
+        "id": "cisa-1",
+        "source": "CISA",
+        "published_at": "2025-10-01T00:00:00Z",
+        "iocs": {"urls": ["http://Bad.example/Payload.exe"], "hashes": ["A" * 64]},
+    }])
+    return s
+
+
+def test_builder_covers_rows_and_store(store):
+    rows = list(ROWS)
+
+    async def loader():
+        return rows
+
+    async def run():
+        builder = ioc_index.IndexBuilder(loader, store=store)
+        assert builder.index is None
+        assert await builder.refresh()
+        assert not await builder.refresh()  # nothing changed
+        hits = builder.index.match(["203.0.113.7", "c2.evil.example", "http://bad.example/Payload.exe", "a" * 64])
+        assert [m["item_ids"] for m in hits] == [["threatfox-1"], ["threatfox-2"], ["cisa-1"], ["cisa-1"]]
+
+        store.upsert_many([{"id": "cisa-2", "source": "CISA", "iocs": {"ips": ["198.51.100.1"]}}])
+        assert await builder.refresh()
+        assert builder.index.match_one("198.51.100.1")
+
+    asyncio.run(run())
+
+
+def test_builder_falls_back_to_store(store):
+    async def loader():
+        raise RuntimeError("ThreatFox unavailable")
+
+    builder = ioc_index.IndexBuilder(loader, store=store)
+    asyncio.run(builder.refresh())
+    assert builder.index.match_one("a" * 64)
+
+
+def test_match_answers_503_until_built(monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    import api
+
+    builder = ioc_index.IndexBuilder(None)
+    monkeypatch.setattr(api, "_ioc_index", builder)
+    client = TestClient(api.app)  # no lifespan: nothing builds the index
+    resp = client.post("/api/iocs/match", json={"observables": ["evil.example"]})
+    assert resp.status_code == 503 and resp.headers["retry-after"] == "5"
+
+    builder.index = ioc_index.build_index(ROWS)
+    resp = client.post("/api/iocs/match", json={"observables": ["evil.example"]})
+    assert resp.json()["matched"] == 1
@@ -0,0 +1,19 @@
+import sys
+
+from core.item import ThreatItem
+
+
+def fresh(s):
+    # a new str object with the same value
+    return "".join(list(s))
+
+
+def test_only_low_cardinality_fields_are_interned():
+    interned = [sys.intern(fresh(v)) for v in ("CVE-2025-1234", "RU", "203.0.113.7", "evil.example")]
+    cve, country, ip, domain = (fresh(v) for v in ("CVE-2025-1234", "RU", "203.0.113.7", "evil.example"))
+    item = ThreatItem(cve_list=[cve], geo_hints=[country], iocs={"ips": [ip], "domains": [domain]})
+
+    assert item.cve_list[0] is interned[0]
+    assert item.geo_hints[0] is interned[1]
+    assert item.ips[0] is ip and item.domains[0] is domain
+    assert item.to_dict()["iocs"] == {"ips": ["203.0.113.7"], "domains": ["evil.example"], "urls": []}
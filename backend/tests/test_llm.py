@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core import llm
+
+openai = pytest.importorskip("openai")
+
+
+class StubResponses:
+    """Local stand-in for POST /v1/responses.
+
+    Answers every item of a request with a generated summary, except that
+    requests containing an id in `fail_ids` get HTTP 500 and ids in
+    `skip_ids` are left out of the answer (a partial batch).
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.fail_ids = set()
+        self.skip_ids = set()
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body["input"][-1]["content"]
+                items = json.loads(prompt[prompt.index("{"):])["items"]
+                ids = [it["id"] for it in items]
+                with stub._lock:
+                    stub.requests.append(ids)
+                if stub.fail_ids & set(ids):
+                    self._send(500, {"error": {"message": "upstream failure", "type": "server_error"}})
+                    return
+                answer = {
+                    "items": [
+                        {"id": i, "title": f"LLM {i}", "risk": "High", "summary": f"Summary of {i}."}
+                        for i in ids
+                        if i not in stub.skip_ids
+                    ]
+                }
+                self._send(200, {
+                    "id": "resp_test",
+                    "object": "response",
+                    "created_at": 0,
+                    "model": body["model"],
+                    "status": "completed",
+                    "output": [{
+                        "type": "message",
+                        "id": "msg_test",
+                        "role": "assistant",
+                        "status": "completed",
+                        "content": [{"type": "output_text", "text": json.dumps(answer), "annotations": []}],
+                    }],
+                    "parallel_tool_calls": False,
+                    "tool_choice": "auto",
+                    "tools": [],
+                })
+
+            def _send(self, code, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = openai.OpenAI(
+            base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+            api_key="test",
+            max_retries=0,
+        )
+
+    def requested(self):
+        return sorted(i for ids in self.requests for i in ids)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    s = StubResponses()
+    monkeypatch.setattr(llm, "_get_client", lambda: s.client)
+    monkeypatch.setattr(llm, "LLM_BATCH_MAX_ITEMS", 2)
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 1)
+    yield s
+    s.close()
+
+
+def items(prefix, n):
+    return [
+        {"id": f"{prefix}-{i}", "source": "NVD", "title": f"{prefix} item {i}",
+         "summary": f"Description {i}", "cve_list": [f"CVE-2025-{1000 + i}"], "cvss_max": 7.5}
+        for i in range(n)
+    ]
+
+
+def test_partial_batch_failure(stub):
+    batch = items("partial", 5)
+    stub.fail_ids = {"partial-2"}   # batch [partial-2, partial-3] fails every attempt
+    stub.skip_ids = {"partial-1"}   # batch [partial-0, partial-1] only half answered
+
+    results = llm.summarize_items(batch)
+
+    assert [r["title"] if r else None for r in results] == [
+        "LLM partial-0", None, None, None, "LLM partial-4",
+    ]
+    # failed batch retried whole, partial batch retried for the missing id only
+    assert sorted(map(tuple, stub.requests)) == [
+        ("partial-0", "partial-1"),
+        ("partial-1",),
+        ("partial-2", "partial-3"),
+        ("partial-2", "partial-3"),
+        ("partial-4",),
+    ]
+
+
+def test_brief_sends_only_cache_misses(stub):
+    first = items("cached", 3)
+    stub.fail_ids = {"cached-2"}
+    briefs = llm.build_brief(first)
+    assert [b["title"] for b in briefs] == ["LLM cached-0", "LLM cached-1", "cached item 2"]
+    assert [b["id"] for b in briefs] == ["cached-0", "cached-1", "cached-2"]
+
+    # cached-0/1 are cache hits; the failed cached-2 (template fallback, not
+    # cached) and the new item are the only misses sent upstream
+    stub.requests.clear()
+    stub.fail_ids = set()
+    second = first + items("fresh", 1)
+    briefs = llm.build_brief(second)
+    assert stub.requested() == ["cached-2", "fresh-0"]
+    assert [b["title"] for b in briefs] == ["LLM cached-0", "LLM cached-1", "LLM cached-2", "LLM fresh-0"]
+
+    stub.requests.clear()
+    assert llm.build_brief(second) == briefs
+    assert stub.requests == []
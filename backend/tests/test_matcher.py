@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from bench.corpus import make_feed_items
+from core import matcher
+from core.matcher import DATA_DIR, GEO_KEYWORDS
+
+SAMPLE_FEEDS = os.path.join(DATA_DIR, "sample_feeds.json")
+
+
+def old_geo(text):
+    # the substring tagger feeds.enrich_all used before core.matcher
+    lower = text.lower()
+    return {iso for kw, iso in GEO_KEYWORDS if kw.lower() in lower}
+
+
+def old_geo_names(text):
+    # same, without the all-caps codes that used to hit inside other words
+    lower = text.lower()
+    return {iso for kw, iso in GEO_KEYWORDS if not kw.isupper() and kw.lower() in lower}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Russian hackers target European banks", {"RU", "EU"}),
+        ("Saudis warn of wiper attacks on Saudi Aramco suppliers", {"SA"}),
+        ("China-linked APT exploits Ivanti flaw", {"CN"}),
+        ("China's state actors and Russia-nexus groups", {"CN", "RU"}),
+        ("United Kingdom's NCSC and the United States' CISA", {"GB", "US"}),
+        ("Campaign hits UK, USA and UAE firms", {"GB", "US", "AE"}),
+        ("Europeans urged to patch", {"EU"}),
+    ],
+)
+def test_geo_matches_old_tagger(text, expected):
+    assert matcher.tag_text(text)["geo"] == expected == old_geo(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Ukraine power grid targeted",
+        "Duke Energy usage portal outage",
+        "Fake booksale storefront skims cards",
+    ],
+)
+def test_codes_do_not_match_inside_words(text):
+    assert old_geo(text)
+    assert matcher.tag_text(text)["geo"] == set()
+
+
+def test_geo_names_keep_old_recall():
+    with open(SAMPLE_FEEDS, encoding="utf-8") as f:
+        raw = json.load(f)
+    texts = [f"{it.get('title', '')} {it.get('summary', '')}" for it in raw]
+    texts += [f"{it['title']} {it['summary']}" for it in make_feed_items(5000, seed=1)]
+    for text in texts:
+        new = matcher.tag_text(text)["geo"]
+        assert old_geo_names(text) <= new <= old_geo(text), text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("LockBit3.0 affiliates claim the attack", {"LockBit"}),
+        ("APT28-linked operators reuse the implant", {"APT28 (Fancy Bear)"}),
+        ("Lazarus's new loader spreads via npm", {"Lazarus Group"}),
+        ("APT29s phishing lures", {"APT29 (Cozy Bear)"}),
+        ("Conti's leaked playbook", {"Conti"}),
+        ("Attacks continue across the continent", set()),
+    ],
+)
+def test_actor_aliases(text, expected):
+    assert matcher.tag_text(text)["actor"] == expected
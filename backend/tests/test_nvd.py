@@ -0,0 +1,182 @@
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from core import feeds, nvd
+
+PAGE_SIZE = 2
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def vulnerability(i):
+    cve_id = f"CVE-2025-{1000 + i}"
+    modified = NOW - datetime.timedelta(hours=10 - i)
+    return {
+        "cve": {
+            "id": cve_id,
+            "published": f"2025-10-{1 + i:02d}T10:00:00.000",
+            "lastModified": modified.strftime("%Y-%m-%dT%H:%M:%S.000"),
+            "descriptions": [{"lang": "en", "value": f"Flaw number {i} in Example Server"}],
+            "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": 7.5}}]},
+        }
+    }
+
+
+def modified_at(v):
+    return datetime.datetime.fromisoformat(v["cve"]["lastModified"]).replace(tzinfo=datetime.timezone.utc)
+
+
+class FixtureNvd:
+    """Local stand-in for the NVD CVE API, paging a fixed list of CVEs.
+
+    Only CVEs modified within the requested lastMod range are returned.
+    Requests for the page at `hold_index` wait until `release` is set, a
+    `fail_index` page answers HTTP 500, and so does every request once
+    `requests` holds more than `fail_after` entries.
+    """
+
+    def __init__(self, vulns):
+        self.vulns = vulns
+        self.requests = []
+        self.hold_index = None
+        self.fail_index = None
+        self.fail_after = None
+        self.release = threading.Event()
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                fixture.requests.append(params)
+                start = int(params["startIndex"])
+                if start == fixture.hold_index:
+                    fixture.release.wait(5)
+                over = fixture.fail_after is not None and len(fixture.requests) > fixture.fail_after
+                if start == fixture.fail_index or over:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                lo = datetime.datetime.fromisoformat(params["lastModStartDate"])
+                hi = datetime.datetime.fromisoformat(params["lastModEndDate"])
+                vulns = [
+                    v for v in fixture.vulns
+                    if lo <= modified_at(v) <= hi
+                ]
+                size = int(params["resultsPerPage"])
+                body = json.dumps({
+                    "startIndex": start,
+                    "resultsPerPage": size,
+                    "totalResults": len(vulns),
+                    "vulnerabilities": vulns[start:start + size],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/rest/json/cves/2.0"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    fixture = FixtureNvd([vulnerability(i) for i in range(5)])
+    yield fixture
+    fixture.close()
+
+
+@pytest.fixture
+def collector(server, tmp_path, monkeypatch):
+    c = nvd.NvdCollector(
+        base_url=server.url,
+        api_key=None,
+        state_path=str(tmp_path / "nvd_state.json"),
+        pacer=nvd.RatePacer(100, 1.0),
+        page_size=PAGE_SIZE,
+        timeout=5,
+    )
+    monkeypatch.setattr(feeds, "get_nvd_collector", lambda: c)
+    monkeypatch.setattr(feeds, "SOURCES", [("NVD", feeds.iter_nvd_pages, {"limit": 50}, 10.0)])
+    return c
+
+
+def test_delta_is_paged_and_watermark_overlaps(server, collector):
+    pages = list(collector.iter_delta())
+    assert [[it["id"] for it in page] for page in pages] == [
+        ["CVE-2025-1000", "CVE-2025-1001"],
+        ["CVE-2025-1002", "CVE-2025-1003"],
+        ["CVE-2025-1004"],
+    ]
+    assert [r["startIndex"] for r in server.requests] == ["0", "2", "4"]
+
+    end = datetime.datetime.fromisoformat(server.requests[-1]["lastModEndDate"])
+    watermark = datetime.datetime.fromisoformat(collector.load_state()["watermark"])
+    overlap = datetime.timedelta(seconds=nvd.WATERMARK_OVERLAP)
+    # NVD timestamps are sent without microseconds
+    assert overlap - datetime.timedelta(seconds=1) < end - watermark <= overlap
+
+    server.requests.clear()
+    collector.sync()
+    start = datetime.datetime.fromisoformat(server.requests[0]["lastModStartDate"])
+    assert start == watermark.replace(microsecond=0) < end
+    # the overlapping CVEs are merged by id
+    assert len(collector.recent()) == 5
+
+
+def test_iter_all_sources_streams_nvd_pages(server, collector):
+    server.hold_index = 4  # the last page only comes once we have seen the first
+    status = {}
+    stream = feeds.iter_all_sources(status)
+    first = next(stream)
+    assert first["id"] == "CVE-2025-1000"
+    assert not server.release.is_set()
+
+    server.release.set()
+    ids = [first["id"]] + [it["id"] for it in stream]
+    assert ids == [f"CVE-2025-{1000 + i}" for i in range(5)]
+    assert status["NVD"]["status"] == "ok"
+    assert status["NVD"]["items"] == 5
+
+
+def test_failed_delta_serves_buffer(server, collector):
+    collector.sync()
+    server.fail_index = 2
+    state = {**collector.load_state(), "synced_at": 0}
+    state["watermark"] = (NOW - datetime.timedelta(hours=11)).isoformat()
+    collector.save_state(state)
+
+    ids = [it["id"] for it in feeds.iter_all_sources()]
+    # the pages before the failure are handed on, then the recent buffer
+    assert ids[:2] == ["CVE-2025-1000", "CVE-2025-1001"]
+    assert sorted(set(ids)) == [f"CVE-2025-{1000 + i}" for i in range(5)]
+    assert len(ids) == 5
+    assert collector.load_state()["watermark"] == state["watermark"]
+
+
+def test_cut_short_deltas_commit_completed_windows(server, collector, monkeypatch):
+    monkeypatch.setattr(nvd, "WINDOW_MAX_PAGES", 1)
+    server.fail_after = 4  # every run gets four requests, like a short deadline
+    watermarks = []
+    while collector.is_stale(60):
+        server.requests.clear()
+        list(feeds.iter_all_sources())
+        watermarks.append(collector.load_state()["watermark"])
+        assert len(watermarks) < 10, "the watermark does not advance"
+
+    assert len(watermarks) > 1
+    assert watermarks == sorted(watermarks)
+    assert sorted(it["id"] for it in collector.recent()) == [f"CVE-2025-{1000 + i}" for i in range(5)]
@@ -0,0 +1,71 @@
+from core import dedup, feeds, rank
+
+NOW = "2025-10-28T12:00:00Z"
+
+BOTNET_DESC = ("Indicator that identifies a botnet command&control server (C&C). "
+               "A C&C server is used by threat actors to control infected machines.")
+
+
+def threatfox_row(i):
+    return {
+        "id": str(1500000 + i),
+        "ioc": f"45.9.{i}.{100 + i}:443",
+        "ioc_type": "ip:port",
+        "threat_type": "botnet_cc",
+        "threat_type_desc": BOTNET_DESC,
+        "first_seen": NOW,
+        "country": "NL",
+    }
+
+
+def story(i, source, title, summary, cvss, published_at=NOW):
+    return {
+        "id": f"{source.lower()}-{i}",
+        "source": source,
+        "published_at": published_at,
+        "title": title,
+        "summary": summary,
+        "cve_list": [f"CVE-2025-{1000 + i}"],
+        "cvss_max": cvss,
+    }
+
+
+def mixed_corpus():
+    """ThreatFox rows as the collector builds them, plus NVD and CISA stories."""
+    tf = feeds.threatfox_items({"query_status": "ok", "data": [threatfox_row(i) for i in range(20)]}, 20)
+    stories = [
+        story(1, "NVD", "Ivanti Connect Secure stack overflow",
+              "A stack-based buffer overflow allows remote code execution.", 7.5, "2025-10-27T08:00:00Z"),
+        story(2, "NVD", "FortiOS SSL-VPN heap overflow",
+              "A heap overflow in sslvpnd lets an unauthenticated attacker run code.", 6.8, "2025-10-26T15:00:00Z"),
+        story(3, "NVD", "Apache Tomcat partial PUT deserialization",
+              "Path equivalence in partial PUT handling may lead to RCE.", 5.9, "2025-10-25T10:00:00Z"),
+        story(4, "CISA", "CISA adds Citrix NetScaler flaw to KEV",
+              "CISA urges agencies to patch NetScaler ADC session token leak.", 6.5, "2025-10-27T18:00:00Z"),
+        story(5, "CISA", "CISA releases ICS advisories",
+              "Advisories cover Siemens and Schneider Electric products.", 5.3, "2025-10-24T12:00:00Z"),
+    ]
+    return [feeds.normalize(x) for x in tf + stories]
+
+
+def test_boilerplate_threatfox_rows_are_not_duplicates():
+    items = mixed_corpus()
+    _, sizes = dedup.cluster_items(items)
+    assert all(size == 1 for it, size in zip(items, sizes) if it["source"] == "ThreatFox")
+
+
+def test_threatfox_rows_do_not_reorder_top_k():
+    items = mixed_corpus()
+    now = feeds.normalize({"published_at": NOW})["published_ts"]
+    stories = [it for it in items if it["source"] != "ThreatFox"]
+    alone = rank.top_k(stories, k=5, now=now)
+    mixed = rank.top_k(items, k=5, now=now)
+    assert [it["id"] for it in mixed] == [it["id"] for it in alone]
+
+
+def test_republished_stories_still_cluster():
+    a = story(1, "CISA", "CISA warns of exploited Ivanti Connect Secure flaw",
+              "Attackers are exploiting a stack overflow in Ivanti Connect Secure gateways.", 9.0)
+    b = dict(a, id="news-1", source="NewsRSS")
+    _, sizes = dedup.cluster_items([feeds.normalize(a), feeds.normalize(b)])
+    assert sizes == [2, 2]
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+import pytest
+
+from bench.corpus import make_feed_items
+from core import dedup, enrich, feeds, rank, rank_index
+
+
+@pytest.fixture(scope="module")
+def items():
+    now = time.time()
+    raw = make_feed_items(600, seed=3)
+    for i, it in enumerate(raw):
+        it["published_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - i * 3600))
+    return feeds.enrich_all(enrich.add_iocs(feeds.normalize_all(raw)))
+
+
+def reference(items, now):
+    return rank.score_batch(items, now=now, dup_index=dedup.NearDuplicateIndex(threshold=rank.DUP_THRESHOLD))
+
+
+def test_scores_match_full_rescore(tmp_path, items):
+    index = rank_index.RankIndex(str(tmp_path / "rank.sqlite3"))
+    index.update(items[:400])
+    index.update(items[300:])
+    assert index.update(items) == 0
+    for now in (time.time(), time.time() + 5 * 86400):
+        expected = reference(items, now)
+        assert np.allclose(index.scores([it["id"] for it in items], now=now), expected, atol=1e-9)
+        top = [item_id for item_id, _ in index.top_k(10, now=now)]
+        assert top == [items[i]["id"] for i in np.argsort(-expected, kind="stable")[:10]]
+
+
+def test_two_writers_on_one_file(tmp_path, items):
+    """The Streamlit app and api.py each hold a RankIndex on the same file."""
+    path = str(tmp_path / "rank.sqlite3")
+    app, api = rank_index.RankIndex(path), rank_index.RankIndex(path)
+    api.update(items[:50])             # api loads its clusters now
+    app.update(items[:300])            # rows api has not seen
+    api.score_and_group(items[250:450])
+    app.update(items[400:])
+    now = time.time()
+    expected = reference(items, now)
+    for index in (app, api):
+        assert np.allclose(index.scores([it["id"] for it in items], now=now), expected, atol=1e-9)
+
+    # a delete by one process is seen by the other's next write
+    api.discard([it["id"] for it in items[:100]])
+    app.update(items[:1])
+    conn = app._conn()
+    assert {r[0] for r in conn.execute("SELECT id FROM ranks")} == {it["id"] for it in items[:1] + items[100:]}
+    sizes = dict(conn.execute("SELECT cluster, COUNT(*) FROM ranks GROUP BY cluster"))
+    for label, dup in conn.execute("SELECT cluster, base - static FROM ranks"):
+        assert dup == pytest.approx(rank.W_DUP * rank_index._dup(sizes[label]))
+    assert conn.execute(
+        "SELECT COUNT(*) FROM rank_bands WHERE seq NOT IN (SELECT seq FROM ranks)"
+    ).fetchone()[0] == 0
+    assert len(api.top_k(5, now=now)) == 5
@@ -1,44 +1,61 @@
 import { useEffect, useRef } from "react";
 import mapboxgl, { Map as MapboxMap, GeoJSONSource } from "mapbox-gl";
+import {
+  API_BASE_URL,
+  useIocCountryCounts,
+  type CountryCounts,
+} from "./useIocStream";
 
 const MAPBOX_TOKEN = import.meta.env.VITE_MAPBOX_TOKEN as string;
 
-// Public world countries GeoJSON
-const WORLD_COUNTRIES_URL =
-  "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json";
-
-// Very simple centroid: average of first ring's coordinates
-function getFeatureCenter(feature: any): [number, number] {
-  const geom = feature?.geometry;
-  if (!geom) return [0, 0];
-
-  let coords: [number, number][] = [];
-
-  if (geom.type === "Polygon" && geom.coordinates?.[0]) {
-    coords = geom.coordinates[0] as [number, number][];
-  } else if (
-    geom.type === "MultiPolygon" &&
-    geom.coordinates?.[0]?.[0]
-  ) {
-    coords = geom.coordinates[0][0] as [number, number][];
+type CountryRow = {
+  iso2: string;
+  name: string;
+  lat: number;
+  lon: number;
+  total: number;
+  intensity: number;
+};
+
+// 0..1 threat level per ISO alpha-2, log-scaled against the busiest country
+function threatLevels(counts: CountryCounts): Record<string, number> {
+  const max = Math.max(1, ...Object.values(counts));
+  const levels: Record<string, number> = {};
+  for (const [iso2, n] of Object.entries(counts)) {
+    levels[iso2] = Math.log1p(n) / Math.log1p(max);
   }
-
-  if (!coords.length) return [0, 0];
-
-  let sumX = 0;
-  let sumY = 0;
-
-  coords.forEach(([x, y]) => {
-    sumX += x;
-    sumY += y;
-  });
-
-  return [sumX / coords.length, sumY / coords.length];
+  return levels;
 }
 
 export default function GlobeMap() {
   const mapContainer = useRef<HTMLDivElement | null>(null);
   const mapRef = useRef<MapboxMap | null>(null);
+  const pointsRef = useRef<any>(null);
+  const counts = useIocCountryCounts();
+  const countsRef = useRef<CountryCounts | null>(counts);
+
+  // Push the latest streamed counts into the country points
+  const applyCounts = (c: CountryCounts | null) => {
+    const map = mapRef.current;
+    const countryPoints = pointsRef.current;
+    // nothing streamed yet: keep the intensities from the aggregate
+    if (!map || !countryPoints || !c) return;
+
+    const levels = threatLevels(c);
+    countryPoints.features.forEach((f: any) => {
+      f.properties.threat = levels[f.properties.iso2] ?? 0;
+    });
+
+    const pointSrc = map.getSource("country-centers") as
+      | GeoJSONSource
+      | undefined;
+    if (pointSrc) pointSrc.setData(countryPoints);
+  };
+
+  useEffect(() => {
+    countsRef.current = counts;
+    applyCounts(counts);
+  }, [counts]);
 
   useEffect(() => {
     if (!mapContainer.current) return;
@@ -57,57 +74,33 @@ export default function GlobeMap() {
 
     mapRef.current = map;
 
-    let threatInterval: number | undefined;
-
     map.on("load", async () => {
       try {
-        const res = await fetch(WORLD_COUNTRIES_URL);
-        const countriesGeo: any = await res.json();
+        // Per-country aggregate with precomputed centroids (a few KB)
+        const res = await fetch(`${API_BASE_URL}/api/iocs/countries`);
+        const aggregate: { countries: CountryRow[] } = await res.json();
 
-        const pointFeatures = countriesGeo.features.map((f: any) => {
-          const center = getFeatureCenter(f);
-          const threat = Math.random();
-
-          f.properties.threat = threat;
-
-          return {
+        const countryPoints: any = {
+          type: "FeatureCollection",
+          features: aggregate.countries.map((c) => ({
             type: "Feature",
             properties: {
-              name: f.properties.name,
-              threat,
+              iso2: c.iso2,
+              name: c.name,
+              threat: c.intensity,
             },
             geometry: {
               type: "Point",
-              coordinates: center,
+              coordinates: [c.lon, c.lat],
             },
-          };
-        });
-
-        const countryPoints: any = {
-          type: "FeatureCollection",
-          features: pointFeatures,
+          })),
         };
 
-        map.addSource("countries", {
-          type: "geojson",
-          data: countriesGeo,
-        });
-
         map.addSource("country-centers", {
           type: "geojson",
           data: countryPoints,
         });
 
-        map.addLayer({
-          id: "countries-borders",
-          type: "line",
-          source: "countries",
-          paint: {
-            "line-color": "#222222",
-            "line-width": 0.5,
-          },
-        });
-
         map.addLayer({
           id: "countries-dots",
           type: "circle",
@@ -139,34 +132,17 @@ export default function GlobeMap() {
           },
         });
 
-        threatInterval = window.setInterval(() => {
-          countriesGeo.features.forEach((f: any, i: number) => {
-            const threat = Math.random();
-            f.properties.threat = threat;
-            countryPoints.features[i].properties.threat = threat;
-          });
-
-          const polySrc = map.getSource(
-            "countries"
-          ) as GeoJSONSource | undefined;
-          const pointSrc = map.getSource(
-            "country-centers"
-          ) as GeoJSONSource | undefined;
-
-          if (polySrc) polySrc.setData(countriesGeo);
-          if (pointSrc) pointSrc.setData(countryPoints);
-        }, 1000);
+        pointsRef.current = countryPoints;
+        applyCounts(countsRef.current);
       } catch (e) {
-        console.error("Failed to load world countries GeoJSON", e);
+        console.error("Failed to load per-country IoC aggregate", e);
       }
     });
 
     return () => {
-      if (threatInterval !== undefined) {
-        window.clearInterval(threatInterval);
-      }
       map.remove();
       mapRef.current = null;
+      pointsRef.current = null;
     };
   }, []);
 
@@ -0,0 +1,41 @@
+import { useEffect, useState } from "react";
+
+export const API_BASE_URL =
+  (import.meta.env.VITE_API_BASE_URL as string) || "http://localhost:8000";
+
+export type CountryCounts = Record<string, number>; // ISO alpha-2 -> live IoCs
+
+// Subscribes to /api/iocs/stream (Server-Sent Events). The server sends one
+// "snapshot" with the full per-country counts, then only "delta" events;
+// EventSource reconnects on its own and resumes via Last-Event-ID.
+// null until the first snapshot has arrived.
+export function useIocCountryCounts(): CountryCounts | null {
+  const [counts, setCounts] = useState<CountryCounts | null>(null);
+
+  useEffect(() => {
+    const source = new EventSource(`${API_BASE_URL}/api/iocs/stream`);
+
+    source.addEventListener("snapshot", (e) => {
+      const data = JSON.parse((e as MessageEvent).data);
+      setCounts(data.country_counts ?? {});
+    });
+
+    source.addEventListener("delta", (e) => {
+      const deltas: CountryCounts =
+        JSON.parse((e as MessageEvent).data).country_deltas ?? {};
+      setCounts((prev) => {
+        const next = { ...(prev ?? {}) };
+        for (const [iso, d] of Object.entries(deltas)) {
+          const n = (next[iso] ?? 0) + d;
+          if (n > 0) next[iso] = n;
+          else delete next[iso];
+        }
+        return next;
+      });
+    });
+
+    return () => source.close();
+  }, []);
+
+  return counts;
+}